@@ -1,4 +1,6 @@
 import abc
+import contextlib
+import functools
 from typing import Iterable, List, Optional
 
 import numpy as np
@@ -18,11 +20,27 @@ from lm_eval.metrics import (
     weighted_perplexity,
     bits_per_byte,
 )
-from lm_eval import utils, metrics
+from lm_eval import instrumentation, utils, metrics
 from abc import abstractmethod
 
 
+def profiled(fn):
+    """Calls the profiler hooks of the LM around `fn`, an LM method taking a
+    list of requests.
+    """
+
+    @functools.wraps(fn)
+    def _profiled(self, requests, *args, **kwargs):
+        with self.profile(fn.__name__, num_requests=len(requests)):
+            return fn(self, requests, *args, **kwargs)
+
+    return _profiled
+
+
 class LM(abc.ABC):
+    # Immutable, so that LMs which do not call `LM.__init__` share the default.
+    profiler_hooks = ()
+
     def __init__(self):
         self.cache_hook = CacheHook(None)
 
@@ -114,13 +132,44 @@ class LM(abc.ABC):
     @classmethod
     def create_from_arg_string(cls, arg_string, additional_config=None):
         additional_config = {} if additional_config is None else additional_config
-        args = utils.simple_parse_args_string(arg_string)
+        args = utils.parse_arg_types(
+            cls.__init__, utils.simple_parse_args_string(arg_string)
+        )
         args2 = {k: v for k, v in additional_config.items() if v is not None}
         return cls(**args, **args2)
 
     def set_cache_hook(self, cache_hook):
         self.cache_hook = cache_hook
 
+    def close(self):
+        """Releases the resources held by the LM, e.g. worker processes.
+        `evaluator.simple_evaluate` calls it on the models it creates.
+        """
+        pass
+
+    def add_profiler_hook(self, hook):
+        """Registers a `lm_eval.instrumentation.ProfilerHook`, whose `enter` and
+        `exit` are called around the hot paths of the LM: whole
+        `_loglikelihood_tokens` and `greedy_until` calls, and every batch of
+        `_model_call` and `_model_generate`.
+        """
+        self.profiler_hooks = self.profiler_hooks + (hook,)
+
+    def remove_profiler_hook(self, hook):
+        self.profiler_hooks = tuple(h for h in self.profiler_hooks if h is not hook)
+
+    @contextlib.contextmanager
+    def profile(self, event, **metadata):
+        """Calls the profiler hooks around the enclosed block."""
+        hooks = self.profiler_hooks
+        for hook in hooks:
+            hook.enter(event, metadata)
+        try:
+            yield
+        finally:
+            for hook in reversed(hooks):
+                hook.exit(event, metadata)
+
 
 class BaseLM(LM):
     @property
@@ -228,6 +277,7 @@ class BaseLM(LM):
 
         return loglikelihoods
 
+    @profiled
     def _loglikelihood_tokens(self, requests, disable_tqdm=False):
         # TODO: implement some kind of efficient-request-middleware that lumps together requests with the same context
         res = []
@@ -301,9 +351,16 @@ class BaseLM(LM):
                 inplens.append(inplen)
 
             batched_inps = torch.cat(inps, dim=0)  # [batch, padding_length
-            multi_logits = F.log_softmax(
-                self._model_call(batched_inps), dim=-1
-            ).cpu()  # [batch, padding_length, vocab]
+            shape = list(batched_inps.shape)
+            with self.profile("_model_call", shape=shape), instrumentation.span(
+                "model_call", shape=shape
+            ):
+                multi_logits = F.log_softmax(
+                    self._model_call(batched_inps).float(), dim=-1
+                ).cpu()  # [batch, padding_length, vocab]
+            instrumentation.count(
+                "model_call", tokens=sum(inplens), padded_tokens=batched_inps.numel()
+            )
 
             for (cache_key, _, _), logits, inp, inplen, cont_toks in zip(
                 chunk, multi_logits, inps, inplens, cont_toks_list
@@ -339,6 +396,7 @@ class BaseLM(LM):
 
         return reord.get_original(res)
 
+    @profiled
     def greedy_until(self, requests):
         # TODO: implement fully general `until` that handles untils that are
         #       multiple tokens or that span multiple tokens correctly
@@ -389,12 +447,21 @@ class BaseLM(LM):
             else:
                 max_length = max_generation_length
 
-            cont = self._model_generate(
-                input_ids,
-                attention_mask,
-                max_length,
-                torch.tensor(primary_until),
-                num_fewshot,
+            shape = list(input_ids.shape)
+            with self.profile("_model_generate", shape=shape), instrumentation.span(
+                "model_generate", shape=shape
+            ):
+                cont = self._model_generate(
+                    input_ids,
+                    attention_mask,
+                    max_length,
+                    torch.tensor(primary_until),
+                    num_fewshot,
+                )
+            instrumentation.count(
+                "model_generate",
+                tokens=int(attention_mask.sum()),
+                padded_tokens=attention_mask.numel(),
             )
 
             sentences = self.tok_decode(cont.tolist())
@@ -613,6 +680,9 @@ class PromptSourceTask(Task):
 
     CONFIGURED_RANKED_CHOICE_PS_METRICS = set(["Accuracy"])
     CONFIGURED_GENERATION_PS_METRICS = set(["BLEU", "ROUGE", "SARI"])
+    # The ROUGE sub-metrics of prompts with the "ROUGE" metric. Override this to
+    # only compute those a task reports.
+    ROUGE_TYPES = metrics.ROUGE_TYPES
     SPLIT = None
 
     def __init__(
@@ -752,16 +822,17 @@ class PromptSourceTask(Task):
                 if metric == "BLEU":
                     out["bleu"] = (target, pred)
                 elif metric == "ROUGE":
-                    # TODO: This computes all rouge sub-metrics. Find a generic
-                    # way to handle user specified rouge sub-metrics to avoid extra
-                    # compute.
-                    rouge_scores = metrics.rouge(target, pred)
-                    # Flatten rouge score dict.
-                    rouge_scores = utils.flatten(rouge_scores)
-                    # Merge all the rouge-type scores into the `out` dict.
-                    out = {**out, **rouge_scores}
+                    # Computed by `evaluate` for all the docs at once, and
+                    # flattened into the `rouge1_precision`, ... metrics.
+                    out["rouge"] = metrics.DeferredMetric(
+                        metrics.rouge_batch,
+                        (target, pred),
+                        rouge_types=tuple(self.ROUGE_TYPES),
+                    )
                 elif metric == "SARI":
-                    out["sari"] = metrics.sari(self.doc_to_rawtext(doc), pred, target)
+                    out["sari"] = metrics.DeferredMetric(
+                        metrics.sari_batch, (self.doc_to_rawtext(doc), pred, target)
+                    )
 
         # TODO: Wrap process results s.t. override impl do not
         # override the save examples.
@@ -783,26 +854,20 @@ class PromptSourceTask(Task):
             elif metric == "BLEU":
                 out["bleu"] = True
             elif metric == "ROUGE":
-                # TODO: Find a generic way to handle user specified rouge metrics.
-                out["rouge1_precision"] = True
-                out["rouge1_recall"] = True
-                out["rouge1_fmeasure"] = True
-
-                out["rouge2_precision"] = True
-                out["rouge2_recall"] = True
-                out["rouge2_fmeasure"] = True
-
-                out["rougeL_precision"] = True
-                out["rougeL_recall"] = True
-                out["rougeL_fmeasure"] = True
-
-                out["rougeLsum_precision"] = True
-                out["rougeLsum_recall"] = True
-                out["rougeLsum_fmeasure"] = True
+                for rouge_metric in self._rouge_metrics():
+                    out[rouge_metric] = True
             elif metric == "SARI":
                 out["sari"] = True
         return out
 
+    def _rouge_metrics(self):
+        """The names of the ROUGE sub-metrics reported by `process_results`."""
+        return [
+            f"{rouge_type}_{score}"
+            for rouge_type in self.ROUGE_TYPES
+            for score in ["precision", "recall", "fmeasure"]
+        ]
+
     def aggregation(self):
         out = {}
         for metric in self.prompt.metadata.metrics:
@@ -812,22 +877,8 @@ class PromptSourceTask(Task):
             elif metric == "BLEU":
                 out["bleu"] = metrics.bleu
             elif metric == "ROUGE":
-                # TODO: Find a generic way to handle user specified rouge metrics.
-                out["rouge1_precision"] = mean
-                out["rouge1_recall"] = mean
-                out["rouge1_fmeasure"] = mean
-
-                out["rouge2_precision"] = mean
-                out["rouge2_recall"] = mean
-                out["rouge2_fmeasure"] = mean
-
-                out["rougeL_precision"] = mean
-                out["rougeL_recall"] = mean
-                out["rougeL_fmeasure"] = mean
-
-                out["rougeLsum_precision"] = mean
-                out["rougeLsum_recall"] = mean
-                out["rougeLsum_fmeasure"] = mean
+                for rouge_metric in self._rouge_metrics():
+                    out[rouge_metric] = mean
             elif metric == "SARI":
                 out["sari"] = mean
         return out
@@ -1031,14 +1082,11 @@ class TranslationTask(PromptSourceTask):
             if metric == "BLEU":
                 out["bleu"] = (target, pred)
             elif metric == "ROUGE":
-                # TODO: This computes all rouge sub-metrics. Find a generic
-                # way to handle user specified rouge sub-metrics to avoid extra
-                # compute.
-                rouge_scores = metrics.rouge(target, pred)
-                # Flatten rouge score dict.
-                rouge_scores = utils.flatten(rouge_scores)
-                # Merge all the rouge-type scores into the `out` dict.
-                out = {**out, **rouge_scores}
+                out["rouge"] = metrics.DeferredMetric(
+                    metrics.rouge_batch,
+                    (target, pred),
+                    rouge_types=tuple(self.ROUGE_TYPES),
+                )
 
         # TODO: Wrap process results s.t. override impl do not
         # override the save examples.
@@ -1277,6 +1325,12 @@ class CachingLM:
                     res.append(None)
                     remaining_reqs.append(req)
 
+            instrumentation.count(
+                f"cache/{attr}",
+                hits=len(requests) - len(remaining_reqs),
+                misses=len(remaining_reqs),
+            )
+
             # actually run the LM on the requests that do not have cached results
             rem_res = getattr(self.lm, attr)(remaining_reqs)
 
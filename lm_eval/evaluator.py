@@ -1,11 +1,16 @@
 import collections
 import itertools
+import numbers
 import random
+import resource
+import time
 
+import lm_eval.instrumentation
 import lm_eval.metrics
 import lm_eval.models
 import lm_eval.tasks
 import lm_eval.base
+import numpy as np
 from tqdm import tqdm
 
 from lm_eval.utils import positional_deprecated, run_task_tests, set_seed
@@ -28,6 +33,13 @@ def simple_evaluate(
     check_integrity=False,
     seed=1234,
     parallelize=False,
+    num_shards=1,
+    shard_id=0,
+    trace_path=None,
+    profiler_hooks=None,
+    num_workers=None,
+    stderr_method="bootstrap",
+    example_writer=None,
 ):
     """Instantiate and evaluate a model on a list of tasks.
 
@@ -58,45 +70,106 @@ def simple_evaluate(
         Random seed.
     :param parallelize: bool
         Whether to parallelize the model across gpus.
+    :param num_shards: int
+        Number of shards the evaluation is split into, see `evaluate`.
+    :param shard_id: int
+        Index of the shard to evaluate, in `[0, num_shards)`.
+    :param trace_path: str, optional
+        If given, the timed stages of the evaluation are also written to this
+        path as a Chrome trace JSON.
+    :param profiler_hooks: list[lm_eval.instrumentation.ProfilerHook], optional
+        Hooks registered on the model for the duration of the evaluation, see
+        `LM.add_profiler_hook`.
+    :param num_workers: int, optional
+        Number of processes of the worker pool of the metrics, e.g. of the
+        bootstraps. Defaults to the number of CPUs.
+    :param stderr_method: str
+        `bootstrap` or `analytical`, see `metrics.stderr_for_metric`.
+    :param example_writer: lm_eval.example_writer.ExampleWriter, optional
+        Where the record of every example is written, see `evaluate`.
     :return
-        Dictionary of results
+        Dictionary of results, or of raw per-doc metric values to combine with
+        `merge_shards` when `num_shards > 1`
     """
     set_seed(seed)
     assert tasks != [], "No tasks specified"
 
-    if isinstance(model, str):
-        if model_args is None:
-            model_args = ""
-        lm = lm_eval.models.get_model(model).create_from_arg_string(
-            model_args,
-            {"batch_size": batch_size, "device": device, "parallelize": parallelize},
-        )
-    else:
-        assert isinstance(model, lm_eval.base.LM)
-        lm = model
-
-    if not no_cache:
-        lm = lm_eval.base.CachingLM(
-            lm,
-            "lm_cache/"
-            + model
-            + "_"
-            + model_args.replace("=", "-").replace(",", "_").replace("/", "-")
-            + ".db",
-        )
+    # Started before the model is loaded, with `forkserver` or `spawn`, so that
+    # the workers do not hold copies of the model, and reused by the metrics of
+    # every task until the end of the run.
+    with lm_eval.metrics.worker_pool(num_workers):
+        if isinstance(model, str):
+            if model_args is None:
+                model_args = ""
+            load_start = time.perf_counter()
+            lm = lm_eval.models.get_model(model).create_from_arg_string(
+                model_args,
+                {
+                    "batch_size": batch_size,
+                    "device": device,
+                    "parallelize": parallelize,
+                },
+            )
+            model_load = {
+                "load_time_s": time.perf_counter() - load_start,
+                # `ru_maxrss` is reported in KiB on Linux.
+                "peak_rss_mb": (
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                ),
+            }
+        else:
+            assert isinstance(model, lm_eval.base.LM)
+            lm = model
+            model_load = None
+
+        # Keep a reference to the model itself, as `CachingLM` forwards any
+        # attribute lookup as a request type.
+        base_lm = lm
+        try:
+            if not no_cache:
+                lm = lm_eval.base.CachingLM(
+                    lm,
+                    "lm_cache/"
+                    + model
+                    + "_"
+                    + model_args.replace("=", "-").replace(",", "_").replace("/", "-")
+                    + ".db",
+                )
 
-    task_dict = lm_eval.tasks.get_task_dict_promptsource(tasks)
+            task_dict = lm_eval.tasks.get_task_dict_promptsource(tasks)
 
-    if check_integrity:
-        run_task_tests(task_list=tasks)
+            if check_integrity:
+                run_task_tests(task_list=tasks)
 
-    results = evaluate(
-        lm=lm,
-        task_dict=task_dict,
-        num_fewshot=num_fewshot,
-        limit=limit,
-        description_dict=description_dict,
-    )
+            profiler_hooks = profiler_hooks or []
+            for hook in profiler_hooks:
+                base_lm.add_profiler_hook(hook)
+            tracer = lm_eval.instrumentation.Tracer(
+                record_events=trace_path is not None
+            )
+            try:
+                with lm_eval.instrumentation.tracing(tracer):
+                    results = evaluate(
+                        lm=lm,
+                        task_dict=task_dict,
+                        num_fewshot=num_fewshot,
+                        limit=limit,
+                        bootstrap_iters=bootstrap_iters,
+                        stderr_method=stderr_method,
+                        description_dict=description_dict,
+                        num_shards=num_shards,
+                        shard_id=shard_id,
+                        example_writer=example_writer,
+                    )
+            finally:
+                for hook in profiler_hooks:
+                    base_lm.remove_profiler_hook(hook)
+        finally:
+            # Models passed in by the caller are theirs to close.
+            if isinstance(model, str):
+                base_lm.close()
+    if trace_path is not None:
+        tracer.write_chrome_trace(trace_path)
 
     # add info about the model and few shot config
     results["config"] = {
@@ -108,8 +181,20 @@ def simple_evaluate(
         "no_cache": no_cache,
         "limit": limit,
         "bootstrap_iters": bootstrap_iters,
+        "stderr_method": stderr_method,
         "description_dict": description_dict,
+        "tasks": [task for task in tasks if isinstance(task, str)],
+        "seed": seed,
+        "num_shards": num_shards,
+        "shard_id": shard_id,
     }
+    # Kept out of `config` as it differs between otherwise identical runs.
+    if model_load is not None:
+        results["model_load"] = model_load
+    usage = getattr(base_lm, "usage", None)
+    if usage is not None:
+        results["usage"] = usage.summary()
+    results["timing"] = tracer.summary()
 
     return results
 
@@ -123,6 +208,10 @@ def evaluate(
     limit=None,
     bootstrap_iters=100000,
     description_dict=None,
+    num_shards=1,
+    shard_id=0,
+    stderr_method="bootstrap",
+    example_writer=None,
 ):
     """Instantiate and evaluate a model on a list of tasks.
 
@@ -140,13 +229,27 @@ def evaluate(
         Number of iterations for bootstrap statistics
     :param description_dict: dict[str, str]
         Dictionary of custom task descriptions of the form: `task_name: description`
+    :param num_shards: int
+        Number of shards to split the `(task_prompt_name, doc_id)` space into.
+        Docs are assigned to shards by `doc_id % num_shards` after the seeded
+        shuffle, so every shard builds exactly the same contexts as a single run.
+    :param shard_id: int
+        Index of the shard to evaluate, in `[0, num_shards)`.
+    :param stderr_method: str
+        `bootstrap` or `analytical`, see `metrics.stderr_for_metric`.
+    :param example_writer: lm_eval.example_writer.ExampleWriter, optional
+        Where the record of every example is written. Defaults to logging them
+        as JSON with the `examples` logger.
     :return
-        Dictionary of results
+        Dictionary of results. When `num_shards > 1`, the metrics are not
+        aggregated; instead `raw_results` holds the per-doc metric values of this
+        shard, to be combined with `merge_shards`.
     """
     # TODO: completely refactor this entire function to not be a huge mess, ideally breaking it down into smaller pieces
 
     # TODO: todo: implement proper description-providing system
     assert not provide_description  # not implemented.
+    assert 0 <= shard_id < num_shards, "`shard_id` must be in [0, num_shards)"
     if provide_description is not None:
         # nudge people to not specify it at all
         print(
@@ -159,7 +262,6 @@ def evaluate(
         if (task.has_validation_docs() or task.has_test_docs())
     ]
 
-    results = collections.defaultdict(dict)
     versions = collections.defaultdict(dict)
 
     requests = collections.defaultdict(list)
@@ -186,10 +288,11 @@ def evaluate(
             raise RuntimeError("Task has neither test_docs nor validation_docs")
 
         # deterministically shuffle docs and chop off the first `limit` because sometimes docs are in some kind of order
-        task_docs = list(enumerate(list(task_doc_func())))
-        rnd = random.Random()
-        rnd.seed(42)
-        rnd.shuffle(task_docs)
+        with lm_eval.instrumentation.span("load_docs", task=task_prompt_name):
+            task_docs = list(enumerate(list(task_doc_func())))
+            rnd = random.Random()
+            rnd.seed(42)
+            rnd.shuffle(task_docs)
 
         description = (
             description_dict[task_prompt_name]
@@ -205,13 +308,20 @@ def evaluate(
             if task.invalid_doc_for_prompt(doc):
                 continue
 
+            # NOTE: Contexts are built for docs of every shard so that `rnd` draws
+            # the same few-shot examples as in an unsharded run.
+            with lm_eval.instrumentation.span("fewshot_context"):
+                ctx, fewshotex_logging_info = task.fewshot_context(
+                    doc=doc, num_fewshot=num_fewshot, rnd=rnd, description=description
+                )
+            if doc_id % num_shards != shard_id:
+                continue
+
             docs[(task_prompt_name, doc_id)] = doc
-            ctx, fewshotex_logging_info = task.fewshot_context(
-                doc=doc, num_fewshot=num_fewshot, rnd=rnd, description=description
-            )
             fewshotex_logging_info["doc_id"] = original_doc_id
             args = {"num_fewshot": num_fewshot}
-            reqs = task.construct_requests(doc, ctx, args)
+            with lm_eval.instrumentation.span("construct_requests"):
+                reqs = task.construct_requests(doc, ctx, args)
             if not isinstance(reqs, (list, tuple)):
                 reqs = [reqs]
             for i, req in enumerate(reqs):
@@ -233,7 +343,9 @@ def evaluate(
         #       they should end up next to each other.
 
         print("Running", reqtype, "requests")
-        resps = getattr(lm, reqtype)([req.args for req in reqs])
+        with lm_eval.instrumentation.span(f"lm/{reqtype}", requests=len(reqs)):
+            resps = getattr(lm, reqtype)([req.args for req in reqs])
+        lm_eval.instrumentation.count(f"lm/{reqtype}", requests=len(reqs))
         resps = [
             x if req.index is None else x[req.index] for x, req in zip(resps, reqs)
         ]
@@ -245,10 +357,23 @@ def evaluate(
                 (i, resp, fewshotex_logging_info)
             )
 
-    vals = collections.defaultdict(list)
+    raw_vals = collections.defaultdict(list)
 
     # unpack results and sort back in order and return control to Task
     logger = logging.getLogger("examples")
+
+    def _write_example(example, metrics):
+        example["metrics"] = _scalar_metrics(metrics)
+        if example_writer is not None:
+            example_writer.write(example)
+        else:
+            logger.info(json.dumps(example))
+
+    doc_keys = []
+    doc_metrics = []
+    # The examples of the docs with deferred metrics, by index in `doc_metrics`,
+    # written once their metrics are computed. The others are written right away.
+    deferred_examples = {}
     for (task_prompt_name, doc_id), per_doc_requests in process_res_queue.items():
         per_doc_requests.sort(key=lambda x: x[0])
         per_doc_results = [x[1] for x in per_doc_requests]
@@ -257,50 +382,123 @@ def evaluate(
         task = task_dict[task_prompt_name]
         doc = docs[(task_prompt_name, doc_id)]
 
-        output = task.process_results(doc, per_doc_results)
+        with lm_eval.instrumentation.span("process_results"):
+            output = task.process_results(doc, per_doc_results)
 
         if task.save_examples:
             metrics, example = output
             example.update(fewshot_logging_info)
             example.update(task.get_logging_info())
-            logger.info(json.dumps(example))
         else:
             metrics = output
             example = fewshot_logging_info
             example.update(task.get_logging_info())
-            logger.info(json.dumps(example))
+        example["task_name"] = task_prompt_name.split("+", 1)[0]
 
+        if any(
+            isinstance(value, lm_eval.metrics.DeferredMetric)
+            for value in metrics.values()
+        ):
+            deferred_examples[len(doc_metrics)] = example
+        else:
+            _write_example(example, metrics)
+        doc_keys.append((task_prompt_name, doc_id))
+        doc_metrics.append(metrics)
+
+    # Expensive metrics (e.g. ROUGE) are deferred by `process_results` to be
+    # computed for all the docs at once.
+    with lm_eval.instrumentation.span("deferred_metrics"):
+        doc_metrics = lm_eval.metrics.compute_deferred(doc_metrics)
+    for i, example in deferred_examples.items():
+        _write_example(example, doc_metrics[i])
+    for (task_prompt_name, doc_id), metrics in zip(doc_keys, doc_metrics):
         for metric, value in metrics.items():
-            vals[(task_prompt_name, metric)].append(value)
+            raw_vals[(task_prompt_name, metric)].append((doc_id, value))
+
+    if num_shards > 1:
+        raw_results = collections.defaultdict(dict)
+        for (task_prompt_name, metric), items in raw_vals.items():
+            raw_results[task_prompt_name][metric] = items
+        return {
+            # Per-doc `(doc_id, value)` metric values of this shard only.
+            "raw_results": dict(raw_results),
+            "versions": dict(versions),
+        }
+
+    return aggregate(task_dict, raw_vals, versions, bootstrap_iters, stderr_method)
 
-    # aggregate results
+
+def _scalar_metrics(metrics):
+    """Returns the per-doc metric values that are numbers, i.e. not the items of
+    corpus-level metrics (e.g. the `(references, prediction)` of BLEU).
+    """
+    return {
+        metric: float(value)
+        for metric, value in metrics.items()
+        if isinstance(value, (numbers.Real, np.bool_))
+    }
+
+
+def aggregate(
+    task_dict, raw_vals, versions, bootstrap_iters=100000, stderr_method="bootstrap"
+):
+    """Aggregates per-doc metric values into the results returned by `evaluate`.
+
+    :param task_dict: dict[str, Task]
+        Dictionary of tasks the metric values were computed for.
+    :param raw_vals: dict[tuple[str, str], list[tuple[int, Any]]]
+        The `(doc_id, value)` pairs of each `(task_prompt_name, metric)`.
+    :param versions: dict[str, int]
+        The version of each task.
+    :param bootstrap_iters:
+        Number of iterations for bootstrap statistics
+    :param stderr_method: str
+        `bootstrap` or `analytical`, see `metrics.stderr_for_metric`.
+    :return
+        Dictionary of results
+    """
+    # Aggregate in task and doc order so that the results do not depend on how
+    # the docs were scheduled, e.g. across the shards of a sharded run.
+    task_order = {task_prompt_name: i for i, task_prompt_name in enumerate(task_dict)}
+    vals = {
+        key: [value for _, value in sorted(items, key=lambda x: x[0])]
+        for key, items in sorted(raw_vals.items(), key=lambda x: task_order[x[0][0]])
+    }
+
+    results = collections.defaultdict(dict)
     metric_results = []
+    # The aggregation functions of each task, built once per task. Aggregations
+    # that share a computation across metrics use `metrics.shared_aggregation`.
+    aggregations = {}
     for (task_prompt_name, metric), items in vals.items():
         task_name, prompt_name = task_prompt_name.split("+", 1)
 
         results[task_prompt_name]["task_name"] = task_name
         results[task_prompt_name]["prompt_name"] = prompt_name
         task = task_dict[task_prompt_name]
-        results[task_prompt_name][metric] = task.aggregation()[metric](items)
-
+        if task_prompt_name not in aggregations:
+            aggregations[task_prompt_name] = task.aggregation()
+        aggregation = aggregations[task_prompt_name][metric]
+        with lm_eval.instrumentation.span("aggregation", task=task_prompt_name, metric=metric):
+            value = aggregation(items)
+        results[task_prompt_name][metric] = value
         _metric_results = {
             "task_name": task_name,
             "prompt_name": prompt_name,
-            metric: task.aggregation()[metric](items),
+            metric: value,
             **task.get_logging_info(),
         }
 
-        # hotfix: bleu, chrf, ter seem to be really expensive to bootstrap
-        # so we run them less iterations. still looking for a cleaner way to do this
         stderr = lm_eval.metrics.stderr_for_metric(
-            metric=task.aggregation()[metric],
-            bootstrap_iters=min(bootstrap_iters, 1000)
-            if metric in ["bleu", "chrf", "ter"]
-            else bootstrap_iters,
+            metric=aggregation,
+            bootstrap_iters=bootstrap_iters,
+            stderr_method=stderr_method,
         )
         if stderr is not None:
-            results[task_prompt_name][metric + "_stderr"] = stderr(items)
-            _metric_results[metric + "_stderr"] = stderr(items)
+            with lm_eval.instrumentation.span("stderr", task=task_prompt_name, metric=metric):
+                value_stderr = stderr(items)
+            results[task_prompt_name][metric + "_stderr"] = value_stderr
+            _metric_results[metric + "_stderr"] = value_stderr
         metric_results.append(_metric_results)
 
     return {
@@ -313,6 +511,33 @@ def evaluate(
     }
 
 
+def merge_shards(
+    shard_results, task_dict, bootstrap_iters=100000, stderr_method="bootstrap"
+):
+    """Merges the raw per-doc metric values of every shard of a sharded run
+    and aggregates them exactly as an unsharded `evaluate` would.
+
+    :param shard_results: list[dict]
+        The results of `evaluate` (or `simple_evaluate`) for each shard.
+    :param task_dict: dict[str, Task]
+        Dictionary of tasks the shards were evaluated on.
+    :param bootstrap_iters:
+        Number of iterations for bootstrap statistics
+    :param stderr_method: str
+        `bootstrap` or `analytical`, see `metrics.stderr_for_metric`.
+    :return
+        Dictionary of results
+    """
+    raw_vals = collections.defaultdict(list)
+    versions = {}
+    for shard in shard_results:
+        versions.update(shard["versions"])
+        for task_prompt_name, metrics in shard["raw_results"].items():
+            for metric, items in metrics.items():
+                raw_vals[(task_prompt_name, metric)].extend(items)
+    return aggregate(task_dict, raw_vals, versions, bootstrap_iters, stderr_method)
+
+
 def make_table(result_dict):
     """Generate table of results."""
     from pytablewriter import MarkdownTableWriter, LatexTableWriter
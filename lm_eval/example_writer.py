@@ -0,0 +1,368 @@
+"""
+A buffered writer of the per-example records of an evaluation.
+
+Records are serialized and written by a background thread, so `evaluate` only
+pays for putting them in a queue. `ExampleWriter` writes JSON lines, which can
+optionally be compressed with zstd, and can write the fields that are the same
+for every example of a prompt (e.g. its jinja template) once, in a header
+record that the examples refer to:
+
+    with ExampleWriter(
+        "examples.jsonl.zst", compression="zstd", dedup_fields=PROMPT_FIELDS
+    ) as writer:
+        writer.write({"pred": "yes", "prompt_jinja": "...", ...})
+    for example in read_examples("examples.jsonl.zst"):
+        ...
+
+`ParquetExampleWriter` writes the examples and their prompts to two Parquet
+files instead, for analyses that only read some of the columns.
+"""
+import abc
+import io
+import json
+import queue
+import threading
+from abc import abstractmethod
+
+
+# The fields of `PromptSourceTask.get_logging_info`, which are the same for all
+# the examples of a prompt.
+PROMPT_FIELDS = (
+    "fixed_answer_choice_list",
+    "dataset_path",
+    "dataset_name",
+    "subset",
+    "prompt_name",
+    "prompt_id",
+    "prompt_jinja",
+    "prompt_original_task",
+    "comment",
+)
+
+# The field of header records with their id, and of examples with the id of
+# their header. Header records hold the deduplicated fields under `FIELDS_KEY`.
+HEADER_KEY = "_header"
+FIELDS_KEY = "_fields"
+
+COMPRESSIONS = (None, "zstd")
+
+_CLOSE = object()
+
+
+def _open(path, mode, compression):
+    if compression is None:
+        return open(path, mode)
+    import zstandard
+
+    if mode == "wb":
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+
+
+class _BackgroundWriter(abc.ABC):
+    """Queues records to be written by a background thread."""
+
+    def __init__(self, max_pending):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, example):
+        """Queues `example`, a JSON-serializable dict that must not be modified
+        afterwards, to be written.
+        """
+        self._raise_error()
+        self._queue.put(example)
+
+    def close(self):
+        """Writes the queued examples and closes the output."""
+        if self._thread is not None:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._thread = None
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("Failed to write the examples") from self._error
+
+    @abstractmethod
+    def _add(self, example):
+        """Buffers `example`, and writes the buffer when it is full."""
+        pass
+
+    @abstractmethod
+    def _finish(self, flush):
+        """Writes the buffer if `flush`, and closes the output."""
+        pass
+
+    def _run(self):
+        while True:
+            example = self._queue.get()
+            try:
+                if example is _CLOSE:
+                    self._finish(flush=self._error is None)
+                elif self._error is None:
+                    self._add(example)
+            except Exception as e:
+                # Raised by the next `write` or `close`; the remaining examples
+                # are drained so that `write` never blocks.
+                self._error = e
+            if example is _CLOSE:
+                return
+
+
+class _Headers:
+    """Assigns ids to the distinct combinations of the deduplicated fields."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._ids = {}
+
+    def split(self, example):
+        """Returns the deduplicated fields of `example`, the id of their
+        combination and whether it is new.
+        """
+        shared = {k: example[k] for k in self.fields if k in example}
+        key = json.dumps(shared)
+        is_new = key not in self._ids
+        if is_new:
+            self._ids[key] = len(self._ids)
+        return shared, self._ids[key], is_new
+
+
+class ExampleWriter(_BackgroundWriter):
+    """Writes per-example records as JSON lines, from a background thread."""
+
+    def __init__(
+        self,
+        path,
+        compression=None,
+        dedup_fields=None,
+        buffer_size=1 << 20,
+        max_pending=10000,
+    ):
+        """
+        :param path: str
+            The output file.
+        :param compression: str, optional
+            `zstd` to compress the output, which requires `zstandard`.
+        :param dedup_fields: Iterable[str], optional
+            Fields written once per distinct combination of their values, in
+            a header record, e.g. `PROMPT_FIELDS`. Every example then refers to
+            its header by id under `HEADER_KEY`, see `read_examples`.
+        :param buffer_size: int
+            Number of bytes of serialized records buffered before each write.
+        :param max_pending: int
+            Number of records that can wait to be written before `write`
+            blocks.
+        """
+        assert compression in COMPRESSIONS, f"Unknown compression: {compression}"
+        self.dedup_fields = tuple(dedup_fields or ())
+        self.buffer_size = buffer_size
+        self._headers = _Headers(self.dedup_fields)
+        self._buffer, self._size = [], 0
+        self._file = _open(path, "wb", compression)
+        super().__init__(max_pending)
+
+    def _lines(self, example):
+        if not self.dedup_fields:
+            return [json.dumps(example)]
+        shared, header, is_new = self._headers.split(example)
+        lines = []
+        if is_new:
+            lines.append(json.dumps({HEADER_KEY: header, FIELDS_KEY: shared}))
+        record = {k: v for k, v in example.items() if k not in shared}
+        record[HEADER_KEY] = header
+        lines.append(json.dumps(record))
+        return lines
+
+    def _add(self, example):
+        for line in self._lines(example):
+            self._buffer.append(line)
+            self._size += len(line) + 1
+        if self._size >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._buffer.append("")
+            self._file.write("\n".join(self._buffer).encode("utf-8"))
+            self._buffer, self._size = [], 0
+
+    def _finish(self, flush):
+        try:
+            if flush:
+                self._flush()
+        finally:
+            self._file.close()
+
+
+def read_examples(path, compression=None):
+    """Yields the examples written by an `ExampleWriter`, with the fields of
+    their header merged back in.
+
+    :param compression: str, optional
+        The compression of the file. Defaults to `zstd` for `.zst` files.
+    """
+    if compression is None and path.endswith(".zst"):
+        compression = "zstd"
+    headers = {}
+    with _open(path, "rb", compression) as f:
+        for line in io.TextIOWrapper(f, encoding="utf-8"):
+            record = json.loads(line)
+            if FIELDS_KEY in record:
+                headers[record[HEADER_KEY]] = record[FIELDS_KEY]
+            elif HEADER_KEY in record:
+                header = headers[record.pop(HEADER_KEY)]
+                yield {**record, **header}
+            else:
+                yield record
+
+
+def _to_str(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _to_str_list(value):
+    if value is None:
+        return None
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    return [_to_str(v) for v in value]
+
+
+def _to_int_list(value):
+    return None if value is None else [int(v) for v in value]
+
+
+def _to_int(value):
+    return None if value is None else int(value)
+
+
+def _to_items(value):
+    return None if value is None else list(value.items())
+
+
+# The columns of the Parquet examples, with how their values are converted.
+# Fields of the examples that are not listed here, nor in `PROMPT_FIELDS`, are
+# kept as JSON in the `extra` column.
+_PARQUET_COLUMNS = {
+    "task_name": ("string", _to_str),
+    "doc_id": ("int64", _to_int),
+    "pred": ("string", _to_str),
+    "target": ("list<string>", _to_str_list),
+    "answer_choices_list": ("list<string>", _to_str_list),
+    "metrics": ("map<string, double>", _to_items),
+    "ctx": ("string", _to_str),
+    "fewshot_idx": ("list<int64>", _to_int_list),
+    "fewshot_target_idx": ("list<int64>", _to_int_list),
+    "fewshot_source": ("string", _to_str),
+    "fewshot_num": ("int64", _to_int),
+}
+
+
+def _parquet_schema(pa):
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "list<string>": pa.list_(pa.string()),
+        "list<int64>": pa.list_(pa.int64()),
+        "map<string, double>": pa.map_(pa.string(), pa.float64()),
+    }
+    fields = [pa.field("prompt_key", pa.int32())]
+    fields += [pa.field(name, types[t]) for name, (t, _) in _PARQUET_COLUMNS.items()]
+    fields.append(pa.field("extra", pa.string()))
+    return pa.schema(fields)
+
+
+class ParquetExampleWriter(_BackgroundWriter):
+    """Writes per-example records to Parquet, from a background thread.
+
+    The examples are written incrementally, one row group at a time, to
+    `path`. The fields of their prompt (`PROMPT_FIELDS`) are normalized into
+    `prompts_path`, with one row per prompt, written on `close`; both files
+    have a `prompt_key` column to join them on:
+
+        examples = pq.read_table(
+            path, columns=["doc_id", "metrics"], filters=[("task_name", "=", "rte")]
+        )
+    """
+
+    def __init__(
+        self,
+        path,
+        prompts_path,
+        compression="snappy",
+        row_group_size=10000,
+        max_pending=10000,
+    ):
+        """
+        :param path: str
+            The Parquet file of the examples.
+        :param prompts_path: str
+            The Parquet file of the prompts.
+        :param compression: str
+            The Parquet compression codec, e.g. `snappy` or `zstd`.
+        :param row_group_size: int
+            Number of examples buffered and written per row group.
+        :param max_pending: int
+            Number of records that can wait to be written before `write`
+            blocks.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self.prompts_path = prompts_path
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self._schema = _parquet_schema(pa)
+        self._columns = {name: [] for name in self._schema.names}
+        self._headers = _Headers(PROMPT_FIELDS)
+        self._prompts = []
+        self._writer = pq.ParquetWriter(path, self._schema, compression=compression)
+        super().__init__(max_pending)
+
+    def _add(self, example):
+        shared, prompt_key, is_new = self._headers.split(example)
+        if is_new:
+            prompt = {field: shared.get(field) for field in PROMPT_FIELDS}
+            self._prompts.append({"prompt_key": prompt_key, **prompt})
+        self._columns["prompt_key"].append(prompt_key)
+        for name, (_, convert) in _PARQUET_COLUMNS.items():
+            self._columns[name].append(convert(example.get(name)))
+        extra = {
+            k: v
+            for k, v in example.items()
+            if k not in _PARQUET_COLUMNS and k not in shared
+        }
+        self._columns["extra"].append(json.dumps(extra) if extra else None)
+        if len(self._columns["prompt_key"]) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._columns["prompt_key"]:
+            table = self._pa.Table.from_pydict(self._columns, schema=self._schema)
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+            self._columns = {name: [] for name in self._schema.names}
+
+    def _finish(self, flush):
+        try:
+            if flush:
+                self._flush()
+                prompts = self._pa.Table.from_pylist(self._prompts)
+                self._pq.write_table(
+                    prompts, self.prompts_path, compression=self.compression
+                )
+        finally:
+            self._writer.close()
@@ -0,0 +1,233 @@
+"""
+Lightweight timing instrumentation of the stages of an evaluation.
+
+Code paths call `span` and `count`, which are no-ops unless a `Tracer` has been
+activated with `tracing`, e.g. by `evaluator.simple_evaluate`:
+
+    tracer = Tracer()
+    with tracing(tracer):
+        with span("process_results", task="boolq"):
+            ...
+        count("cache/loglikelihood", hits=10, misses=2)
+    tracer.summary()
+    tracer.write_chrome_trace("trace.json")
+
+It also defines the profiler hooks that can be registered on an `LM` with
+`LM.add_profiler_hook`, e.g. to time every batch or to attach `torch.profiler`.
+"""
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+class Tracer:
+    """Records the wall time and counters of every stage of an evaluation, and
+    the individual spans as Chrome trace events (see `chrome://tracing`).
+    """
+
+    def __init__(self, record_events=True):
+        """
+        :param record_events: bool
+            Whether to keep every span as a trace event for `chrome_trace`.
+            Without them, only the per-stage counters of `summary` are kept.
+        """
+        self.record_events = record_events
+        self.stages = collections.defaultdict(collections.Counter)
+        self.events = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, stage, **args):
+        """Times the enclosed block as one call of `stage`. `args` are attached
+        to its trace event, e.g. the task name or the batch shape.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.stages[stage]["wall_time_s"] += end - start
+                self.stages[stage]["calls"] += 1
+                if self.record_events:
+                    self.events.append(
+                        {
+                            "name": stage,
+                            "ph": "X",
+                            "ts": (start - self._start) * 1e6,
+                            "dur": (end - start) * 1e6,
+                            "pid": os.getpid(),
+                            "tid": threading.get_ident(),
+                            "args": args,
+                        }
+                    )
+
+    def count(self, stage, **counters):
+        """Adds `counters` (e.g. `tokens=...`) to the counters of `stage`."""
+        with self._lock:
+            self.stages[stage].update(counters)
+
+    def summary(self):
+        """Returns the counters of every stage, in the order the stages were
+        first recorded. Stages that counted `tokens` also report their
+        throughput, and those that counted `padded_tokens` the fraction of
+        non-padding tokens.
+        """
+        summary = {}
+        with self._lock:
+            for stage, counters in self.stages.items():
+                stage_summary = dict(counters)
+                wall_time = counters.get("wall_time_s", 0.0)
+                if "tokens" in counters and wall_time > 0:
+                    stage_summary["tokens_per_s"] = counters["tokens"] / wall_time
+                if counters.get("padded_tokens"):
+                    stage_summary["padding_efficiency"] = (
+                        counters["tokens"] / counters["padded_tokens"]
+                    )
+                summary[stage] = stage_summary
+        summary["total"] = {"wall_time_s": time.perf_counter() - self._start}
+        return summary
+
+    def chrome_trace(self):
+        with self._lock:
+            return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """Writes the spans as a Chrome trace JSON, viewable in `chrome://tracing`
+        or https://ui.perfetto.dev.
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+_active_tracer = None
+
+
+@contextlib.contextmanager
+def tracing(tracer):
+    """Activates `tracer` for the enclosed block."""
+    global _active_tracer
+    previous, _active_tracer = _active_tracer, tracer
+    try:
+        yield tracer
+    finally:
+        _active_tracer = previous
+
+
+def span(stage, **args):
+    """Times the enclosed block as `stage` on the active tracer, if any."""
+    if _active_tracer is None:
+        return contextlib.nullcontext()
+    return _active_tracer.span(stage, **args)
+
+
+def count(stage, **counters):
+    """Adds `counters` to `stage` on the active tracer, if any."""
+    if _active_tracer is not None:
+        _active_tracer.count(stage, **counters)
+
+
+# The events of `LM` profiler hooks that are a single batch of the model.
+BATCH_EVENTS = ("_model_call", "_model_generate")
+
+
+class ProfilerHook:
+    """Base class of the hooks that an `LM` calls around its hot paths, see
+    `LM.add_profiler_hook`.
+
+    `event` is the name of the method being entered or exited, e.g.
+    `_loglikelihood_tokens`, `greedy_until` or one of `BATCH_EVENTS`, and
+    `metadata` is the same dict on enter and exit: the `num_requests` of whole
+    calls, or the `shape` of the input of batches.
+    """
+
+    def enter(self, event, metadata):
+        pass
+
+    def exit(self, event, metadata):
+        pass
+
+
+class BatchTimer(ProfilerHook):
+    """Records the wall time of every batch of the model."""
+
+    def __init__(self):
+        self.records = []
+        self._starts = []
+
+    def enter(self, event, metadata):
+        self._starts.append(time.perf_counter())
+
+    def exit(self, event, metadata):
+        start = self._starts.pop()
+        if event in BATCH_EVENTS:
+            self.records.append(
+                {
+                    "batch": len(self.records),
+                    "event": event,
+                    **metadata,
+                    "time_s": time.perf_counter() - start,
+                }
+            )
+
+    def write(self, path):
+        """Writes the records as JSON lines."""
+        with open(path, "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+
+
+class TorchProfilerHook(ProfilerHook):
+    """Runs `torch.profiler` over the first `max_batches` batches of the model
+    and writes them to `path` as a Chrome trace, so that the trace stays small
+    however long the evaluation is.
+    """
+
+    def __init__(self, path, max_batches=1):
+        self.path = path
+        self.max_batches = max_batches
+        self.num_batches = 0
+        self._profiler = None
+        self._records = []
+
+    def enter(self, event, metadata):
+        if event not in BATCH_EVENTS:
+            return
+        if self.num_batches >= self.max_batches:
+            self._records.append(None)
+            return
+        import torch.profiler
+
+        if self._profiler is None:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(
+                activities=activities, record_shapes=True
+            )
+            self._profiler.__enter__()
+        record = torch.profiler.record_function(f"{event} {metadata.get('shape')}")
+        record.__enter__()
+        self._records.append(record)
+
+    def exit(self, event, metadata):
+        if event not in BATCH_EVENTS:
+            return
+        record = self._records.pop()
+        if record is None:
+            return
+        record.__exit__(None, None, None)
+        self.num_batches += 1
+        if self.num_batches >= self.max_batches:
+            self.close()
+
+    def close(self):
+        """Stops profiling, if still running, and writes the trace."""
+        if self._profiler is not None:
+            self._profiler.__exit__(None, None, None)
+            self._profiler.export_chrome_trace(self.path)
+            self._profiler = None
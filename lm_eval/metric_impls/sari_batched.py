@@ -0,0 +1,210 @@
+"""
+A batched implementation of SARI that gives the same scores as `sari.SARIsent`.
+
+Instead of building string n-grams and `Counter`s for every sentence, the
+sentences of a whole corpus are tokenized once into integer ids and their
+n-grams are counted with NumPy. Only the sums that `SARIsent` accumulates
+gram by gram are still added up in Python, in the same order, so that the
+floating-point results are identical.
+"""
+import numpy as np
+
+
+NGRAM_ORDER = 4
+
+# Kinds of sentences.
+_SOURCE, _CANDIDATE, _REFERENCE = 0, 1, 2
+
+
+def _f1(precision, recall):
+    if precision > 0 or recall > 0:
+        return 2 * precision * recall / (precision + recall)
+    return 0
+
+
+def _divide(total, num_grams):
+    return total / num_grams if num_grams > 0 else 0
+
+
+def _ratio(numerator, denominator, where):
+    return np.divide(
+        numerator, denominator, out=np.zeros(len(numerator)), where=where
+    )
+
+
+def _item_bounds(item_of_rows, num_items):
+    """Returns where the rows of every example start, given the sorted example
+    of every row.
+    """
+    return np.searchsorted(item_of_rows, np.arange(num_items + 1)).tolist()
+
+
+def _counts(keys):
+    """Returns the distinct `keys`, sorted, with their counts and the index of
+    their first occurrence.
+    """
+    unique, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    return unique, counts, first
+
+
+def _lookup(keys, unique, counts):
+    """Returns the count in `unique`/`counts` of each of `keys`, 0 if absent."""
+    if len(unique) == 0:
+        return np.zeros(len(keys), dtype=np.int64)
+    index = np.minimum(np.searchsorted(unique, keys), len(unique) - 1)
+    return np.where(unique[index] == keys, counts[index], 0)
+
+
+def _ngram_ids(tokens, segment_end, order):
+    """Yields, for each n-gram order, the dense id of the n-gram starting at
+    every position of `tokens`, or -1 where it would cross the end of its
+    sentence.
+    """
+    positions = np.arange(len(tokens))
+    ids = tokens
+    vocab_size = int(tokens.max()) + 1 if len(tokens) else 1
+    yield ids
+    for n in range(2, order + 1):
+        valid = positions + n - 1 < segment_end
+        keys = np.full(len(tokens), -1, dtype=np.int64)
+        keys[valid] = ids[valid] * vocab_size + tokens[positions[valid] + n - 1]
+        unique, inverse = np.unique(keys[valid], return_inverse=True)
+        ids = np.full(len(tokens), -1, dtype=np.int64)
+        ids[valid] = inverse
+        yield ids
+
+
+def sari_scores(sources, candidates, references):
+    """Computes `sari.SARIsent` of every example of a corpus.
+
+    :param sources: list[str]
+        The sentences to simplify.
+    :param candidates: list[str]
+        The simplified sentences.
+    :param references: list[list[str]]
+        The reference simplifications of every example.
+    :return: list[float]
+        The SARI score of every example.
+    """
+    num_items = len(sources)
+    num_refs = np.array([len(refs) for refs in references], dtype=np.int64)
+
+    # Tokenize every sentence once, into ids of a vocabulary shared by the corpus.
+    words, segment_item, segment_kind, segment_lengths = [], [], [], []
+    for item, (source, candidate, refs) in enumerate(
+        zip(sources, candidates, references)
+    ):
+        sentences = [(source, _SOURCE), (candidate, _CANDIDATE)]
+        sentences += [(ref, _REFERENCE) for ref in refs]
+        for sentence, kind in sentences:
+            sentence_words = sentence.lower().split(" ")
+            words.extend(sentence_words)
+            segment_item.append(item)
+            segment_kind.append(kind)
+            segment_lengths.append(len(sentence_words))
+    vocab = {word: i for i, word in enumerate(dict.fromkeys(words))}
+    tokens = np.fromiter(
+        map(vocab.__getitem__, words), dtype=np.int64, count=len(words)
+    )
+    segment_lengths = np.array(segment_lengths, dtype=np.int64)
+    position_segment = np.repeat(np.arange(len(segment_lengths)), segment_lengths)
+    position_item = np.array(segment_item, dtype=np.int64)[position_segment]
+    position_kind = np.array(segment_kind, dtype=np.int64)[position_segment]
+    segment_end = np.cumsum(segment_lengths)[position_segment]
+
+    keep_scores, del_scores, add_scores = [], [], []
+    for ids in _ngram_ids(tokens, segment_end, NGRAM_ORDER):
+        num_grams = int(ids.max()) + 1 if len(ids) else 1
+        valid = ids >= 0
+        # One key per (example, n-gram).
+        keys = position_item * num_grams + ids
+
+        counts = {}
+        for kind in [_SOURCE, _CANDIDATE, _REFERENCE]:
+            kind_keys = keys[valid & (position_kind == kind)]
+            counts[kind] = _counts(kind_keys)
+        s_keys, s_counts, s_first = counts[_SOURCE]
+        c_keys, c_counts, _ = counts[_CANDIDATE]
+        r_keys, r_counts, _ = counts[_REFERENCE]
+
+        # Source n-grams, in order of first occurrence like the `Counter`s of
+        # `SARIngram`, with their candidate and (all) reference counts.
+        s_sorted, s_sorted_counts = s_keys, s_counts
+        order = np.argsort(s_first, kind="stable")
+        s_keys, s_counts = s_keys[order], s_counts[order]
+        s_item = s_keys // num_grams
+        c_of_s = _lookup(s_keys, c_keys, c_counts)
+        r_of_s = _lookup(s_keys, r_keys, r_counts)
+        numref = num_refs[s_item]
+
+        s_rep, c_rep = s_counts * numref, c_of_s * numref
+        # KEEP
+        keep_rep = np.minimum(s_rep, c_rep)
+        keep_good = np.minimum(keep_rep, r_of_s)
+        keep_all = np.minimum(s_rep, r_of_s)
+        keep_kept = keep_good > 0
+        keep_ratio1 = _ratio(keep_good, keep_rep, keep_kept)
+        keep_ratio2 = _ratio(keep_good, keep_all, keep_kept)
+        # DELETION
+        del_rep = np.maximum(s_rep - c_rep, 0)
+        del_good = np.maximum(del_rep - r_of_s, 0)
+        del_kept = del_good > 0
+        del_ratio1 = _ratio(del_good, del_rep, del_kept)
+
+        def _per_item(mask):
+            return np.bincount(s_item[mask], minlength=num_items)
+
+        num_keep_rep = _per_item(keep_rep > 0).tolist()
+        num_keep_all = _per_item(keep_all > 0).tolist()
+        num_del_rep = _per_item(del_rep > 0).tolist()
+
+        # ADDITION, over the distinct candidate and reference n-grams.
+        c_in_s = _lookup(c_keys, s_sorted, s_sorted_counts) > 0
+        c_in_r = _lookup(c_keys, r_keys, r_counts) > 0
+        r_in_s = _lookup(r_keys, s_sorted, s_sorted_counts) > 0
+        c_item, r_item = c_keys // num_grams, r_keys // num_grams
+        num_add = np.bincount(c_item[~c_in_s], minlength=num_items).tolist()
+        num_add_good = np.bincount(
+            c_item[~c_in_s & c_in_r], minlength=num_items
+        ).tolist()
+        num_add_all = np.bincount(r_item[~r_in_s], minlength=num_items).tolist()
+
+        # The sums of the ratios are added up gram by gram as in `SARIngram`.
+        keep_ratio1, keep_ratio2 = (
+            keep_ratio1[keep_kept].tolist(),
+            keep_ratio2[keep_kept].tolist(),
+        )
+        del_ratio1 = del_ratio1[del_kept].tolist()
+        keep_bounds = _item_bounds(s_item[keep_kept], num_items)
+        del_bounds = _item_bounds(s_item[del_kept], num_items)
+        order_keep, order_del, order_add = [], [], []
+        for item in range(num_items):
+            start, end = keep_bounds[item], keep_bounds[item + 1]
+            keep_tmp1 = sum(keep_ratio1[start:end], 0)
+            keep_tmp2 = sum(keep_ratio2[start:end], 0)
+            del_tmp1 = sum(del_ratio1[del_bounds[item] : del_bounds[item + 1]], 0)
+
+            keep_precision = _divide(keep_tmp1, num_keep_rep[item])
+            keep_recall = _divide(keep_tmp2, num_keep_all[item])
+            order_keep.append(_f1(keep_precision, keep_recall))
+
+            # NOTE: Like `SARIngram`, only the precision of deletions is used,
+            # so the n-grams deleted from all references are not needed.
+            del_precision = _divide(del_tmp1, num_del_rep[item])
+            order_del.append(del_precision)
+
+            add_tmp = num_add_good[item]
+            add_precision = _divide(add_tmp, num_add[item])
+            add_recall = _divide(add_tmp, num_add_all[item])
+            order_add.append(_f1(add_precision, add_recall))
+        keep_scores.append(order_keep)
+        del_scores.append(order_del)
+        add_scores.append(order_add)
+
+    scores = []
+    for item in range(num_items):
+        avg_keep = sum([keep[item] for keep in keep_scores]) / NGRAM_ORDER
+        avg_del = sum([dele[item] for dele in del_scores]) / NGRAM_ORDER
+        avg_add = sum([add[item] for add in add_scores]) / NGRAM_ORDER
+        scores.append((avg_keep + avg_del + avg_add) / 3)
+    return scores
@@ -1,12 +1,19 @@
+import collections
+import contextlib
+import functools
 import typing
 import math
+from argparse import Namespace
 from collections.abc import Iterable
 import numpy as np
 import sacrebleu
 from rouge_score import rouge_scorer
+from nltk.stem import porter
 import sklearn.metrics
 import random
+from lm_eval import utils
 from lm_eval.metric_impls import sari as sari_impl
+from lm_eval.metric_impls import sari_batched
 
 
 def mean(arr):
@@ -153,6 +160,21 @@ def sari(sentence_to_simplifiy, generated_sentence, references):
     return sari_impl.SARIsent(sentence_to_simplifiy, generated_sentence, references)
 
 
+def sari_batch(items):
+    """Scores many examples with `sari`, all at once with the batched
+    implementation, which gives the same scores.
+
+    :param items:
+        A `list` of `(sentence_to_simplifiy, generated_sentence, references)`.
+    :return:
+        The `sari` scores of every item, in order.
+    """
+    if not items:
+        return []
+    sources, candidates, references = zip(*items)
+    return sari_batched.sari_scores(sources, candidates, references)
+
+
 def bleu(items):
     """The Bilingual Evaluation Understudy Score, or BLEU for short, is a metric
     for evaluating a generated sentence to a reference sentence. It counts matching
@@ -231,10 +253,46 @@ def _sacreformat(refs, preds):
     return refs, preds
 
 
+ROUGE_TYPES = ("rouge1", "rouge2", "rougeL", "rougeLsum")
+
+
+class _CachingStemmer:
+    """A Porter stemmer that memoizes the stem of every token, as tokens recur
+    across the examples of a task and stemming dominates the cost of ROUGE.
+    """
+
+    def __init__(self):
+        self._stemmer = porter.PorterStemmer()
+        self._stems = {}
+
+    def stem(self, token):
+        stem = self._stems.get(token)
+        if stem is None:
+            stem = self._stems[token] = self._stemmer.stem(token)
+        return stem
+
+
+_rouge_scorers = {}
+
+
+def _get_rouge_scorer(rouge_types):
+    """Returns the scorer of `rouge_types`, which is created once per process."""
+    rouge_types = tuple(rouge_types)
+    scorer = _rouge_scorers.get(rouge_types)
+    if scorer is None:
+        scorer = rouge_scorer.RougeScorer(rouge_types=list(rouge_types), use_stemmer=True)
+        # The stemmer is held by the tokenizer of the scorer since rouge-score
+        # 0.1.0, and by the scorer itself before.
+        stemmer_owner = getattr(scorer, "_tokenizer", scorer)
+        stemmer_owner._stemmer = _CachingStemmer()
+        _rouge_scorers[rouge_types] = scorer
+    return scorer
+
+
 def rouge(
     refs: typing.List[str],
     pred: str,
-    rouge_types: typing.List[str] = ["rouge1", "rouge2", "rougeL", "rougeLsum"],
+    rouge_types: typing.Sequence[str] = ROUGE_TYPES,
 ):
     """ROUGE with multi-reference support
 
@@ -245,6 +303,8 @@ def rouge(
         A `list` of reference `str`s.
     :param pred:
         A single prediction `str`s.
+    :param rouge_types:
+        The ROUGE sub-metrics to compute, out of `ROUGE_TYPES`.
     """
 
     # Add newlines between sentences to correctly compute `rougeLsum`.
@@ -255,7 +315,7 @@ def rouge(
         pred = pred.replace(".", ".\n")
         refs = [ref.replace(".", ".\n") for ref in refs]
 
-    scorer = rouge_scorer.RougeScorer(rouge_types=rouge_types, use_stemmer=True)
+    scorer = _get_rouge_scorer(rouge_types)
     # ROUGE multi-ref jackknifing
     if len(refs) > 1:
         cur_scores = [scorer.score(ref, pred) for ref in refs]
@@ -298,6 +358,122 @@ def rouge(
     return score
 
 
+class _rouge_internal:
+    def __init__(self, rouge_types):
+        self.rouge_types = rouge_types
+
+    def __call__(self, item):
+        refs, pred = item
+        return rouge(refs, pred, self.rouge_types)
+
+
+def rouge_batch(items, rouge_types=ROUGE_TYPES, parallel=True, chunksize=64):
+    """Scores many examples with `rouge`, in the worker pool if `parallel`.
+
+    :param items:
+        A `list` of `(refs, pred)` pairs, as passed to `rouge`.
+    :return:
+        The `rouge` scores of every item, in order.
+    """
+    return _map_in_pool(_rouge_internal(tuple(rouge_types)), items, parallel, chunksize)
+
+
+class DeferredMetric:
+    """A metric value that `process_results` leaves for `evaluate` to compute
+    once all the docs are processed, in a single call of `batch_fn` with the
+    items of every doc, e.g. to score them in parallel.
+
+    Its value replaces it in the metrics of the doc, except for dict values
+    (e.g. the sub-metrics of ROUGE), which are flattened and merged into them.
+    """
+
+    def __init__(self, batch_fn, item, **kwargs):
+        """
+        :param batch_fn:
+            A picklable function taking a `list` of items, and `kwargs`, and
+            returning the value of every item, e.g. `rouge_batch`.
+        :param item:
+            The item of this doc.
+        :param kwargs:
+            Keyword arguments of `batch_fn`. Items with different `kwargs` are
+            computed in separate batches.
+        """
+        self.batch_fn = batch_fn
+        self.item = item
+        self.kwargs = kwargs
+
+    def batch_key(self):
+        return self.batch_fn, tuple(sorted(self.kwargs.items()))
+
+
+def compute_deferred(doc_metrics):
+    """Computes the `DeferredMetric` values of the metrics of many docs, batched
+    by `DeferredMetric.batch_key`.
+
+    :param doc_metrics:
+        A `list` of the metrics dicts returned by `process_results`.
+    :return:
+        The metrics dicts with the deferred values computed, in order.
+    """
+    batches = collections.defaultdict(list)
+    for i, metrics in enumerate(doc_metrics):
+        for name, value in metrics.items():
+            if isinstance(value, DeferredMetric):
+                batches[value.batch_key()].append((i, name))
+
+    values = {}
+    for (batch_fn, kwargs), locations in batches.items():
+        items = [doc_metrics[i][name].item for i, name in locations]
+        values.update(zip(locations, batch_fn(items, **dict(kwargs))))
+
+    if not values:
+        return doc_metrics
+    computed = []
+    for i, metrics in enumerate(doc_metrics):
+        out = {}
+        for name, value in metrics.items():
+            if (i, name) not in values:
+                out[name] = value
+            elif isinstance(values[(i, name)], dict):
+                out.update(utils.flatten(values[(i, name)]))
+            else:
+                out[name] = values[(i, name)]
+        computed.append(out)
+    return computed
+
+
+def shared_aggregation(fn):
+    """Decorates `fn(*args, items)`, a computation shared by several
+    aggregations of a task, so that consecutive calls for the same items only
+    compute it once.
+
+    `evaluate` gives each metric its own list of per-doc values, so the items
+    are the same when they are lists of the very same objects, i.e. when
+    `process_results` returns the same object as the value of all the metrics
+    that share the computation. The other `args` (e.g. `self`) must be the same
+    objects too.
+    """
+    last_args, last_items, last_result = None, None, None
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        nonlocal last_args, last_items, last_result
+        *other_args, items = args
+        if not (
+            last_items is not None
+            and len(other_args) == len(last_args)
+            and all(a is b for a, b in zip(other_args, last_args))
+            and len(items) == len(last_items)
+            and all(a is b for a, b in zip(items, last_items))
+        ):
+            last_result = fn(*args)
+            # The items are kept alive, so that their ids are not reused.
+            last_args, last_items = other_args, list(items)
+        return last_result
+
+    return wrapper
+
+
 # stderr stuff
 
 
@@ -307,45 +483,449 @@ class _bootstrap_internal:
         self.n = n
 
     def __call__(self, v):
-        i, xs = v
+        seeds, xs = v
         rnd = random.Random()
-        rnd.seed(i)
         res = []
-        for _ in range(self.n):
-            res.append(self.f(rnd.choices(xs, k=len(xs))))
+        for i in seeds:
+            rnd.seed(i)
+            for _ in range(self.n):
+                res.append(self.f(rnd.choices(xs, k=len(xs))))
         return res
 
 
-def bootstrap_stderr(f, xs, iters):
+# The worker pool, as a `Future` as it is started in the background.
+_pool = None
+_pool_processes = None
+
+
+def _default_start_method():
     import multiprocessing as mp
 
-    pool = mp.Pool(mp.cpu_count())
+    # Unlike `fork`, the workers do not inherit a copy of the parent, e.g. of
+    # a loaded model and datasets.
+    if "forkserver" in mp.get_all_start_methods():
+        return "forkserver"
+    return "spawn"
+
+
+def start_pool(processes=None, start_method=None):
+    """Starts the worker pool of the metrics computed in parallel (e.g. the
+    non-vectorized bootstraps and ROUGE) in the background, unless it is
+    already running.
+
+    It is meant to be started once per run, before the model is loaded (see
+    `evaluator.simple_evaluate`), and reused by every task and metric until
+    `close_pool`. As the workers are not forked from the current process, the
+    main module must be guarded by `if __name__ == "__main__":`.
+
+    :param processes: int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    :param start_method: str, optional
+        The `multiprocessing` start method of the workers. Defaults to
+        `forkserver`, or `spawn` where it is not available.
+    """
+    import concurrent.futures
+    import multiprocessing as mp
+    import threading
+
+    global _pool, _pool_processes
+    if _pool is not None:
+        return
+    start_method = start_method or _default_start_method()
+    context = mp.get_context(start_method)
+    if start_method == "forkserver":
+        # The workers are forked from a server that already imported the metrics.
+        context.set_forkserver_preload(["lm_eval.metrics"])
+    _pool_processes = processes or mp.cpu_count()
+    _pool = concurrent.futures.Future()
+
+    def start(future):
+        try:
+            future.set_result(context.Pool(_pool_processes))
+        except BaseException as e:
+            future.set_exception(e)
+
+    # Importing the metrics in the workers takes a few seconds, which overlap
+    # with e.g. loading the model.
+    threading.Thread(target=start, args=(_pool,), daemon=True).start()
+
+
+def _get_pool():
+    """Returns the worker pool, started with the defaults of `start_pool` if
+    it is not running yet.
+    """
+    start_pool()
+    return _pool.result()
+
+
+def _map_in_pool(fn, items, parallel, chunksize):
+    if not parallel or len(items) <= chunksize:
+        return [fn(item) for item in items]
+    return _get_pool().map(fn, items, chunksize=chunksize)
+
+
+def close_pool():
+    """Shuts down the worker pool, if it is running."""
+    global _pool, _pool_processes
+    if _pool is not None:
+        future, _pool, _pool_processes = _pool, None, None
+        # Nothing to shut down if the pool failed to start.
+        if future.exception() is None:
+            pool = future.result()
+            pool.close()
+            pool.join()
+
+
+@contextlib.contextmanager
+def worker_pool(processes=None, start_method=None):
+    """Runs the enclosed block with the worker pool started, see `start_pool`,
+    and shuts it down afterwards.
+    """
+    start_pool(processes, start_method)
+    try:
+        yield
+    finally:
+        close_pool()
+
+
+def _mean_statistics(items):
+    return np.asarray(items, dtype=np.float64)[:, None]
+
+
+def _weighted_statistics(items):
+    return np.asarray(items, dtype=np.float64).reshape(-1, 2)
+
+
+def _f1_statistics(items):
+    golds, preds = zip(*items)
+    if not set(golds) | set(preds) <= {0, 1}:
+        # Not binary: left to `sklearn`.
+        return None
+    golds = np.asarray(golds, dtype=bool)
+    preds = np.asarray(preds, dtype=bool)
+    return np.stack([golds & preds, ~golds & preds, golds & ~preds], axis=1).astype(
+        np.float64
+    )
+
+
+def _f1_from_sums(sums, n):
+    tp, fp, fn = sums.T
+    denominator = 2 * tp + fp + fn
+    # `sklearn` scores 0 when there are no positives at all.
+    return np.divide(
+        2 * tp, denominator, out=np.zeros_like(tp), where=denominator > 0
+    )
+
+
+def _confusion_statistics(items, max_labels=10):
+    golds, preds = zip(*items)
+    try:
+        labels = sorted(set(golds) | set(preds))
+    except TypeError:
+        return None
+    if len(labels) > max_labels:
+        return None
+    index = {label: i for i, label in enumerate(labels)}
+    cells = np.array([index[g] * len(labels) + index[p] for g, p in items])
+    # One column per cell of the confusion matrix.
+    return np.eye(len(labels) ** 2)[cells]
+
+
+def _mcc_from_sums(sums, n):
+    num_labels = int(round(math.sqrt(sums.shape[1])))
+    confusion = sums.reshape(-1, num_labels, num_labels)
+    # Same formula as `sklearn.metrics.matthews_corrcoef`.
+    t_sum = confusion.sum(axis=2)
+    p_sum = confusion.sum(axis=1)
+    correct = np.trace(confusion, axis1=1, axis2=2)
+    cov_ytyp = correct * n - (t_sum * p_sum).sum(axis=1)
+    cov_ypyp = n ** 2 - (p_sum * p_sum).sum(axis=1)
+    cov_ytyt = n ** 2 - (t_sum * t_sum).sum(axis=1)
+    denominator = np.sqrt(cov_ytyt * cov_ypyp)
+    return np.divide(
+        cov_ytyp, denominator, out=np.zeros_like(cov_ytyp), where=denominator > 0
+    )
+
+
+def _sentence_references(items):
+    """Yields the prediction and the references of every item, as `bleu`,
+    `chrf` and `ter` pass them to `sacrebleu`.
+    """
+    refs = list(zip(*items))[0]
+    preds = list(zip(*items))[1]
+    refs, preds = _sacreformat(refs, preds)
+    for i, pred in enumerate(preds):
+        yield pred, [ref_stream[i] for ref_stream in refs]
+
+
+def _bleu_statistics(items):
+    stats = []
+    for pred, refs in _sentence_references(items):
+        # The statistics of a sentence are those of a corpus of that sentence.
+        score = sacrebleu.corpus_bleu([pred], [[ref] for ref in refs])
+        stats.append(score.counts + score.totals + [score.sys_len, score.ref_len])
+    return np.asarray(stats, dtype=np.float64)
+
+
+def _bleu_from_sums(sums, n):
+    # Same as `sacrebleu.BLEU.compute_bleu` with the defaults of `corpus_bleu`:
+    # "exp" smoothing and no effective order.
+    order = sacrebleu.BLEU.NGRAM_ORDER
+    correct, total = sums[:, :order], sums[:, order : 2 * order]
+    sys_len, ref_len = sums[:, 2 * order], sums[:, 2 * order + 1]
+    log_precisions = np.zeros(len(sums))
+    smooth_mteval = np.ones(len(sums))
+    defined = np.ones(len(sums), dtype=bool)
+    for i in range(order):
+        # Orders from the first one without any n-gram on have a precision of 0.
+        defined &= total[:, i] > 0
+        safe_total = np.where(defined, total[:, i], 1)
+        no_match = defined & (correct[:, i] == 0)
+        smooth_mteval = np.where(no_match, smooth_mteval * 2, smooth_mteval)
+        precision = np.where(
+            no_match, 100.0 / (smooth_mteval * safe_total), 100.0 * correct[:, i] / safe_total
+        )
+        log_precisions += np.where(defined, np.log(np.where(defined, precision, 1)), -9999999999)
+    brevity_penalty = np.ones(len(sums))
+    short = sys_len < ref_len
+    brevity_penalty[short] = np.where(
+        sys_len[short] > 0, np.exp(1 - ref_len[short] / np.maximum(sys_len[short], 1)), 0.0
+    )
+    return brevity_penalty * np.exp(log_precisions / order)
+
+
+def _chrf_statistics(items):
+    # The defaults of `sacrebleu.corpus_chrf`.
+    scorer = sacrebleu.CHRF(
+        Namespace(
+            chrf_order=sacrebleu.CHRF.ORDER,
+            chrf_beta=sacrebleu.CHRF.BETA,
+            chrf_whitespace=False,
+            short=False,
+        )
+    )
+    return np.asarray(
+        [scorer.get_sentence_statistics(pred, refs) for pred, refs in _sentence_references(items)],
+        dtype=np.float64,
+    )
+
+
+def _chrf_from_sums(sums, n):
+    # Same as `sacrebleu.CHRF.compute_chrf`.
+    hyp_ngrams, ref_ngrams, common_ngrams = sums[:, 0::3], sums[:, 1::3], sums[:, 2::3]
+    defined = (hyp_ngrams > 0) & (ref_ngrams > 0)
+    precision = np.where(defined, common_ngrams / np.where(defined, hyp_ngrams, 1), 0).sum(axis=1)
+    recall = np.where(defined, common_ngrams / np.where(defined, ref_ngrams, 1), 0).sum(axis=1)
+    effective_order = np.maximum(defined.sum(axis=1), 1)
+    precision, recall = precision / effective_order, recall / effective_order
+    beta_square = sacrebleu.CHRF.BETA ** 2
+    denominator = beta_square * precision + recall
+    return np.divide(
+        (1 + beta_square) * precision * recall,
+        denominator,
+        out=np.zeros_like(denominator),
+        where=precision + recall > 0,
+    )
+
+
+def _ter_statistics(items):
+    stats = []
+    for pred, refs in _sentence_references(items):
+        score = sacrebleu.corpus_ter([pred], [[ref] for ref in refs])
+        stats.append([score.num_edits, score.ref_length])
+    return np.asarray(stats, dtype=np.float64)
+
+
+def _ter_from_sums(sums, n):
+    num_edits, ref_length = sums[:, 0], sums[:, 1]
+    return np.divide(num_edits, ref_length, out=np.ones_like(num_edits), where=ref_length > 0)
+
+
+# Metrics that are a function of sums of per-item statistics, which are
+# bootstrapped with NumPy rather than by calling the metric on every resample:
+# metric -> (per-item statistics, or None if not applicable; metric from sums)
+_VECTORIZED_BOOTSTRAP = {
+    mean: (_mean_statistics, lambda sums, n: sums[:, 0] / n),
+    perplexity: (_mean_statistics, lambda sums, n: np.exp(-sums[:, 0] / n)),
+    weighted_perplexity: (
+        _weighted_statistics,
+        lambda sums, n: np.exp(-sums[:, 0] / sums[:, 1]),
+    ),
+    bits_per_byte: (
+        _weighted_statistics,
+        lambda sums, n: -sums[:, 0] / sums[:, 1] / math.log(2),
+    ),
+    f1_score: (_f1_statistics, _f1_from_sums),
+    matthews_corrcoef: (_confusion_statistics, _mcc_from_sums),
+    # The corpus-level statistics of BLEU, chrF and TER are sums of those of
+    # the sentences, so the sentences are only scored once.
+    bleu: (_bleu_statistics, _bleu_from_sums),
+    chrf: (_chrf_statistics, _chrf_from_sums),
+    ter: (_ter_statistics, _ter_from_sums),
+}
+
+# Upper bound on the size of the index matrices of the vectorized bootstrap.
+_MAX_BOOTSTRAP_ELEMENTS = 2 ** 22
+
+
+def _bootstrap_indices(n, iters):
+    """Yields the indices of the bootstrap resamples of `n` items as [rows, n]
+    matrices. They are drawn from the same seeds and Mersenne Twister streams as
+    `random.Random.choices` in `_bootstrap_internal`, so both bootstraps resample
+    the same items.
+    """
+    chunk_size = min(1000, iters)
+    rows = max(1, min(chunk_size, _MAX_BOOTSTRAP_ELEMENTS // n))
+    for i in range(iters // chunk_size):
+        # Seeds the same state as `random.Random().seed(i)`.
+        rs = np.random.RandomState([i])
+        for start in range(0, chunk_size, rows):
+            size = min(rows, chunk_size - start)
+            yield (rs.random_sample((size, n)) * n).astype(np.int64)
+
+
+def _vectorized_bootstrap(stats, from_sums, iters):
+    n = len(stats)
+    res = []
+    for indices in _bootstrap_indices(n, iters):
+        sums = np.stack([column[indices].sum(axis=1) for column in stats.T], axis=1)
+        res.append(from_sums(sums, n))
+    return np.concatenate(res)
+
+
+def bootstrap_stderr(f, xs, iters):
     # this gives a biased estimate of the stderr (i.e w/ the mean, it gives something
     # equivalent to stderr calculated without Bessel's correction in the stddev.
     # Unfortunately, I haven't been able to figure out what the right correction is
     # to make the bootstrap unbiased - i considered multiplying by sqrt(n/(n-1)) but
     # that would be ad-hoc and I can't prove that that would actually be an unbiased estimator)
     # Thankfully, shouldn't matter because our samples are pretty big usually anyways
-    res = []
-    chunk_size = min(1000, iters)
+    print("bootstrapping for stddev:", f.__name__)
+    if f in _VECTORIZED_BOOTSTRAP:
+        statistics, from_sums = _VECTORIZED_BOOTSTRAP[f]
+        stats = statistics(xs)
+        if stats is not None:
+            return float(np.std(_vectorized_bootstrap(stats, from_sums, iters), ddof=1))
+
     from tqdm import tqdm
 
-    print("bootstrapping for stddev:", f.__name__)
+    pool = _get_pool()
+    chunk_size = min(1000, iters)
+    # Each worker is sent the items once, with a share of the chunks' seeds.
+    seeds = list(range(iters // chunk_size))
+    num_tasks = min(len(seeds), _pool_processes)
+    res = []
     for bootstrap in tqdm(
         pool.imap(
             _bootstrap_internal(f, chunk_size),
-            [(i, xs) for i in range(iters // chunk_size)],
+            [(seeds[i::num_tasks], xs) for i in range(num_tasks)],
         ),
-        total=iters // chunk_size,
+        total=num_tasks,
     ):
         # sample w replacement
         res.extend(bootstrap)
 
-    pool.close()
     return sample_stddev(res)
 
 
-def stderr_for_metric(metric, bootstrap_iters):
+def _ratio_stderr(numerators, denominators):
+    """The delta-method stderr of the ratio estimator `sum(numerators) /
+    sum(denominators)`, with the same Bessel's correction as `mean_stderr`.
+    """
+    a = np.asarray(numerators, dtype=np.float64)
+    b = np.asarray(denominators, dtype=np.float64)
+    n = len(a)
+    if n < 2 or b.sum() == 0:
+        return 0.0
+    residuals = a - a.sum() / b.sum() * b
+    return math.sqrt((residuals ** 2).sum() / (n * (n - 1))) / b.mean()
+
+
+def perplexity_stderr(items):
+    return perplexity(items) * mean_stderr(items)
+
+
+def weighted_perplexity_stderr(items):
+    a, b = zip(*items)
+    return weighted_perplexity(items) * _ratio_stderr(a, b)
+
+
+def bits_per_byte_stderr(items):
+    a, b = zip(*items)
+    return _ratio_stderr(a, b) / math.log(2)
+
+
+def f1_score_stderr(items):
+    """The delta-method stderr of the binary `f1_score`, i.e. of the ratio
+    2 TP / (2 TP + FP + FN), or None if the labels are not binary.
+    """
+    stats = _f1_statistics(items)
+    if stats is None:
+        return None
+    tp, fp, fn = stats.T
+    return _ratio_stderr(2 * tp, 2 * tp + fp + fn)
+
+
+def matthews_corrcoef_stderr(items):
+    """The delta-method stderr of `matthews_corrcoef`, from its gradient with
+    respect to the counts of the confusion matrix, or None if there are too
+    many labels.
+    """
+    stats = _confusion_statistics(items)
+    if stats is None:
+        return None
+    n = len(items)
+    num_labels = int(round(math.sqrt(stats.shape[1])))
+    confusion = stats.sum(axis=0).reshape(num_labels, num_labels)
+    # Same formula as `sklearn.metrics.matthews_corrcoef`.
+    t_sum = confusion.sum(axis=1)
+    p_sum = confusion.sum(axis=0)
+    correct = np.trace(confusion)
+    cov_ytyp = correct * n - (t_sum * p_sum).sum()
+    cov_ypyp = n ** 2 - (p_sum * p_sum).sum()
+    cov_ytyt = n ** 2 - (t_sum * t_sum).sum()
+    if n < 2 or cov_ypyp * cov_ytyt == 0:
+        return 0.0
+    mcc = cov_ytyp / math.sqrt(cov_ytyt * cov_ypyp)
+    # Derivatives with respect to one more item of gold label g (rows) and
+    # predicted label p (columns), which also increments n.
+    d_ytyp = np.eye(num_labels) * n + correct - p_sum[:, None] - t_sum[None, :]
+    d_ypyp = np.broadcast_to(2 * n - 2 * p_sum[None, :], d_ytyp.shape)
+    d_ytyt = np.broadcast_to(2 * n - 2 * t_sum[:, None], d_ytyp.shape)
+    gradient = d_ytyp / math.sqrt(cov_ytyt * cov_ypyp) - mcc / 2 * (
+        d_ypyp / cov_ypyp + d_ytyt / cov_ytyt
+    )
+    # The metric does not depend on the scale of the counts, so the influence
+    # of every item, n * gradient, averages to 0 over the items.
+    return math.sqrt((confusion * gradient ** 2).sum() * n / (n - 1))
+
+
+# Closed-form or delta-method stderrs of the metrics that are otherwise
+# bootstrapped. They return None when they do not apply to the items, e.g.
+# `f1_score` of non-binary labels, which are then bootstrapped.
+_ANALYTICAL_STDERR = {
+    perplexity: perplexity_stderr,
+    weighted_perplexity: weighted_perplexity_stderr,
+    bits_per_byte: bits_per_byte_stderr,
+    f1_score: f1_score_stderr,
+    matthews_corrcoef: matthews_corrcoef_stderr,
+}
+
+STDERR_METHODS = ("bootstrap", "analytical")
+
+
+def stderr_for_metric(metric, bootstrap_iters, stderr_method="bootstrap"):
+    """Returns the function computing the stderr of `metric` from its items, or
+    None if it has none.
+
+    :param stderr_method: str
+        `bootstrap` to bootstrap the metrics that have no closed-form stderr,
+        or `analytical` to use the closed-form or delta-method estimates of
+        `perplexity`, `f1_score` and `matthews_corrcoef` instead, which are
+        much cheaper. `analytical` also reports the stderrs of
+        `weighted_perplexity` and `bits_per_byte`, which have none by default.
+    """
+    assert stderr_method in STDERR_METHODS, f"Unknown stderr method: {stderr_method}"
     bootstrappable = [
         median,
         matthews_corrcoef,
@@ -356,6 +936,17 @@ def stderr_for_metric(metric, bootstrap_iters):
         ter,
     ]
 
+    if stderr_method == "analytical" and metric in _ANALYTICAL_STDERR:
+        analytical_stderr = _ANALYTICAL_STDERR[metric]
+
+        def stderr(items):
+            value = analytical_stderr(items)
+            if value is None:
+                return bootstrap_stderr(metric, items, iters=bootstrap_iters)
+            return value
+
+        return stderr
+
     if metric in bootstrappable:
         return lambda x: bootstrap_stderr(metric, x, iters=bootstrap_iters)
 
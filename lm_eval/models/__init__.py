@@ -1,11 +1,15 @@
 from . import dummy
 from . import openai_completions
 from . import huggingface
+from . import http_completions
+from . import ngram
 
 MODEL_REGISTRY = {
     "hf-causal": huggingface.AutoCausalLM,
     "hf-seq2seq": huggingface.AutoSeq2SeqLM,
     "openai": openai_completions.OpenAICompletionsLM,
+    "http-completions": http_completions.HTTPCompletionsLM,
+    "ngram": ngram.NGramLM,
     "dummy": dummy.DummyLM,
 }
 
@@ -0,0 +1,165 @@
+import os
+import random
+import time
+import requests
+import transformers
+from typing import Optional
+from lm_eval.base import BaseLM
+from lm_eval.models.openai_completions import OpenAICompletionsLM
+
+
+class HTTPCompletionsLM(OpenAICompletionsLM):
+    """
+    Implements the BaseLM interface for any server exposing an OpenAI-compatible
+    Completions endpoint (e.g. a local inference server), over a pooled
+    keep-alive HTTP session.
+    See: https://beta.openai.com/docs/api-reference/completions
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "http://localhost:8000/v1",
+        tokenizer: str = "gpt2",
+        max_length: int = 2048,
+        api_key_env: str = "OPENAI_API_KEY",
+        device=None,
+        batch_size: int = 20,
+        max_gen_toks: int = 256,
+        parallelize=False,
+        max_concurrency: int = 1,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 6,
+        retry_backoff: float = 3.0,
+        max_tokens_budget: Optional[int] = None,
+        cost_per_1k_tokens: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        timeout: float = 600.0,
+    ):
+        """
+
+        :param model: str
+            Name of the model served by the endpoint
+        :param base_url: str
+            Base URL of the API; requests are sent to `{base_url}/completions`
+        :param tokenizer: str
+            Name or path of the HuggingFace tokenizer matching the served model
+        :param max_length: int
+            Maximum number of tokens the served model accepts
+        :param api_key_env: str
+            Environment variable holding the API key, if the server needs one
+        :param max_concurrency: int
+            Maximum number of batched API requests in flight at once, and the
+            number of pooled connections kept alive.
+        :param requests_per_minute: float, optional
+            Maximum number of API requests sent per minute.
+        :param tokens_per_minute: float, optional
+            Maximum number of prompt and completion tokens sent per minute.
+        :param max_retries: int
+            Number of times a failed API request is retried before giving up.
+        :param retry_backoff: float
+            Initial back-off, in seconds, between retries of a failed request.
+        :param max_tokens_budget: int, optional
+            Maximum number of prompt and completion tokens to spend; no request
+            that could exceed it is sent.
+        :param cost_per_1k_tokens: float, optional
+            Price of 1000 tokens, used to report the cost of the run.
+        :param max_cost: float, optional
+            Maximum cost to spend, in the unit of `cost_per_1k_tokens`.
+        :param timeout: float
+            Timeout, in seconds, of a single API request.
+        """
+        BaseLM.__init__(self)
+
+        assert device is None, "Cannot specify `device` - the model is only accessible through its API."
+        assert parallelize == False, "Cannot specify `parallelize` - the model is only accessible through its API."
+
+        self.engine = model
+        self.base_url = base_url.rstrip("/")
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(tokenizer)
+        self.vocab_size = self.tokenizer.vocab_size
+
+        self._max_length = max_length
+        self._max_gen_toks = max_gen_toks
+        self._batch_size = batch_size
+
+        self._init_dispatch(
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            max_tokens_budget=max_tokens_budget,
+            cost_per_1k_tokens=cost_per_1k_tokens,
+            max_cost=max_cost,
+        )
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=max_concurrency
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        api_key = os.environ.get(api_key_env)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    @property
+    def max_length(self):
+        return self._max_length
+
+    def _completion(self, **kwargs):
+        """Sends a completion request, retrying connection errors, rate limits
+        and server errors with jittered exponential back-off.
+        """
+        backoff_time = self.retry_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/completions",
+                    json={"model": self.engine, **kwargs},
+                    timeout=self.timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                import traceback
+                traceback.print_exc()
+            else:
+                retryable = response.status_code == 429 or response.status_code >= 500
+                if not retryable or attempt == self.max_retries:
+                    response.raise_for_status()
+                    result = response.json()
+                    # Servers may return the choices of a batch in any order.
+                    result["choices"].sort(key=lambda choice: choice["index"])
+                    return result
+                print(f"Retrying completion request: HTTP {response.status_code}")
+            self._on_retry()
+            time.sleep(backoff_time * random.uniform(0.5, 1.5))
+            backoff_time *= 1.5
+
+    def _model_call(self, inps):
+        return self._completion(
+            prompt=inps,
+            echo=True,
+            max_tokens=0,
+            temperature=0.,
+            logprobs=5,
+        )
+
+    def _model_generate(self, context, max_length, stopping_criteria_ids, num_fewshot):
+        # NOTE: The stopping sequences are sent as strings, as with the OpenAI API.
+        stop = [self.eot_token] if num_fewshot == 0 else stopping_criteria_ids
+        return self._completion(
+            prompt=context,
+            max_tokens=max_length,
+            temperature=0.,
+            logprobs=5,
+            stop=stop,
+        )
+
+    def close(self):
+        """Closes the pooled HTTP connections."""
+        self.session.close()
@@ -1,11 +1,49 @@
+import functools
 import math
+import queue
+import traceback
 import transformers
 import torch
+import torch.multiprocessing as mp
 import torch.nn.functional as F
 from tqdm import tqdm
+from typing import List, Optional, Union
 
-from lm_eval.base import BaseLM
-from lm_eval import utils
+from lm_eval.base import BaseLM, profiled
+from lm_eval import instrumentation, utils
+
+
+_DTYPES = {
+    "float32": torch.float32,
+    "fp32": torch.float32,
+    "bfloat16": torch.bfloat16,
+    "bf16": torch.bfloat16,
+    "float16": torch.float16,
+    "fp16": torch.float16,
+    "half": torch.float16,
+}
+
+
+def _get_dtype(dtype: Union[str, torch.dtype]) -> torch.dtype:
+    """Converts a `dtype` string such as "bf16" into a `torch.dtype`."""
+    if isinstance(dtype, torch.dtype):
+        return dtype
+    assert dtype in _DTYPES, f"Unsupported dtype {dtype}; choose one of {list(_DTYPES)}."
+    return _DTYPES[dtype]
+
+
+def _dispatch_to_replicas(fn):
+    """Runs the wrapped request method on the data-parallel replicas of the
+    model, if any, instead of in the current process.
+    """
+
+    @functools.wraps(fn)
+    def _wrapper(self, requests):
+        if self._replicas is None:
+            return fn(self, requests)
+        return self._replicas.run(fn.__name__, requests, self.batch_size)
+
+    return _wrapper
 
 
 class HuggingFaceAutoLM(BaseLM):
@@ -23,19 +61,68 @@ class HuggingFaceAutoLM(BaseLM):
         batch_size: int = 1,
         max_gen_toks: int = 256,
         parallelize: bool = False,
+        data_parallel: int = 1,
+        dtype: Optional[Union[str, torch.dtype]] = None,
+        quantization: Optional[str] = None,
+        low_cpu_mem_usage: bool = False,
+        device_map: Optional[str] = None,
+        use_safetensors: Optional[bool] = None,
     ):
+        """
+        :param half: bool
+            Whether to run the model in float16. Ignored when `dtype` is given
+            and on the CPU, where float16 inference is not supported.
+        :param dtype: str, optional
+            The dtype to run the model in: "float32" (or "fp32"), "bfloat16"
+            (or "bf16") or "float16" (or "fp16").
+        :param quantization: str, optional
+            "int8" to apply dynamic int8 quantization to the model's
+            `torch.nn.Linear` layers. Only supported on the CPU in float32.
+            NOTE: GPT-2 style models implement their projections with
+            `transformers.Conv1D` rather than `torch.nn.Linear` and are left
+            mostly unquantized.
+        :param low_cpu_mem_usage: bool
+            Whether to load the weights without first materializing a randomly
+            initialized copy of the model in CPU memory. Requires `accelerate`.
+        :param device_map: str, optional
+            A `from_pretrained` device map (e.g. "auto") that places the weights
+            directly on their devices while loading, instead of moving the
+            model to `device` afterwards. Requires `accelerate`.
+        :param use_safetensors: bool, optional
+            Whether to load the weights from memory-mapped `safetensors` files.
+            By default these are used when the checkpoint provides them.
+        :param data_parallel: int
+            Number of model replicas to evaluate with. Each replica runs in its
+            own process on its own device (`cuda:0`, `cuda:1`, ... when `device`
+            is "cuda", or all on the CPU when `device` is "cpu") and receives an
+            interleaved shard of the length-sorted request batches.
+        """
         super().__init__()
 
         assert isinstance(device, str)
         assert isinstance(half, bool)
         assert isinstance(pretrained, str)
         assert isinstance(batch_size, int)
+        assert isinstance(data_parallel, int) and data_parallel >= 1
+        assert quantization in (None, "int8"), f"Unsupported quantization {quantization}"
+
+        if dtype is None:
+            if half and device == "cpu":
+                print("WARNING: float16 is not supported on the CPU; using float32.")
+            dtype = torch.float16 if half and device != "cpu" else torch.float32
+        dtype = _get_dtype(dtype)
+        if quantization == "int8":
+            assert (
+                device == "cpu" and dtype == torch.float32
+            ), "int8 quantization requires `device=cpu` and a float32 `dtype`."
+        if device_map is not None:
+            assert (
+                not parallelize and data_parallel == 1
+            ), "`device_map` cannot be used with `parallelize` or `data_parallel`."
 
         self.tokenizer = self.create_auto_tokenizer(
             pretrained, revision, subfolder, tokenizer
         )
-        self.model = self.create_auto_model(pretrained, revision, subfolder)
-        self.model.eval()
         torch.set_grad_enabled(
             False
         )  # Turn off gradients; we're only running inference.
@@ -43,23 +130,90 @@ class HuggingFaceAutoLM(BaseLM):
         self._max_gen_toks = max_gen_toks
         self._batch_size = batch_size  # todo: adaptive batch size
 
-        # TODO: Fix multi-gpu support.
-        if half:
-            self.model.half()
+        self._replicas = None
+        if data_parallel > 1:
+            assert (
+                not parallelize
+            ), "`parallelize` and `data_parallel` cannot be used together."
+            # This process only coordinates the replicas, so it never loads the
+            # model weights; the config is enough to answer `max_length`.
+            self.model = None
+            self._config = transformers.AutoConfig.from_pretrained(
+                pretrained,
+                revision=revision + ("/" + subfolder if subfolder is not None else ""),
+            )
+            self._device = torch.device("cpu")
+            self._replicas = DataParallelReplicas(
+                lm_class=type(self),
+                lm_kwargs=dict(
+                    pretrained=pretrained,
+                    tokenizer=tokenizer,
+                    subfolder=subfolder,
+                    revision=revision,
+                    batch_size=batch_size,
+                    max_gen_toks=max_gen_toks,
+                    dtype=dtype,
+                    quantization=quantization,
+                    low_cpu_mem_usage=low_cpu_mem_usage,
+                    use_safetensors=use_safetensors,
+                ),
+                devices=_data_parallel_devices(device, data_parallel),
+            )
+            return
+
+        self.model = self.create_auto_model(
+            pretrained,
+            revision,
+            subfolder,
+            dtype=dtype,
+            low_cpu_mem_usage=low_cpu_mem_usage,
+            device_map=device_map,
+            use_safetensors=use_safetensors,
+        )
+        self.model.eval()
+        self._config = self.model.config
+
+        if quantization == "int8":
+            self.model = torch.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
         self._device = torch.device(device)
-        if parallelize:
+        if device_map is not None:
+            # The weights were already placed on their devices while loading;
+            # inputs go to the device of the first (embedding) layer.
+            self._device = self.model.device
+        elif parallelize:
             self.model.parallelize()
             self._device = torch.device("cuda:0")
         else:
             self.model.to(self._device)
 
     def create_auto_model(
-        self, pretrained: str, revision: str, subfolder: str
+        self,
+        pretrained: str,
+        revision: str,
+        subfolder: str,
+        dtype: torch.dtype = torch.float32,
+        low_cpu_mem_usage: bool = False,
+        device_map: Optional[str] = None,
+        use_safetensors: Optional[bool] = None,
     ) -> transformers.AutoModel:
-        """Returns a pre-trained pytorch model from a pre-trained model configuration."""
+        """Returns a pre-trained pytorch model from a pre-trained model configuration.
+        The weights are loaded directly in `dtype`, rather than in float32 and
+        cast afterwards, to avoid holding two copies of them in memory.
+        """
+        kwargs = {}
+        if low_cpu_mem_usage:
+            kwargs["low_cpu_mem_usage"] = True
+        if device_map is not None:
+            kwargs["device_map"] = device_map
+        if use_safetensors is not None:
+            kwargs["use_safetensors"] = use_safetensors
         return self.AUTO_MODEL_CLASS.from_pretrained(
             pretrained,
             revision=revision + ("/" + subfolder if subfolder is not None else ""),
+            torch_dtype=dtype,
+            **kwargs,
         )
 
     def create_auto_tokenizer(
@@ -103,8 +257,8 @@ class HuggingFaceAutoLM(BaseLM):
         """
         seqlen_config_attrs = ("n_positions", "max_position_embeddings", "n_ctx")
         for attr in seqlen_config_attrs:
-            if hasattr(self.model.config, attr):
-                return getattr(self.model.config, attr)
+            if hasattr(self._config, attr):
+                return getattr(self._config, attr)
         # Model config has no sequence length attribute so return the tokenizer's max length.
         return self.tokenizer.model_max_length
 
@@ -130,6 +284,24 @@ class HuggingFaceAutoLM(BaseLM):
     def tok_decode(self, tokens):
         return self.tokenizer.batch_decode(tokens, skip_special_tokens=True)
 
+    @_dispatch_to_replicas
+    def loglikelihood(self, requests):
+        return super().loglikelihood(requests)
+
+    @_dispatch_to_replicas
+    def loglikelihood_rolling(self, requests):
+        return super().loglikelihood_rolling(requests)
+
+    @_dispatch_to_replicas
+    def greedy_until(self, requests):
+        return super().greedy_until(requests)
+
+    def close(self):
+        """Shuts down the data-parallel replicas, if any."""
+        if self._replicas is not None:
+            self._replicas.close()
+            self._replicas = None
+
 
 class AutoCausalLM(HuggingFaceAutoLM):
     """Causal language modeling.
@@ -217,6 +389,7 @@ class AutoSeq2SeqLM(HuggingFaceAutoLM):
         tokenizer.model_max_length = self.max_length
         return tokenizer
 
+    @_dispatch_to_replicas
     def loglikelihood(self, requests):
         new_reqs = []
         for chunk in utils.chunks(requests, self.batch_size):
@@ -235,6 +408,7 @@ class AutoSeq2SeqLM(HuggingFaceAutoLM):
             new_reqs.append(((context, continuation), context_enc, continuation_enc))
         return self._loglikelihood_tokens(new_reqs)
 
+    @_dispatch_to_replicas
     def loglikelihood_rolling(self, requests):
         loglikelihoods = []
         for (string,) in tqdm(requests):
@@ -274,14 +448,24 @@ class AutoSeq2SeqLM(HuggingFaceAutoLM):
             loglikelihoods.append(string_nll)
         return loglikelihoods
 
+    @profiled
     def _loglikelihood_tokens(self, requests, disable_tqdm=False):
         res = []
         for chunk in tqdm(requests, total=math.ceil(len(requests)), disable=disable_tqdm):
             cache_keys, inputs_tok, targets_tok = chunk
             inputs_tok = inputs_tok.to(self.device)
             targets_tok = targets_tok.to(self.device)
-            outputs = self._model_call(inputs_tok, targets_tok)
-            log_softmaxes = F.log_softmax(outputs.logits, dim=-1)
+            shape = list(inputs_tok["input_ids"].shape)
+            with self.profile("_model_call", shape=shape), instrumentation.span(
+                "model_call", shape=shape
+            ):
+                outputs = self._model_call(inputs_tok, targets_tok)
+                log_softmaxes = F.log_softmax(outputs.logits.float(), dim=-1)
+            instrumentation.count(
+                "model_call",
+                tokens=int(inputs_tok["attention_mask"].sum()),
+                padded_tokens=inputs_tok["attention_mask"].numel(),
+            )
 
             output_iterator = zip(
                 zip(cache_keys[0], cache_keys[1]),
@@ -341,6 +525,153 @@ class AutoSeq2SeqLM(HuggingFaceAutoLM):
         return generations
 
 
+# Data Parallel Helpers
+
+
+def _data_parallel_devices(device: str, data_parallel: int) -> List[str]:
+    """Returns the device each of the `data_parallel` replicas should run on."""
+    if device == "cuda":
+        assert torch.cuda.device_count() >= data_parallel, (
+            f"Requested {data_parallel} data-parallel replicas but only "
+            f"{torch.cuda.device_count()} CUDA devices are available."
+        )
+        return [f"cuda:{i}" for i in range(data_parallel)]
+    assert device == "cpu", (
+        "`data_parallel` replicas are placed automatically; use `device=cuda` "
+        "or `device=cpu` instead of a specific device."
+    )
+    return ["cpu"] * data_parallel
+
+
+def _data_parallel_worker(lm_class, lm_kwargs, device, num_threads, inputs, outputs):
+    """Loads one model replica and serves `(method, requests)` jobs from `inputs`
+    until it receives `None`.
+    """
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    try:
+        lm = lm_class(device=device, **lm_kwargs)
+    except Exception:
+        outputs.put((False, traceback.format_exc()))
+        return
+    outputs.put((True, None))
+
+    for method, requests in iter(inputs.get, None):
+        try:
+            outputs.put((True, getattr(lm, method)(requests)))
+        except Exception:
+            outputs.put((False, traceback.format_exc()))
+
+
+class DataParallelReplicas:
+    """A pool of model replicas, one process per device, that evaluates shards of
+    a request list in parallel and gathers the results back in order.
+    """
+
+    # Seconds between checks that a replica is still alive while waiting for it.
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, lm_class, lm_kwargs: dict, devices: List[str]):
+        # CUDA cannot be re-initialized in forked subprocesses.
+        context = mp.get_context("spawn")
+        # Split the CPU threads evenly between replicas sharing the CPU.
+        num_cpu_replicas = sum(device == "cpu" for device in devices)
+        cpu_threads = max(1, torch.get_num_threads() // max(1, num_cpu_replicas))
+
+        self._inputs = []
+        self._outputs = []
+        self._processes = []
+        for device in devices:
+            inputs, outputs = context.Queue(), context.Queue()
+            process = context.Process(
+                target=_data_parallel_worker,
+                args=(
+                    lm_class,
+                    lm_kwargs,
+                    device,
+                    cpu_threads if device == "cpu" else None,
+                    inputs,
+                    outputs,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._inputs.append(inputs)
+            self._outputs.append(outputs)
+            self._processes.append(process)
+
+        for replica, device in enumerate(devices):
+            ok, error = self._receive(replica)
+            if not ok:
+                self.close()
+                raise RuntimeError(f"Failed to load the replica on {device}: {error}")
+
+    def _receive(self, replica: int):
+        """Waits for the next `(ok, result)` reply of `replica`, or returns an
+        error if its process dies (e.g. out of memory) instead of replying.
+        """
+        outputs, process = self._outputs[replica], self._processes[replica]
+        while True:
+            try:
+                return outputs.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                if not process.is_alive():
+                    break
+        # It may have replied right before exiting.
+        try:
+            return outputs.get(timeout=self.POLL_INTERVAL)
+        except queue.Empty:
+            return False, f"The replica exited with code {process.exitcode}."
+
+    def run(self, method: str, requests: list, batch_size: int) -> list:
+        """Calls `method` on the replicas with interleaved shards of `requests`
+        and returns the results in the original request order.
+        """
+        # Sort by (character) length, like the `Reorderer`s do by token length,
+        # and deal out whole batches round-robin so that every replica gets a
+        # similar mix of long and short requests while batches stay tightly padded.
+        order = sorted(
+            range(len(requests)),
+            key=lambda i: -sum(len(arg) for arg in requests[i] if isinstance(arg, str)),
+        )
+        shards = [[] for _ in self._processes]
+        for i, batch in enumerate(utils.chunks(order, batch_size)):
+            shards[i % len(shards)].extend(batch)
+
+        for inputs, shard in zip(self._inputs, shards):
+            if shard:
+                inputs.put((method, [requests[i] for i in shard]))
+
+        # Every replica's reply is read, even after a failure, so that none is
+        # left in its queue to be mistaken for the result of the next call.
+        res = [None] * len(requests)
+        errors = []
+        for replica, shard in enumerate(shards):
+            if not shard:
+                continue
+            ok, shard_res = self._receive(replica)
+            if not ok:
+                errors.append(shard_res)
+                continue
+            for i, r in zip(shard, shard_res):
+                res[i] = r
+        if errors:
+            raise RuntimeError(
+                f"Data-parallel replica failed on {method}: " + "\n".join(errors)
+            )
+        return res
+
+    def close(self):
+        for inputs, process in zip(self._inputs, self._processes):
+            if process.is_alive():
+                inputs.put(None)
+        for process in self._processes:
+            process.join(timeout=self.POLL_INTERVAL * 10)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+
 # Stopping Criteria Helpers
 
 
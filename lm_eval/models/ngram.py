@@ -0,0 +1,253 @@
+import math
+import numpy as np
+import torch
+import transformers
+from tqdm import tqdm
+from typing import List, Optional
+from lm_eval.base import BaseLM, profiled
+from lm_eval import utils
+
+
+class NGramLM(BaseLM):
+    """
+    A count-based n-gram language model with add-k smoothing over the vocabulary
+    of a HuggingFace tokenizer. The next-token distribution is taken from the
+    longest context seen in the training corpus, backing off to shorter ones.
+
+    It is deterministic and cheap to run on the CPU, so it exercises the
+    tokenization, batching and scoring paths of the harness without the cost of
+    a neural model, e.g. to benchmark harness overhead.
+    """
+
+    def __init__(
+        self,
+        tokenizer: str = "gpt2",
+        corpus: Optional[str] = None,
+        order: int = 3,
+        k: float = 0.01,
+        device: str = "cpu",
+        batch_size: int = 1,
+        max_length: int = 2048,
+        max_gen_toks: int = 256,
+        parallelize: bool = False,
+    ):
+        """
+        :param tokenizer: str
+            Name or path of the HuggingFace tokenizer whose vocabulary is modeled.
+        :param corpus: str, optional
+            Path to a text file to count n-grams from, one document per line.
+            Without a corpus every token is equally likely.
+        :param order: int
+            Order `n` of the model, i.e. the next token is conditioned on at
+            most `n - 1` previous tokens.
+        :param k: float
+            Pseudo-count added to every token of the vocabulary.
+        """
+        super().__init__()
+
+        assert order >= 1, "`order` must be at least 1."
+        assert k > 0, "`k` must be positive for the model to assign every token a probability."
+        assert device == "cpu", "`NGramLM` only runs on the CPU."
+        assert not parallelize, "Cannot specify `parallelize` for `NGramLM`."
+
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(tokenizer)
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.vocab_size = len(self.tokenizer)
+        self.order = order
+        self.k = k
+
+        self._batch_size = batch_size
+        self._max_length = max_length
+        self._max_gen_toks = max_gen_toks
+
+        # `_counts[m]` maps each context of `m` tokens seen in the corpus to the
+        # sorted ids of the tokens that followed it, their counts and the total.
+        self._counts = [{} for _ in range(order)]
+        if corpus is not None:
+            with open(corpus, encoding="utf-8") as f:
+                self.fit([line for line in f.read().splitlines() if line.strip()])
+
+    def fit(self, documents: List[str]):
+        """Counts the n-grams of `documents`. Each document is preceded by the
+        end-of-text token, which is also the context of an empty string.
+        """
+        tokens = [self.eot_token_id]
+        for document in documents:
+            tokens.extend(self.tok_encode(document))
+            tokens.append(self.eot_token_id)
+        tokens = np.asarray(tokens, dtype=np.int64)
+
+        for m in range(self.order):
+            if len(tokens) < m + 1:
+                break
+            windows = np.lib.stride_tricks.sliding_window_view(tokens, m + 1)
+            # `np.unique` sorts the n-grams, so those sharing a context are
+            # contiguous and their next tokens are sorted by id.
+            ngrams, counts = np.unique(windows, axis=0, return_counts=True)
+            contexts = ngrams[:, :m]
+            starts = np.flatnonzero(
+                np.concatenate([[True], np.any(contexts[1:] != contexts[:-1], axis=1)])
+            )
+            ends = np.append(starts[1:], len(ngrams))
+            table = self._counts[m]
+            for start, end in zip(starts, ends):
+                context = tuple(contexts[start].tolist())
+                ids, ctx_counts = ngrams[start:end, m], counts[start:end]
+                if context in table:
+                    # Merge with the counts of a previous `fit`.
+                    old_ids, old_counts, _ = table[context]
+                    ids, inverse = np.unique(
+                        np.concatenate([old_ids, ids]), return_inverse=True
+                    )
+                    ctx_counts = np.bincount(
+                        inverse, weights=np.concatenate([old_counts, ctx_counts])
+                    ).astype(np.int64)
+                table[context] = (ids, ctx_counts, int(ctx_counts.sum()))
+
+    def _distribution(self, history):
+        """Returns the counts of the longest seen context ending `history`, or
+        `None` if the corpus is empty.
+        """
+        for m in range(min(self.order - 1, len(history)), -1, -1):
+            entry = self._counts[m].get(tuple(history[len(history) - m :]))
+            if entry is not None:
+                return entry
+        return None
+
+    def _logprob(self, entry, token):
+        if entry is None:
+            return -math.log(self.vocab_size)
+        ids, counts, total = entry
+        i = np.searchsorted(ids, token)
+        count = counts[i] if i < len(ids) and ids[i] == token else 0
+        return math.log((count + self.k) / (total + self.k * self.vocab_size))
+
+    def _argmax(self, entry):
+        if entry is None:
+            return 0
+        ids, counts, _ = entry
+        # Ties go to the smallest token id, as `ids` is sorted.
+        return int(ids[np.argmax(counts)])
+
+    def _log_probs(self, entry):
+        """Returns the dense next-token log-probabilities of `entry`."""
+        if entry is None:
+            return np.full(self.vocab_size, -math.log(self.vocab_size))
+        ids, counts, total = entry
+        denom = total + self.k * self.vocab_size
+        log_probs = np.full(self.vocab_size, math.log(self.k / denom))
+        log_probs[ids] = np.log((counts + self.k) / denom)
+        return log_probs
+
+    @property
+    def eot_token(self):
+        return self.tokenizer.eos_token
+
+    @property
+    def eot_token_id(self):
+        return self.tokenizer.eos_token_id
+
+    @property
+    def max_length(self):
+        return self._max_length
+
+    @property
+    def max_gen_toks(self):
+        return self._max_gen_toks
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    @property
+    def device(self):
+        return torch.device("cpu")
+
+    def tok_encode(self, string: str):
+        return self.tokenizer.encode(string, add_special_tokens=False)
+
+    def tok_encode_batch(self, strings: str) -> torch.Tensor:
+        return self.tokenizer(
+            strings, padding=True, add_special_tokens=False, return_tensors="pt"
+        )
+
+    def tok_decode(self, tokens):
+        return self.tokenizer.batch_decode(tokens, skip_special_tokens=True)
+
+    @profiled
+    def _loglikelihood_tokens(self, requests, disable_tqdm=False):
+        # Only the continuation tokens are scored, so unlike `BaseLM` this never
+        # materializes the logits over the whole vocabulary.
+        res = []
+
+        def _collate(x):
+            toks = x[1] + x[2]
+            return -len(toks), tuple(toks)
+
+        reord = utils.Reorderer(requests, _collate)
+        for cache_key, context_enc, continuation_enc in tqdm(
+            reord.get_reordered(), disable=disable_tqdm
+        ):
+            assert len(context_enc) > 0
+            assert len(continuation_enc) > 0
+
+            tokens = context_enc + continuation_enc
+            logprob = 0.0
+            is_greedy = True
+            for i in range(len(context_enc), len(tokens)):
+                entry = self._distribution(tokens[max(0, i - self.order + 1) : i])
+                logprob += self._logprob(entry, tokens[i])
+                is_greedy = is_greedy and self._argmax(entry) == tokens[i]
+
+            answer = (logprob, is_greedy)
+            # partial caching
+            if cache_key is not None:
+                self.cache_hook.add_partial("loglikelihood", cache_key, answer)
+            res.append(answer)
+
+        return reord.get_original(res)
+
+    def _model_call(self, inps):
+        """Returns the next-token log-probabilities after every prefix of `inps`,
+        a tensor of shape [batch, sequence], as a [batch, sequence, vocab] tensor.
+        """
+        inps = inps.tolist()
+        log_probs = np.stack(
+            [
+                np.stack(
+                    [
+                        self._log_probs(self._distribution(inp[max(0, i + 2 - self.order) : i + 1]))
+                        for i in range(len(inp))
+                    ]
+                )
+                for inp in inps
+            ]
+        )
+        return torch.from_numpy(log_probs)
+
+    def _model_generate(
+        self, context, attention_mask, max_length, stopping_criteria_ids, num_fewshot
+    ):
+        stop = stopping_criteria_ids.tolist()
+        generations = []
+        for inp, mask in zip(context.tolist(), attention_mask.tolist()):
+            tokens = [token for token, keep in zip(inp, mask) if keep]
+            generation = []
+            for _ in range(max_length):
+                history = tokens[max(0, len(tokens) - self.order + 1) :]
+                token = self._argmax(self._distribution(history))
+                tokens.append(token)
+                generation.append(token)
+                if token == self.eot_token_id:
+                    break
+                if num_fewshot != 0 and generation[-len(stop) :] == stop:
+                    break
+            generations.append(generation)
+        # Pad with end-of-text tokens, which are skipped when decoding.
+        width = max(map(len, generations))
+        return torch.tensor(
+            [gen + [self.eot_token_id] * (width - len(gen)) for gen in generations],
+            dtype=torch.long,
+        )
@@ -1,10 +1,14 @@
 import os
+import random
+import threading
 import numpy as np
 import transformers
-from lm_eval.base import BaseLM
+from concurrent.futures import ThreadPoolExecutor
+from lm_eval.base import BaseLM, profiled
 from lm_eval import utils
 from tqdm import tqdm
 import time
+from typing import Optional
 
 
 def get_result(response, ctxlen):
@@ -35,23 +39,202 @@ def get_result(response, ctxlen):
     return continuation_logprobs, is_greedy
 
 
-def oa_completion(**kwargs):
+def oa_completion(max_retries=6, backoff_time=3.0, on_retry=None, **kwargs):
     """ Query OpenAI API for completion.
 
-    Retry with back-off until they respond
+    Retry with jittered exponential back-off, giving up after `max_retries`
+    failed retries. `on_retry`, if given, is called before each retry.
     """
     import openai
-    backoff_time = 3
-    while True:
+    for attempt in range(max_retries + 1):
         try:
             return openai.Completion.create(**kwargs)
         except openai.error.OpenAIError:
+            if attempt == max_retries:
+                raise
             import traceback
             traceback.print_exc()
-            time.sleep(backoff_time)
+            if on_retry is not None:
+                on_retry()
+            # Full jitter, so that concurrent requests that failed together
+            # do not all retry at the same time.
+            time.sleep(backoff_time * random.uniform(0.5, 1.5))
             backoff_time *= 1.5
 
 
+class RateLimiter:
+    """A token-bucket rate limiter for API requests and tokens per minute.
+
+    Each bucket starts full and holds at most a minute's worth of budget, which
+    refills continuously. `acquire` blocks until both buckets can pay for the
+    request.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        :param clock: Callable[[], float]
+            Returns the current time in seconds, e.g. a fake clock in tests.
+        :param sleep: Callable[[float], None]
+            Waits for the given number of seconds.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._requests = requests_per_minute
+        self._tokens = tokens_per_minute
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._last
+        self._last = now
+        if self.requests_per_minute is not None:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + elapsed * self.requests_per_minute / 60,
+            )
+        if self.tokens_per_minute is not None:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + elapsed * self.tokens_per_minute / 60,
+            )
+
+    def acquire(self, num_tokens: int = 0):
+        """Blocks until a request of `num_tokens` tokens can be sent."""
+        while True:
+            with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute is not None and self._requests < 1:
+                    wait = (1 - self._requests) * 60 / self.requests_per_minute
+                if self.tokens_per_minute is not None:
+                    # Requests larger than the whole bucket wait for a full one.
+                    cost = min(num_tokens, self.tokens_per_minute)
+                    if self._tokens < cost:
+                        wait = max(
+                            wait, (cost - self._tokens) * 60 / self.tokens_per_minute
+                        )
+                if wait == 0.0:
+                    if self.requests_per_minute is not None:
+                        self._requests -= 1
+                    if self.tokens_per_minute is not None:
+                        self._tokens -= cost
+                    return
+            self._sleep(wait)
+
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+
+class UsageTracker:
+    """Records the tokens, latency and retries of every API call, and stops
+    calls from being sent once they could exceed the token budget.
+
+    A call reserves its worst-case token count (the prompt plus `max_tokens`
+    completion tokens) before it is sent, so in-flight calls can never overrun
+    the budget together.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        cost_per_1k_tokens: Optional[float] = None,
+        max_cost: Optional[float] = None,
+    ):
+        if max_cost is not None:
+            assert (
+                cost_per_1k_tokens is not None
+            ), "`max_cost` requires `cost_per_1k_tokens`."
+            max_cost_tokens = int(max_cost / cost_per_1k_tokens * 1000)
+            max_tokens = (
+                max_cost_tokens if max_tokens is None else min(max_tokens, max_cost_tokens)
+            )
+        self.max_tokens = max_tokens
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.calls = []
+        self._used = 0
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, num_tokens: int):
+        """Reserves `num_tokens` tokens of the budget for a call about to be sent.
+
+        :raises BudgetExceededError: if the budget cannot cover them
+        """
+        with self._lock:
+            if (
+                self.max_tokens is not None
+                and self._used + self._reserved + num_tokens > self.max_tokens
+            ):
+                raise BudgetExceededError(
+                    f"Sending a call of up to {num_tokens} tokens would exceed the "
+                    f"budget of {self.max_tokens} tokens ({self._used} used)."
+                )
+            self._reserved += num_tokens
+
+    def release(self, num_tokens: int):
+        """Releases the reservation of a call that failed."""
+        with self._lock:
+            self._reserved -= num_tokens
+
+    def settle(
+        self,
+        reserved: int,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        retries: int,
+    ):
+        """Replaces the reservation of a finished call by the tokens it used.
+
+        Both are updated under the lock, so a concurrent `reserve` always sees
+        the call's tokens in either of them.
+        """
+        with self._lock:
+            self._reserved -= reserved
+            self._used += prompt_tokens + completion_tokens
+            self.calls.append(
+                {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "latency_s": latency,
+                    "retries": retries,
+                }
+            )
+
+    def summary(self):
+        """Returns the totals over all calls, followed by the calls themselves."""
+        with self._lock:
+            calls = list(self.calls)
+        prompt_tokens = sum(call["prompt_tokens"] for call in calls)
+        completion_tokens = sum(call["completion_tokens"] for call in calls)
+        latencies = sorted(call["latency_s"] for call in calls)
+        summary = {
+            "num_calls": len(calls),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "retries": sum(call["retries"] for call in calls),
+            "total_latency_s": sum(latencies),
+            "median_latency_s": latencies[len(latencies) // 2] if latencies else None,
+            "max_latency_s": latencies[-1] if latencies else None,
+            "max_tokens": self.max_tokens,
+        }
+        if self.cost_per_1k_tokens is not None:
+            summary["cost"] = summary["total_tokens"] / 1000 * self.cost_per_1k_tokens
+        summary["calls"] = calls
+        return summary
+
+
 class OpenAICompletionsLM(BaseLM):
     """
     Implements the BaseLM interface for OpenAI's Completions API.
@@ -64,7 +247,15 @@ class OpenAICompletionsLM(BaseLM):
         device=None,
         batch_size: int = 20,
         max_gen_toks: int = 256,
-        parallelize=False
+        parallelize=False,
+        max_concurrency: int = 1,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 6,
+        retry_backoff: float = 3.0,
+        max_tokens_budget: Optional[int] = None,
+        cost_per_1k_tokens: Optional[float] = None,
+        max_cost: Optional[float] = None,
     ):
         """
 
@@ -72,6 +263,23 @@ class OpenAICompletionsLM(BaseLM):
             OpenAI API engine (e.g. davinci)
         :param truncate: bool
             Truncate input if too long (if False and input is too long, throw error)
+        :param max_concurrency: int
+            Maximum number of batched API requests in flight at once.
+        :param requests_per_minute: float, optional
+            Maximum number of API requests sent per minute.
+        :param tokens_per_minute: float, optional
+            Maximum number of prompt and completion tokens sent per minute.
+        :param max_retries: int
+            Number of times a failed API request is retried before giving up.
+        :param retry_backoff: float
+            Initial back-off, in seconds, between retries of a failed request.
+        :param max_tokens_budget: int, optional
+            Maximum number of prompt and completion tokens to spend; no request
+            that could exceed it is sent.
+        :param cost_per_1k_tokens: float, optional
+            Price of 1000 tokens, used to report the cost of the run.
+        :param max_cost: float, optional
+            Maximum cost to spend, in the unit of `cost_per_1k_tokens`.
         """
         super().__init__()
 
@@ -89,9 +297,47 @@ class OpenAICompletionsLM(BaseLM):
         self._max_gen_toks = max_gen_toks
         self._batch_size = batch_size  # todo: adaptive batch size
 
+        self._init_dispatch(
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            max_tokens_budget=max_tokens_budget,
+            cost_per_1k_tokens=cost_per_1k_tokens,
+            max_cost=max_cost,
+        )
+
         # Read from environment variable OPENAI_API_SECRET_KEY
         openai.api_key = os.environ["OPENAI_API_SECRET_KEY"]
 
+    def _init_dispatch(
+        self,
+        max_concurrency,
+        requests_per_minute,
+        tokens_per_minute,
+        max_retries,
+        retry_backoff,
+        max_tokens_budget,
+        cost_per_1k_tokens,
+        max_cost,
+    ):
+        """Sets up the concurrency, rate limits, retries and usage accounting of
+        `_dispatch`; see `__init__` for the arguments.
+        """
+        assert max_concurrency >= 1, "`max_concurrency` must be at least 1."
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.usage = UsageTracker(max_tokens_budget, cost_per_1k_tokens, max_cost)
+        # Retries of the call running on each dispatch thread.
+        self._call_state = threading.local()
+
+    def _on_retry(self):
+        # `_model_call` can also be called outside of `_dispatch`.
+        self._call_state.retries = getattr(self._call_state, "retries", 0) + 1
+
     @property
     def eot_token(self):
         return self.tokenizer.eos_token
@@ -125,6 +371,7 @@ class OpenAICompletionsLM(BaseLM):
     def tok_decode(self, tokens):
         return self.tokenizer.decode(tokens)
 
+    @profiled
     def _loglikelihood_tokens(self, requests, disable_tqdm=False):
         res = []
 
@@ -137,7 +384,10 @@ class OpenAICompletionsLM(BaseLM):
 
         reord = utils.Reorderer(requests, _collate)
 
-        for chunk in tqdm(list(utils.chunks(reord.get_reordered(), self.batch_size)), disable=disable_tqdm):
+        chunks = list(utils.chunks(reord.get_reordered(), self.batch_size))
+        calls = []
+        chunk_ctxlens = []
+        for chunk in chunks:
             inps = []
             ctxlens = []
             for cache_key, context_enc, continuation_enc in chunk:
@@ -150,9 +400,14 @@ class OpenAICompletionsLM(BaseLM):
                 inps.append(inp)
                 ctxlens.append(ctxlen)
 
-            response = self._model_call(inps)
+            calls.append((self._model_call, dict(inps=inps), sum(map(len, inps)), 0))
+            chunk_ctxlens.append(ctxlens)
 
-            for resp, ctxlen, (cache_key, context_enc, continuation_enc) in zip(response.choices, ctxlens, chunk):
+        responses = self._dispatch(calls)
+        for chunk, ctxlens, response in tqdm(
+            zip(chunks, chunk_ctxlens, responses), total=len(chunks), disable=disable_tqdm
+        ):
+            for resp, ctxlen, (cache_key, context_enc, continuation_enc) in zip(response["choices"], ctxlens, chunk):
                 answer = get_result(resp, ctxlen)
 
                 res.append(answer)
@@ -164,32 +419,17 @@ class OpenAICompletionsLM(BaseLM):
 
         return reord.get_original(res)
 
+    @profiled
     def greedy_until(self, requests):
         if not requests:
             return []
         res = []
 
-        def _collate(x):
-            toks = self.tok_encode(x[0])
-            return len(toks), x[0]
-
-        reord = utils.Reorderer(requests, _collate)
-
-        def sameuntil_chunks(xs, size):
-            ret = []
-            lastuntil = xs[0][1]
-            for x in xs:
-                if len(ret) >= size or x[1] != lastuntil:
-                    yield ret, lastuntil
-                    ret = []
-                    lastuntil = x[1]
-                ret.append(x)
-
-            if ret:
-                yield ret, lastuntil
-
-        # todo: more intelligent batching for heterogeneous `until`
-        for chunk, request_args in tqdm(list(sameuntil_chunks(reord.get_reordered(), self.batch_size))):
+        def _api_args(request_args):
+            """Normalizes the request args into the `(stop, max_tokens)` that are
+            actually sent to the API, so that requests whose args differ in ways
+            the API call does not see can share a batch.
+            """
             stopping_criteria = request_args["stopping_criteria"]
             max_generation_length = request_args["max_generation_length"]
             num_fewshot = request_args["num_fewshot"]
@@ -204,33 +444,71 @@ class OpenAICompletionsLM(BaseLM):
 
             # TODO(jon-tow): This is most likely useless b/c `stopping_criteria` is
             # never `None`; see `base.py` `PromptSourceTask.construct_requests`.
-            if stopping_criteria is None:
-                until = [self.eot_token]
+            # NOTE: Zero-shot generations only stop at the end of text; the
+            # stopping criteria are still applied to the generated text below.
+            if stopping_criteria is None or num_fewshot == 0:
+                until = (self.eot_token,)
             else:
-                until = [stopping_criteria]
-
-            inps = []
-            for context, _ in chunk:
-                context_enc = self.tok_encode(context)
-                inp = context_enc[-(self.max_length - self.max_gen_toks):]
-                inps.append(inp)
+                until = (stopping_criteria,)
 
             if max_generation_length is None:
                 max_length = self.max_gen_toks
             else:
                 max_length = max_generation_length
+            return until, max_length
 
-            response = self._model_generate(
-                context=inps,
-                max_length=max_length,
-                # NOTE: We do not need to tokenize the stopping criteria with the OpenAI API
-                # so just pass in the list of stopping tokens.
-                stopping_criteria_ids=until,
-                num_fewshot=num_fewshot,
-            )
+        def _collate(x):
+            # Group requests by their API args first, so that each group is
+            # split into as few full batches as possible.
+            toks = self.tok_encode(x[0])
+            return _api_args(x[1]), len(toks), x[0]
+
+        reord = utils.Reorderer(requests, _collate)
 
+        def sameuntil_chunks(xs, size):
+            ret = []
+            lastuntil = _api_args(xs[0][1])
+            for x in xs:
+                if len(ret) >= size or _api_args(x[1]) != lastuntil:
+                    yield ret, lastuntil
+                    ret = []
+                    lastuntil = _api_args(x[1])
+                ret.append(x)
+
+            if ret:
+                yield ret, lastuntil
+
+        chunks = list(sameuntil_chunks(reord.get_reordered(), self.batch_size))
+        print(
+            f"greedy_until: {len(requests)} prompts in {len(chunks)} API calls "
+            f"({len(requests) / len(chunks):.1f} prompts per call)"
+        )
+        calls = []
+        for chunk, (until, max_length) in chunks:
+            inps = []
+            for context, _ in chunk:
+                context_enc = self.tok_encode(context)
+                inp = context_enc[-(self.max_length - self.max_gen_toks):]
+                inps.append(inp)
+
+            calls.append((
+                self._model_generate,
+                dict(
+                    context=inps,
+                    max_length=max_length,
+                    # NOTE: We do not need to tokenize the stopping criteria with the OpenAI API
+                    # so just pass in the list of stopping tokens.
+                    stopping_criteria_ids=list(until),
+                    num_fewshot=None,
+                ),
+                sum(map(len, inps)),
+                max_length * len(inps),
+            ))
+
+        responses = self._dispatch(calls)
+        for (chunk, _), response in tqdm(zip(chunks, responses), total=len(chunks)):
             # Iterate thru the per-request responses.
-            for resp, (context, _request_args) in zip(response.choices, chunk):
+            for resp, (context, _request_args) in zip(response["choices"], chunk):
                 sentence = resp['text']
 
                 _stopping_criteria = _request_args["stopping_criteria"]
@@ -248,8 +526,61 @@ class OpenAICompletionsLM(BaseLM):
 
         return reord.get_original(res)
 
+    def _dispatch(self, calls):
+        """Runs batched API calls on a pool of `max_concurrency` threads, subject
+        to the rate limits, and yields their responses in the order of `calls`.
+
+        :param calls: list
+            List of `(fn, kwargs, prompt_tokens, max_completion_tokens)` tuples,
+            where the token counts are the most the call can be charged.
+        """
+
+        def _run(fn, kwargs, prompt_tokens, max_completion_tokens):
+            num_tokens = prompt_tokens + max_completion_tokens
+            self.usage.reserve(num_tokens)
+            try:
+                self.rate_limiter.acquire(num_tokens)
+                self._call_state.retries = 0
+                start = time.perf_counter()
+                response = fn(**kwargs)
+                latency = time.perf_counter() - start
+
+                # Servers that don't report their usage are charged our own counts.
+                usage = response.get("usage") or {}
+                completion_tokens = usage.get("completion_tokens")
+                if completion_tokens is None:
+                    completion_tokens = 0
+                    if max_completion_tokens:
+                        completion_tokens = sum(
+                            len(self.tok_encode(choice["text"])) for choice in response["choices"]
+                        )
+            except BaseException:
+                self.usage.release(num_tokens)
+                raise
+            self.usage.settle(
+                num_tokens,
+                prompt_tokens=usage.get("prompt_tokens", prompt_tokens),
+                completion_tokens=completion_tokens,
+                latency=latency,
+                retries=self._call_state.retries,
+            )
+            return response
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [executor.submit(_run, *call) for call in calls]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                # Don't send the remaining calls if one of them failed for good.
+                for future in futures:
+                    future.cancel()
+
     def _model_call(self, inps):
         return oa_completion(
+            max_retries=self.max_retries,
+            backoff_time=self.retry_backoff,
+            on_retry=self._on_retry,
             engine=self.engine,
             prompt=inps,
             echo=True,
@@ -273,6 +604,9 @@ class OpenAICompletionsLM(BaseLM):
 
         if num_fewshot == 0:
             generations = oa_completion(
+                max_retries=self.max_retries,
+                backoff_time=self.retry_backoff,
+                on_retry=self._on_retry,
                 engine=self.engine,
                 prompt=context,
                 max_tokens=max_length,
@@ -282,6 +616,9 @@ class OpenAICompletionsLM(BaseLM):
             )
         else:
             generations = oa_completion(
+                max_retries=self.max_retries,
+                backoff_time=self.retry_backoff,
+                on_retry=self._on_retry,
                 engine=self.engine,
                 prompt=context,
                 max_tokens=max_length,
@@ -174,12 +174,19 @@ def make_class(lang):
     class Flores101Lang(Flores101):
         DATASET_NAME = lang
 
+    # Named after the language so that the module-level classes below can be
+    # imported by name, e.g. `lm_eval.tasks.flores_101:Flores101_afr`.
+    Flores101Lang.__name__ = Flores101Lang.__qualname__ = f"Flores101_{lang}"
     return Flores101Lang
 
 
+# Dynamically create a class for each language with a different `DATASET_NAME`
+FLORES_101_CLASSES = {lang: make_class(lang) for lang in LANGS}
+globals().update({cls.__name__: cls for cls in FLORES_101_CLASSES.values()})
+
+
 def construct_tasks():
     tasks = {}
     for lang in LANGS:
-        # Dynamically create a class for each language with a different `DATASET_NAME`
-        tasks[f"gsarti/flores_101_{lang}"] = make_class(lang)
+        tasks[f"gsarti/flores_101_{lang}"] = FLORES_101_CLASSES[lang]
     return tasks
@@ -12,7 +12,7 @@ Homepage: https://www.kaggle.com/c/jigsaw-unintended-bias-in-toxicity-classifica
 import inspect
 import os
 import numpy as np
-import pandas as pd
+from lm_eval import metrics
 from lm_eval.base import PromptSourceTask
 import lm_eval.datasets.jigsaw_unintended_bias.jigsaw_unintended_bias
 
@@ -116,10 +116,17 @@ class JigsawUnintendedBias(PromptSourceTask):
                 fn  = True
             else:
                 fp = True
+        # The same record is aggregated by the `_var` and `_std` metrics of every
+        # dimension, so that `identity_fprs` is computed once for all of them.
+        record = {
+            identity: 1 if doc[identity] > 0 else 0
+            for identity_set in self.dimension_to_identity_set.values()
+            for identity in identity_set
+        }
+        record.update({'pred': pred, 'target': target})
         for dimension, identity_set in self.dimension_to_identity_set.items():
-            identities = {identity: 1  if doc[identity] > 0 else 0 for identity in identity_set }
-            out[f"{dimension}_var"] = {**identities, 'pred': pred,  'target': target}
-            out[f"{dimension}_std"] = {**identities, 'pred': pred,  'target': target}
+            out[f"{dimension}_var"] = record
+            out[f"{dimension}_std"] = record
             for identity in identity_set:
                 if doc[identity]:
                     out[f"{identity}_acc"] = acc
@@ -146,24 +153,52 @@ class JigsawUnintendedBias(PromptSourceTask):
             return out, example
         return out
 
-    def calculate_discrepencies(self, docs, identity_set, aggregation_func):
-        identity_to_fpr = {}
-        prompt_pd = pd.DataFrame(docs)
-        for identity in identity_set:
-            identity_pd = prompt_pd[prompt_pd[identity] == 1]
-            if len(identity_pd) == 0:
-                continue
-            fp = identity_pd.apply(lambda x: x.pred and not x.target, axis=1).sum()
-            tn = identity_pd.apply(lambda x: not x.pred and not x.target, axis=1).sum()
-            if float(fp) + float(tn) == 0:
-                identity_to_fpr[f"{identity}_fpr"] = 0
+    @metrics.shared_aggregation
+    def identity_fprs(self, docs):
+        """Returns the False Positive Rate of every identity of every dimension,
+        or None for the identities that no doc mentions.
+
+        :param docs:
+            The records of the `_var`/`_std` metrics of every doc, see
+            `process_results`. All these metrics aggregate the same records, so
+            the rates are only computed once for them.
+        """
+        identities = [
+            identity
+            for identity_set in self.dimension_to_identity_set.values()
+            for identity in identity_set
+        ]
+        pred = np.array([bool(doc["pred"]) for doc in docs], dtype=bool)
+        target = np.array([bool(doc["target"]) for doc in docs], dtype=bool)
+        mentions = np.array(
+            [[doc[identity] == 1 for identity in identities] for doc in docs],
+            dtype=bool,
+        ).reshape(len(docs), len(identities))
+        fp = (mentions & (pred & ~target)[:, None]).sum(axis=0)
+        tn = (mentions & (~pred & ~target)[:, None]).sum(axis=0)
+        negatives = fp + tn
+        fprs = {}
+        for i, identity in enumerate(identities):
+            if not mentions[:, i].any():
+                fprs[identity] = None
+            elif negatives[i] == 0:
+                fprs[identity] = 0
             else:
-                identity_to_fpr[f"{identity}_fpr"] = float(fp) / (float(fp) + float(tn))
+                fprs[identity] = float(fp[i]) / float(negatives[i])
+        return fprs
+
+    def calculate_discrepencies(self, docs, identity_set, aggregation_func):
+        identity_fprs = self.identity_fprs(docs)
+        fprs = [
+            identity_fprs[identity]
+            for identity in identity_set
+            if identity_fprs[identity] is not None
+        ]
         if aggregation_func == "var":
             func = np.var
         else:
             func = np.std
-        return float(func(list(identity_to_fpr.values())))
+        return float(func(fprs))
 
     def aggregation(self):
         out = {}
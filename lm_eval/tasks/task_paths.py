@@ -0,0 +1,274 @@
+# Generated from `lm_eval/tasks/registry.py` by
+# `python -m scripts.make_task_registry`. Do not edit.
+
+TASK_PATHS = {
+    "cola": "lm_eval.tasks.glue:CoLA",
+    "mnli": "lm_eval.tasks.glue:MNLI",
+    "mnli_mismatched": "lm_eval.tasks.glue:MNLIMismatched",
+    "mrpc": "lm_eval.tasks.glue:MRPC",
+    "rte": "lm_eval.tasks.glue:RTE",
+    "qnli": "lm_eval.tasks.glue:QNLI",
+    "qqp": "lm_eval.tasks.glue:QQP",
+    "sst": "lm_eval.tasks.glue:SST",
+    "wnli": "lm_eval.tasks.glue:WNLI",
+    "boolq": "lm_eval.tasks.superglue:BoolQ",
+    "cb": "lm_eval.tasks.superglue:CommitmentBank",
+    "copa": "lm_eval.tasks.superglue:Copa",
+    "multirc": "lm_eval.tasks.superglue:MultiRC",
+    "record": "lm_eval.tasks.superglue:ReCoRD",
+    "wic": "lm_eval.tasks.superglue:WordsInContext",
+    "wsc": "lm_eval.tasks.superglue:SGWinogradSchemaChallenge",
+    "axg": "lm_eval.tasks.superglue:WinogenderSchemaDiagnostics",
+    "axb": "lm_eval.tasks.superglue:BroadcoverageDiagnostics",
+    "coqa": "lm_eval.tasks.coqa:CoQA",
+    "drop": "lm_eval.tasks.drop:DROP",
+    "GEM/web_nlg_en": "lm_eval.tasks.gem_webnlg:WebNLG",
+    "GEM/web_nlg_ru": "lm_eval.tasks.gem_webnlg:WebNLGRu",
+    "GEM/web_nlg_en_challenge_validation_sample": "lm_eval.tasks.gem_webnlg:WebNLGEn1",
+    "GEM/web_nlg_en_challenge_test_scramble": "lm_eval.tasks.gem_webnlg:WebNLGEn2",
+    "GEM/web_nlg_en_challenge_test_numbers": "lm_eval.tasks.gem_webnlg:WebNLGEn3",
+    "GEM/web_nlg_ru_challenge_validation_sample": "lm_eval.tasks.gem_webnlg:WebNLGRu1",
+    "GEM/web_nlg_ru_challenge_test_scramble": "lm_eval.tasks.gem_webnlg:WebNLGRu2",
+    "GEM/wiki_auto_asset_turk_test_asset": "lm_eval.tasks.gem_asset_turk:AssetTest",
+    "GEM/wiki_auto_asset_turk_test_turk": "lm_eval.tasks.gem_asset_turk:TurkTest",
+    "GEM/wiki_auto_asset_turk_challenge_test_turk_backtranslation": "lm_eval.tasks.gem_asset_turk:TurkTest1",
+    "GEM/wiki_auto_asset_turk_challenge_test_turk_bfp02": "lm_eval.tasks.gem_asset_turk:TurkTest2",
+    "GEM/wiki_auto_asset_turk_challenge_test_turk_bfp05": "lm_eval.tasks.gem_asset_turk:TurkTest3",
+    "GEM/wiki_auto_asset_turk_challenge_test_turk_nopunc": "lm_eval.tasks.gem_asset_turk:TurkTest4",
+    "GEM/wiki_auto_asset_turk_challenge_test_asset_backtranslation": "lm_eval.tasks.gem_asset_turk:AssetTest1",
+    "GEM/wiki_auto_asset_turk_challenge_test_asset_bfp02": "lm_eval.tasks.gem_asset_turk:AssetTest2",
+    "GEM/wiki_auto_asset_turk_challenge_test_asset_bfp05": "lm_eval.tasks.gem_asset_turk:AssetTest3",
+    "GEM/wiki_auto_asset_turk_challenge_test_asset_nopunc": "lm_eval.tasks.gem_asset_turk:AssetTest4",
+    "GEM/wiki_lingua_ar": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaAr",
+    "GEM/wiki_lingua_cs": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaCs",
+    "GEM/wiki_lingua_de": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaDe",
+    "GEM/wiki_lingua_en": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaEn",
+    "GEM/wiki_lingua_es": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaEs",
+    "GEM/wiki_lingua_fr": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaFr",
+    "GEM/wiki_lingua_hi": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaHi",
+    "GEM/wiki_lingua_id": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaId",
+    "GEM/wiki_lingua_it": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaIt",
+    "GEM/wiki_lingua_ja": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaJa",
+    "GEM/wiki_lingua_ko": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaKo",
+    "GEM/wiki_lingua_nl": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaNl",
+    "GEM/wiki_lingua_pt": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaPt",
+    "GEM/wiki_lingua_ru": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaRu",
+    "GEM/wiki_lingua_th": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaTh",
+    "GEM/wiki_lingua_tr": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaTr",
+    "GEM/wiki_lingua_vi": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaVi",
+    "GEM/wiki_lingua_zh": "lm_eval.tasks.gem_wikilingua:GEMWikiLinguaZh",
+    "e2e_nlg_cleaned": "lm_eval.tasks.e2e_nlg_cleaned:E2E_NLG_Cleaned",
+    "schema_guided_dstc8": "lm_eval.tasks.schema_guided_dstc8:Schema_Guided_DSTC8",
+    "gsarti/flores_101_afr": "lm_eval.tasks.flores_101:Flores101_afr",
+    "gsarti/flores_101_amh": "lm_eval.tasks.flores_101:Flores101_amh",
+    "gsarti/flores_101_ara": "lm_eval.tasks.flores_101:Flores101_ara",
+    "gsarti/flores_101_hye": "lm_eval.tasks.flores_101:Flores101_hye",
+    "gsarti/flores_101_asm": "lm_eval.tasks.flores_101:Flores101_asm",
+    "gsarti/flores_101_ast": "lm_eval.tasks.flores_101:Flores101_ast",
+    "gsarti/flores_101_azj": "lm_eval.tasks.flores_101:Flores101_azj",
+    "gsarti/flores_101_bel": "lm_eval.tasks.flores_101:Flores101_bel",
+    "gsarti/flores_101_ben": "lm_eval.tasks.flores_101:Flores101_ben",
+    "gsarti/flores_101_bos": "lm_eval.tasks.flores_101:Flores101_bos",
+    "gsarti/flores_101_bul": "lm_eval.tasks.flores_101:Flores101_bul",
+    "gsarti/flores_101_mya": "lm_eval.tasks.flores_101:Flores101_mya",
+    "gsarti/flores_101_cat": "lm_eval.tasks.flores_101:Flores101_cat",
+    "gsarti/flores_101_ceb": "lm_eval.tasks.flores_101:Flores101_ceb",
+    "gsarti/flores_101_zho_simpl": "lm_eval.tasks.flores_101:Flores101_zho_simpl",
+    "gsarti/flores_101_zho_trad": "lm_eval.tasks.flores_101:Flores101_zho_trad",
+    "gsarti/flores_101_hrv": "lm_eval.tasks.flores_101:Flores101_hrv",
+    "gsarti/flores_101_ces": "lm_eval.tasks.flores_101:Flores101_ces",
+    "gsarti/flores_101_dan": "lm_eval.tasks.flores_101:Flores101_dan",
+    "gsarti/flores_101_nld": "lm_eval.tasks.flores_101:Flores101_nld",
+    "gsarti/flores_101_eng": "lm_eval.tasks.flores_101:Flores101_eng",
+    "gsarti/flores_101_est": "lm_eval.tasks.flores_101:Flores101_est",
+    "gsarti/flores_101_tgl": "lm_eval.tasks.flores_101:Flores101_tgl",
+    "gsarti/flores_101_fin": "lm_eval.tasks.flores_101:Flores101_fin",
+    "gsarti/flores_101_fra": "lm_eval.tasks.flores_101:Flores101_fra",
+    "gsarti/flores_101_ful": "lm_eval.tasks.flores_101:Flores101_ful",
+    "gsarti/flores_101_glg": "lm_eval.tasks.flores_101:Flores101_glg",
+    "gsarti/flores_101_lug": "lm_eval.tasks.flores_101:Flores101_lug",
+    "gsarti/flores_101_kat": "lm_eval.tasks.flores_101:Flores101_kat",
+    "gsarti/flores_101_deu": "lm_eval.tasks.flores_101:Flores101_deu",
+    "gsarti/flores_101_ell": "lm_eval.tasks.flores_101:Flores101_ell",
+    "gsarti/flores_101_guj": "lm_eval.tasks.flores_101:Flores101_guj",
+    "gsarti/flores_101_hau": "lm_eval.tasks.flores_101:Flores101_hau",
+    "gsarti/flores_101_heb": "lm_eval.tasks.flores_101:Flores101_heb",
+    "gsarti/flores_101_hin": "lm_eval.tasks.flores_101:Flores101_hin",
+    "gsarti/flores_101_hun": "lm_eval.tasks.flores_101:Flores101_hun",
+    "gsarti/flores_101_isl": "lm_eval.tasks.flores_101:Flores101_isl",
+    "gsarti/flores_101_ibo": "lm_eval.tasks.flores_101:Flores101_ibo",
+    "gsarti/flores_101_ind": "lm_eval.tasks.flores_101:Flores101_ind",
+    "gsarti/flores_101_gle": "lm_eval.tasks.flores_101:Flores101_gle",
+    "gsarti/flores_101_ita": "lm_eval.tasks.flores_101:Flores101_ita",
+    "gsarti/flores_101_jpn": "lm_eval.tasks.flores_101:Flores101_jpn",
+    "gsarti/flores_101_jav": "lm_eval.tasks.flores_101:Flores101_jav",
+    "gsarti/flores_101_kea": "lm_eval.tasks.flores_101:Flores101_kea",
+    "gsarti/flores_101_kam": "lm_eval.tasks.flores_101:Flores101_kam",
+    "gsarti/flores_101_kan": "lm_eval.tasks.flores_101:Flores101_kan",
+    "gsarti/flores_101_kaz": "lm_eval.tasks.flores_101:Flores101_kaz",
+    "gsarti/flores_101_khm": "lm_eval.tasks.flores_101:Flores101_khm",
+    "gsarti/flores_101_kor": "lm_eval.tasks.flores_101:Flores101_kor",
+    "gsarti/flores_101_kir": "lm_eval.tasks.flores_101:Flores101_kir",
+    "gsarti/flores_101_lao": "lm_eval.tasks.flores_101:Flores101_lao",
+    "gsarti/flores_101_lav": "lm_eval.tasks.flores_101:Flores101_lav",
+    "gsarti/flores_101_lin": "lm_eval.tasks.flores_101:Flores101_lin",
+    "gsarti/flores_101_lit": "lm_eval.tasks.flores_101:Flores101_lit",
+    "gsarti/flores_101_luo": "lm_eval.tasks.flores_101:Flores101_luo",
+    "gsarti/flores_101_ltz": "lm_eval.tasks.flores_101:Flores101_ltz",
+    "gsarti/flores_101_mkd": "lm_eval.tasks.flores_101:Flores101_mkd",
+    "gsarti/flores_101_msa": "lm_eval.tasks.flores_101:Flores101_msa",
+    "gsarti/flores_101_mal": "lm_eval.tasks.flores_101:Flores101_mal",
+    "gsarti/flores_101_mlt": "lm_eval.tasks.flores_101:Flores101_mlt",
+    "gsarti/flores_101_mri": "lm_eval.tasks.flores_101:Flores101_mri",
+    "gsarti/flores_101_mar": "lm_eval.tasks.flores_101:Flores101_mar",
+    "gsarti/flores_101_mon": "lm_eval.tasks.flores_101:Flores101_mon",
+    "gsarti/flores_101_npi": "lm_eval.tasks.flores_101:Flores101_npi",
+    "gsarti/flores_101_nso": "lm_eval.tasks.flores_101:Flores101_nso",
+    "gsarti/flores_101_nob": "lm_eval.tasks.flores_101:Flores101_nob",
+    "gsarti/flores_101_nya": "lm_eval.tasks.flores_101:Flores101_nya",
+    "gsarti/flores_101_oci": "lm_eval.tasks.flores_101:Flores101_oci",
+    "gsarti/flores_101_ory": "lm_eval.tasks.flores_101:Flores101_ory",
+    "gsarti/flores_101_orm": "lm_eval.tasks.flores_101:Flores101_orm",
+    "gsarti/flores_101_pus": "lm_eval.tasks.flores_101:Flores101_pus",
+    "gsarti/flores_101_fas": "lm_eval.tasks.flores_101:Flores101_fas",
+    "gsarti/flores_101_pol": "lm_eval.tasks.flores_101:Flores101_pol",
+    "gsarti/flores_101_por": "lm_eval.tasks.flores_101:Flores101_por",
+    "gsarti/flores_101_pan": "lm_eval.tasks.flores_101:Flores101_pan",
+    "gsarti/flores_101_ron": "lm_eval.tasks.flores_101:Flores101_ron",
+    "gsarti/flores_101_rus": "lm_eval.tasks.flores_101:Flores101_rus",
+    "gsarti/flores_101_srp": "lm_eval.tasks.flores_101:Flores101_srp",
+    "gsarti/flores_101_sna": "lm_eval.tasks.flores_101:Flores101_sna",
+    "gsarti/flores_101_snd": "lm_eval.tasks.flores_101:Flores101_snd",
+    "gsarti/flores_101_slk": "lm_eval.tasks.flores_101:Flores101_slk",
+    "gsarti/flores_101_slv": "lm_eval.tasks.flores_101:Flores101_slv",
+    "gsarti/flores_101_som": "lm_eval.tasks.flores_101:Flores101_som",
+    "gsarti/flores_101_ckb": "lm_eval.tasks.flores_101:Flores101_ckb",
+    "gsarti/flores_101_spa": "lm_eval.tasks.flores_101:Flores101_spa",
+    "gsarti/flores_101_swh": "lm_eval.tasks.flores_101:Flores101_swh",
+    "gsarti/flores_101_swe": "lm_eval.tasks.flores_101:Flores101_swe",
+    "gsarti/flores_101_tgk": "lm_eval.tasks.flores_101:Flores101_tgk",
+    "gsarti/flores_101_tam": "lm_eval.tasks.flores_101:Flores101_tam",
+    "gsarti/flores_101_tel": "lm_eval.tasks.flores_101:Flores101_tel",
+    "gsarti/flores_101_tha": "lm_eval.tasks.flores_101:Flores101_tha",
+    "gsarti/flores_101_tur": "lm_eval.tasks.flores_101:Flores101_tur",
+    "gsarti/flores_101_ukr": "lm_eval.tasks.flores_101:Flores101_ukr",
+    "gsarti/flores_101_umb": "lm_eval.tasks.flores_101:Flores101_umb",
+    "gsarti/flores_101_urd": "lm_eval.tasks.flores_101:Flores101_urd",
+    "gsarti/flores_101_uzb": "lm_eval.tasks.flores_101:Flores101_uzb",
+    "gsarti/flores_101_vie": "lm_eval.tasks.flores_101:Flores101_vie",
+    "gsarti/flores_101_cym": "lm_eval.tasks.flores_101:Flores101_cym",
+    "gsarti/flores_101_wol": "lm_eval.tasks.flores_101:Flores101_wol",
+    "gsarti/flores_101_xho": "lm_eval.tasks.flores_101:Flores101_xho",
+    "gsarti/flores_101_yor": "lm_eval.tasks.flores_101:Flores101_yor",
+    "gsarti/flores_101_zul": "lm_eval.tasks.flores_101:Flores101_zul",
+    "lama_trex": "lm_eval.tasks.lama:Trex",
+    "lama_squad": "lm_eval.tasks.lama:Squad",
+    "lama_google_re": "lm_eval.tasks.lama:google_re",
+    "lama_concptnet": "lm_eval.tasks.lama:Conceptnet",
+    "race": "lm_eval.tasks.race:RACE",
+    "anli_r1": "lm_eval.tasks.anli:ANLIRound1",
+    "anli_r2": "lm_eval.tasks.anli:ANLIRound2",
+    "anli_r3": "lm_eval.tasks.anli:ANLIRound3",
+    "hans": "lm_eval.tasks.hans:HANS",
+    "blimp_adjunct_island": "lm_eval.tasks.blimp:BlimpAdjunctIsland",
+    "blimp_anaphor_gender_agreement": "lm_eval.tasks.blimp:BlimpAnaphorGenderAgreement",
+    "blimp_anaphor_number_agreement": "lm_eval.tasks.blimp:BlimpAnaphorNumberAgreement",
+    "blimp_animate_subject_passive": "lm_eval.tasks.blimp:BlimpAnimateSubjectPassive",
+    "blimp_animate_subject_trans": "lm_eval.tasks.blimp:BlimpAnimateSubjectTrans",
+    "blimp_causative": "lm_eval.tasks.blimp:BlimpCausative",
+    "blimp_complex_NP_island": "lm_eval.tasks.blimp:BlimpComplex_NPIsland",
+    "blimp_coordinate_structure_constraint_complex_left_branch": "lm_eval.tasks.blimp:BlimpCoordinateStructureConstraintComplexLeftBranch",
+    "blimp_coordinate_structure_constraint_object_extraction": "lm_eval.tasks.blimp:BlimpCoordinateStructureConstraintObjectExtraction",
+    "blimp_determiner_noun_agreement_1": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreement_1",
+    "blimp_determiner_noun_agreement_2": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreement_2",
+    "blimp_determiner_noun_agreement_irregular_1": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreementIrregular_1",
+    "blimp_determiner_noun_agreement_irregular_2": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreementIrregular_2",
+    "blimp_determiner_noun_agreement_with_adj_2": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreementWithAdj_2",
+    "blimp_determiner_noun_agreement_with_adj_irregular_1": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreementWithAdjIrregular_1",
+    "blimp_determiner_noun_agreement_with_adj_irregular_2": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreementWithAdjIrregular_2",
+    "blimp_determiner_noun_agreement_with_adjective_1": "lm_eval.tasks.blimp:BlimpDeterminerNounAgreementWithAdjective_1",
+    "blimp_distractor_agreement_relational_noun": "lm_eval.tasks.blimp:BlimpDistractorAgreementRelationalNoun",
+    "blimp_distractor_agreement_relative_clause": "lm_eval.tasks.blimp:BlimpDistractorAgreementRelativeClause",
+    "blimp_drop_argument": "lm_eval.tasks.blimp:BlimpDropArgument",
+    "blimp_ellipsis_n_bar_1": "lm_eval.tasks.blimp:BlimpEllipsisNBar_1",
+    "blimp_ellipsis_n_bar_2": "lm_eval.tasks.blimp:BlimpEllipsisNBar_2",
+    "blimp_existential_there_object_raising": "lm_eval.tasks.blimp:BlimpExistentialThereObjectRaising",
+    "blimp_existential_there_quantifiers_1": "lm_eval.tasks.blimp:BlimpExistentialThereQuantifiers_1",
+    "blimp_existential_there_quantifiers_2": "lm_eval.tasks.blimp:BlimpExistentialThereQuantifiers_2",
+    "blimp_existential_there_subject_raising": "lm_eval.tasks.blimp:BlimpExistentialThereSubjectRaising",
+    "blimp_expletive_it_object_raising": "lm_eval.tasks.blimp:BlimpExpletiveItObjectRaising",
+    "blimp_inchoative": "lm_eval.tasks.blimp:BlimpInchoative",
+    "blimp_intransitive": "lm_eval.tasks.blimp:BlimpIntransitive",
+    "blimp_irregular_past_participle_adjectives": "lm_eval.tasks.blimp:BlimpIrregularPastParticipleAdjectives",
+    "blimp_irregular_past_participle_verbs": "lm_eval.tasks.blimp:BlimpIrregularPastParticipleVerbs",
+    "blimp_irregular_plural_subject_verb_agreement_1": "lm_eval.tasks.blimp:BlimpIrregularPluralSubjectVerbAgreement_1",
+    "blimp_irregular_plural_subject_verb_agreement_2": "lm_eval.tasks.blimp:BlimpIrregularPluralSubjectVerbAgreement_2",
+    "blimp_left_branch_island_echo_question": "lm_eval.tasks.blimp:BlimpLeftBranchIslandEchoQuestion",
+    "blimp_left_branch_island_simple_question": "lm_eval.tasks.blimp:BlimpLeftBranchIslandSimpleQuestion",
+    "blimp_matrix_question_npi_licensor_present": "lm_eval.tasks.blimp:BlimpMatrixQuestionNpiLicensorPresent",
+    "blimp_npi_present_1": "lm_eval.tasks.blimp:BlimpNpiPresent_1",
+    "blimp_npi_present_2": "lm_eval.tasks.blimp:BlimpNpiPresent_2",
+    "blimp_only_npi_licensor_present": "lm_eval.tasks.blimp:BlimpOnlyNpiLicensorPresent",
+    "blimp_only_npi_scope": "lm_eval.tasks.blimp:BlimpOnlyNpiScope",
+    "blimp_passive_1": "lm_eval.tasks.blimp:BlimpPassive_1",
+    "blimp_passive_2": "lm_eval.tasks.blimp:BlimpPassive_2",
+    "blimp_principle_A_c_command": "lm_eval.tasks.blimp:BlimpPrinciple_ACCommand",
+    "blimp_principle_A_case_1": "lm_eval.tasks.blimp:BlimpPrinciple_ACase_1",
+    "blimp_principle_A_case_2": "lm_eval.tasks.blimp:BlimpPrinciple_ACase_2",
+    "blimp_principle_A_domain_1": "lm_eval.tasks.blimp:BlimpPrinciple_ADomain_1",
+    "blimp_principle_A_domain_2": "lm_eval.tasks.blimp:BlimpPrinciple_ADomain_2",
+    "blimp_principle_A_domain_3": "lm_eval.tasks.blimp:BlimpPrinciple_ADomain_3",
+    "blimp_principle_A_reconstruction": "lm_eval.tasks.blimp:BlimpPrinciple_AReconstruction",
+    "blimp_regular_plural_subject_verb_agreement_1": "lm_eval.tasks.blimp:BlimpRegularPluralSubjectVerbAgreement_1",
+    "blimp_regular_plural_subject_verb_agreement_2": "lm_eval.tasks.blimp:BlimpRegularPluralSubjectVerbAgreement_2",
+    "blimp_sentential_negation_npi_licensor_present": "lm_eval.tasks.blimp:BlimpSententialNegationNpiLicensorPresent",
+    "blimp_sentential_negation_npi_scope": "lm_eval.tasks.blimp:BlimpSententialNegationNpiScope",
+    "blimp_sentential_subject_island": "lm_eval.tasks.blimp:BlimpSententialSubjectIsland",
+    "blimp_superlative_quantifiers_1": "lm_eval.tasks.blimp:BlimpSuperlativeQuantifiers_1",
+    "blimp_superlative_quantifiers_2": "lm_eval.tasks.blimp:BlimpSuperlativeQuantifiers_2",
+    "blimp_tough_vs_raising_1": "lm_eval.tasks.blimp:BlimpToughVsRaising_1",
+    "blimp_tough_vs_raising_2": "lm_eval.tasks.blimp:BlimpToughVsRaising_2",
+    "blimp_transitive": "lm_eval.tasks.blimp:BlimpTransitive",
+    "blimp_wh_island": "lm_eval.tasks.blimp:BlimpWhIsland",
+    "blimp_wh_questions_object_gap": "lm_eval.tasks.blimp:BlimpWhQuestionsObjectGap",
+    "blimp_wh_questions_subject_gap": "lm_eval.tasks.blimp:BlimpWhQuestionsSubjectGap",
+    "blimp_wh_questions_subject_gap_long_distance": "lm_eval.tasks.blimp:BlimpWhQuestionsSubjectGapLongDistance",
+    "blimp_wh_vs_that_no_gap": "lm_eval.tasks.blimp:BlimpWhVsThatNoGap",
+    "blimp_wh_vs_that_no_gap_long_distance": "lm_eval.tasks.blimp:BlimpWhVsThatNoGapLongDistance",
+    "blimp_wh_vs_that_with_gap": "lm_eval.tasks.blimp:BlimpWhVsThatWithGap",
+    "blimp_wh_vs_that_with_gap_long_distance": "lm_eval.tasks.blimp:BlimpWhVsThatWithGapLongDistance",
+    "cnn_dailymail": "lm_eval.tasks.cnn_dailymail:CnnDailyMail",
+    "mlsum_es": "lm_eval.tasks.gem_mlsum:GEMMLSUMEs",
+    "mlsum_de": "lm_eval.tasks.gem_mlsum:GEMMLSUMDe",
+    "mlsum_es_covid_challenge_set": "lm_eval.tasks.gem_mlsum:GEMMLSUMEsChallgeTestCovid",
+    "mlsum_de_covid_challenge_set": "lm_eval.tasks.gem_mlsum:GEMMLSUMDeChallgeTestCovid",
+    "gem_xsum": "lm_eval.tasks.gem_xsum:GEMXSUM",
+    "gem_xsum_challenge_sample": "lm_eval.tasks.gem_xsum:GEMXSUMChallgeSample",
+    "gem_xsum_challenge_test_backtranslation": "lm_eval.tasks.gem_xsum:GEMXSUMChallgeTestBacktranslation",
+    "gem_xsum_challenge_test_bfp_02": "lm_eval.tasks.gem_xsum:GEMXSUMChallgeTestBFP02",
+    "gem_xsum_challenge_test_bfp_05": "lm_eval.tasks.gem_xsum:GEMXSUMChallgeTestBFP05",
+    "gem_xsum_challenge_test_nopunc": "lm_eval.tasks.gem_xsum:GEMXSUMChallgeTestNopunc",
+    "gem_xsum_challenge_test_covid": "lm_eval.tasks.gem_xsum:GEMXSUMChallgeTestCovid",
+    "lama-trex": "lm_eval.tasks.lama:Trex",
+    "lama-squad": "lm_eval.tasks.lama:Squad",
+    "lama-google_re": "lm_eval.tasks.lama:google_re",
+    "lama-concptnet": "lm_eval.tasks.lama:Conceptnet",
+    "bigscience-lama": "lm_eval.tasks.lama:BigScienceLAMA",
+    "wino_bias_type1_pro": "lm_eval.tasks.wino_bias:WinoBiasType1Pro",
+    "wino_bias_type1_anti": "lm_eval.tasks.wino_bias:WinoBiasType1Anti",
+    "wino_bias_type2_pro": "lm_eval.tasks.wino_bias:WinoBiasType2Pro",
+    "wino_bias_type2_anti": "lm_eval.tasks.wino_bias:WinoBiasType2Anti",
+    "crows_pairs_english": "lm_eval.tasks.crows_pairs_multilingual:CrowsPairsEnglish",
+    "crows_pairs_french": "lm_eval.tasks.crows_pairs_multilingual:CrowsPairsFrench",
+    "jigsaw_unintended_bias": "lm_eval.tasks.jigsaw_unintended_bias:JigsawUnintendedBias",
+    "huffpost": "lm_eval.tasks.huff_post:HuffPost",
+    "lince_sa": "lm_eval.tasks.lince:LinCESentimentAnalysis",
+    "crd3": "lm_eval.tasks.crd3:CRD3",
+    "wmt14_fr_en": "lm_eval.tasks.wmt:WMT14FrEn",
+    "wmt14_de_en": "lm_eval.tasks.wmt:WMT14DeEn",
+    "diabla": "lm_eval.tasks.diabla:DiaBLa",
+    "xquad_en": "lm_eval.tasks.xquad:XQuADEnglish",
+    "xquad_ar": "lm_eval.tasks.xquad:XQuADArabic",
+    "piaf": "lm_eval.tasks.piaf:PIAF",
+    "scitail": "lm_eval.tasks.scitail:SciTailTE",
+}
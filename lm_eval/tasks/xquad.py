@@ -14,8 +14,9 @@ Homepage: https://github.com/deepmind/xquad
 """
 import datasets
 from math import exp
-from functools import partial
+from functools import lru_cache, partial
 from packaging import version
+from lm_eval import metrics
 from lm_eval.base import rf, PromptSourceTask
 
 
@@ -32,14 +33,27 @@ _CITATION = """
 """
 
 
+@lru_cache(maxsize=None)
+def _load_squad_metric():
+    return datasets.load_metric("squad_v2")
+
+
 def _squad_metric(predictions, references):
-    squad_metric = datasets.load_metric("squad_v2")
+    squad_metric = _load_squad_metric()
     return squad_metric.compute(predictions=predictions, references=references)
 
 
-def _squad_agg(key, items):
+@metrics.shared_aggregation
+def _squad_results(items):
     predictions, references = zip(*items)
-    return _squad_metric(predictions=predictions, references=references)[key]
+    return _squad_metric(predictions=predictions, references=references)
+
+
+def _squad_agg(key, items):
+    """Reads `key` from the squad_v2 metric of `items`, which is only computed
+    once for all the sub-metrics (see `process_results`).
+    """
+    return _squad_results(items)[key]
 
 
 class XQuADEnglish(PromptSourceTask):
@@ -121,23 +135,26 @@ class XQuADEnglish(PromptSourceTask):
                 "pred": pred,
                 "target": doc['answers'],
             }
+        # The same item for every sub-metric, so that the squad_v2 metric is
+        # computed once for all of them.
+        item = (predictions, references)
         return {
             # Exact match (the normalized answer exactly match the gold answer)
-            'exact': (predictions, references),
+            'exact': item,
             # The F-score of predicted tokens versus the gold answer
-            'f1': (predictions, references),
+            'f1': item,
             # Exact match (the normalized answer exactly match the gold answer)
-            'HasAns_exact': (predictions, references),
+            'HasAns_exact': item,
             # The F-score of predicted tokens versus the gold answer
-            'HasAns_f1': (predictions, references),
+            'HasAns_f1': item,
             # No-answer probability threshold associated to the best exact match
-            'best_exact_thresh': (predictions, references),
+            'best_exact_thresh': item,
             # No-answer probability threshold associated to the best F1
-            'best_f1_thresh': (predictions, references),
+            'best_f1_thresh': item,
             # Best exact match (with varying threshold)
-            'best_exact': (predictions, references),
+            'best_exact': item,
             # Best F1 (with varying threshold)
-            'best_f1': (predictions, references),
+            'best_f1': item,
         }, example
 
     def aggregation(self):
@@ -265,23 +282,26 @@ class XQuADArabic(PromptSourceTask):
                 "pred": pred,
                 "target": doc['answers'],
             }
+        # The same item for every sub-metric, so that the squad_v2 metric is
+        # computed once for all of them.
+        item = (predictions, references)
         return {
             # Exact match (the normalized answer exactly match the gold answer)
-            'exact': (predictions, references),
+            'exact': item,
             # The F-score of predicted tokens versus the gold answer
-            'f1': (predictions, references),
+            'f1': item,
             # Exact match (the normalized answer exactly match the gold answer)
-            'HasAns_exact': (predictions, references),
+            'HasAns_exact': item,
             # The F-score of predicted tokens versus the gold answer
-            'HasAns_f1': (predictions, references),
+            'HasAns_f1': item,
             # No-answer probability threshold associated to the best exact match
-            'best_exact_thresh': (predictions, references),
+            'best_exact_thresh': item,
             # No-answer probability threshold associated to the best F1
-            'best_f1_thresh': (predictions, references),
+            'best_f1_thresh': item,
             # Best exact match (with varying threshold)
-            'best_exact': (predictions, references),
+            'best_exact': item,
             # Best F1 (with varying threshold)
-            'best_f1': (predictions, references),
+            'best_f1': item,
         }, example
 
     def aggregation(self):
@@ -2,9 +2,11 @@ import os
 import pathlib
 import re
 import collections
+import collections.abc
 import functools
 import inspect
 import sys
+import typing
 import pytest
 from typing import List
 
@@ -23,6 +25,51 @@ def sh(x):
         raise ExitCodeError()
 
 
+def _arg_types(param):
+    """Returns the types among bool, int and float that `param` is annotated
+    with, e.g. `Optional[int]`, or that its default value has when it is not
+    annotated.
+    """
+    if param.annotation is not inspect.Parameter.empty:
+        types = typing.get_args(param.annotation) or (param.annotation,)
+    elif param.default is not inspect.Parameter.empty:
+        types = (type(param.default),)
+    else:
+        types = ()
+    return [t for t in (bool, int, float) if t in types]
+
+
+def handle_arg_string(arg, types):
+    """Converts a single `--model_args` value into the first of `types` (bool,
+    int or float) that it can be parsed as, and leaves it as a `str` otherwise.
+    """
+    if bool in types and arg.lower() in ("true", "false"):
+        return arg.lower() == "true"
+    for type_ in (int, float):
+        if type_ in types:
+            try:
+                return type_(arg)
+            except ValueError:
+                pass
+    return arg
+
+
+def parse_arg_types(fn, args):
+    """Converts the `str` values of `args`, e.g. parsed `--model_args`, for the
+    parameters of `fn` annotated as a bool, int or float.
+
+    The others are left as strings, so that e.g. a numeric `revision` is not
+    turned into an int.
+    """
+    params = inspect.signature(fn).parameters
+    return {
+        k: handle_arg_string(v, _arg_types(params[k]))
+        if k in params and isinstance(v, str)
+        else v
+        for k, v in args.items()
+    }
+
+
 def simple_parse_args_string(args_string):
     """
     Parses something like
@@ -204,7 +251,7 @@ def flatten(d, parent_key="", sep="_"):
     items = []
     for k, v in d.items():
         new_key = parent_key + sep + k if parent_key else k
-        if isinstance(v, collections.MutableMapping):
+        if isinstance(v, collections.abc.MutableMapping):
             items.extend(flatten(v, new_key, sep=sep).items())
         else:
             items.append((new_key, v))
@@ -3,8 +3,9 @@ import datetime
 import json
 import logging
 import os
+import pickle
 
-from lm_eval import tasks, evaluator
+from lm_eval import example_writer, instrumentation, tasks, evaluator
 from codecarbon import OfflineEmissionsTracker
 
 logging.getLogger("openai").setLevel(logging.WARNING)
@@ -37,6 +38,61 @@ def parse_args():
     parser.add_argument("--no_cache", action="store_true")
     parser.add_argument("--description_dict_path", default=None)
     parser.add_argument("--check_integrity", action="store_true")
+    parser.add_argument(
+        "--examples_format",
+        choices=["jsonl", "parquet"],
+        default="jsonl",
+        help="`parquet` writes the examples to `outputs/examples-{output_path}.parquet` and their prompts to `outputs/prompts-{output_path}.parquet`.",
+    )
+    parser.add_argument(
+        "--examples_compression",
+        choices=["zstd"],
+        default=None,
+        help="Compress `outputs/examples-{output_path}.jsonl` to `.jsonl.zst`, or use zstd for the Parquet files.",
+    )
+    parser.add_argument(
+        "--examples_dedup",
+        action="store_true",
+        help="Write the fields shared by all the examples of a prompt (e.g. its template) once per prompt, in a header record. Read such files with `lm_eval.example_writer.read_examples`.",
+    )
+    parser.add_argument(
+        "--stderr_method",
+        choices=["bootstrap", "analytical"],
+        default="bootstrap",
+        help="`analytical` replaces the bootstrap of perplexities, bits per byte, F1 and MCC with closed-form/delta-method stderrs.",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=None,
+        help="Number of worker processes of the metrics (e.g. bootstraps), started once for the whole run. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--num_shards",
+        type=int,
+        default=1,
+        help="""Split the evaluation into `num_shards` shards that can run on different nodes.
+    Each shard writes its raw per-doc metric values to `outputs/shard-{shard_id}-of-{num_shards}-{output_path}.pkl`;
+    combine them with `python -m scripts.merge_shards`.
+    """,
+    )
+    parser.add_argument("--shard_id", type=int, default=0)
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Write the timed stages of the evaluation to `outputs/trace-{output_path}.json` as a Chrome trace.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write the wall time and input shape of every model batch to `outputs/profile-{output_path}.jsonl`.",
+    )
+    parser.add_argument(
+        "--profile_torch_batches",
+        type=int,
+        default=0,
+        help="With `--profile`, also run `torch.profiler` over this many model batches and write them to `outputs/torch-trace-{output_path}.json`.",
+    )
     return parser.parse_args()
 
 
@@ -72,15 +128,22 @@ def args_to_name(args):
     return filename
 
 
-def setup_example_logger(output_path):
-    """Sets up a logger that will save each example and prediction."""
-    logger = logging.getLogger("examples")
+def setup_example_writer(output_path, file_format, compression, dedup):
+    """Sets up the writer that will save each example and prediction."""
+    if file_format == "parquet":
+        return example_writer.ParquetExampleWriter(
+            f"./outputs/examples-{output_path}.parquet",
+            f"./outputs/prompts-{output_path}.parquet",
+            compression=compression or "snappy",
+        )
     filename = f"./outputs/examples-{output_path}.jsonl"
-    formatter = logging.Formatter("%(message)s")
-    handler = logging.FileHandler(filename)
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
+    if compression == "zstd":
+        filename += ".zst"
+    return example_writer.ExampleWriter(
+        filename,
+        compression=compression,
+        dedup_fields=example_writer.PROMPT_FIELDS if dedup else None,
+    )
 
 
 def main():
@@ -103,10 +166,36 @@ def main():
         with open(args.description_dict_path, "r") as f:
             description_dict = json.load(f)
 
+    assert not (
+        args.examples_dedup and args.examples_format == "parquet"
+    ), "`--examples_dedup` only applies to `jsonl`; Parquet always writes the prompts to their own file."
+
+    if args.num_shards > 1:
+        assert (
+            args.output_path is not None
+        ), "Sharded runs need an `--output_path` shared by all the shards."
     output_path = args_to_name(args)
-    setup_example_logger(output_path)
+    if args.num_shards > 1:
+        output_path = f"shard-{args.shard_id}-of-{args.num_shards}-{output_path}"
+    examples = setup_example_writer(
+        output_path,
+        args.examples_format,
+        args.examples_compression,
+        args.examples_dedup,
+    )
 
-    with OfflineEmissionsTracker(country_iso_code="FRA", log_level="error"):
+    profiler_hooks = []
+    if args.profile:
+        batch_timer = instrumentation.BatchTimer()
+        profiler_hooks.append(batch_timer)
+        if args.profile_torch_batches > 0:
+            torch_profiler = instrumentation.TorchProfilerHook(
+                f"./outputs/torch-trace-{output_path}.json",
+                max_batches=args.profile_torch_batches,
+            )
+            profiler_hooks.append(torch_profiler)
+
+    with OfflineEmissionsTracker(country_iso_code="FRA", log_level="error"), examples:
         results = evaluator.simple_evaluate(
             model=args.model,
             model_args=args.model_args,
@@ -120,10 +209,35 @@ def main():
             check_integrity=args.check_integrity,
             seed=args.seed,
             parallelize=args.parallelize,
+            num_shards=args.num_shards,
+            shard_id=args.shard_id,
+            trace_path=f"./outputs/trace-{output_path}.json" if args.trace else None,
+            profiler_hooks=profiler_hooks,
+            num_workers=args.num_workers,
+            stderr_method=args.stderr_method,
+            example_writer=examples,
         )
 
+    if args.profile:
+        batch_timer.write(f"./outputs/profile-{output_path}.jsonl")
+        if args.profile_torch_batches > 0:
+            # In case the evaluation had fewer batches than requested.
+            torch_profiler.close()
+
+    if args.num_shards > 1:
+        # Raw metric values are pickled, rather than dumped to json, so that the
+        # merged aggregates are bit-identical to those of an unsharded run.
+        with open(f"./outputs/{output_path}.pkl", "wb") as f:
+            pickle.dump(results, f)
+        os.rename("emissions.csv", f"./outputs/emissions-{output_path}.csv")
+        return
+
     with open(f"./outputs/agg-{output_path}.json", "w") as f:
-        json.dump({"results": results["results"], "config": results["config"]}, f)
+        agg = {"results": results["results"], "config": results["config"]}
+        for key in ("model_load", "usage", "timing"):
+            if key in results:
+                agg[key] = results[key]
+        json.dump(agg, f)
 
     from scripts.agg2slim import agg2slim
 
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of SARI: the authors' `SARIsent`, one example at a time, against
+the batched `sari_batched.sari_scores` over the whole corpus, on synthetic
+ASSET/TURK-like examples (a source, a candidate and several references each):
+
+    python -m scripts.bench.bench_sari --num_examples 2000 --num_refs 8
+"""
+import argparse
+import json
+import random
+import time
+
+from lm_eval.metric_impls import sari, sari_batched
+from scripts.bench import fixtures
+
+
+def make_examples(num_examples, num_refs, seed=1234):
+    rnd = random.Random(seed)
+    examples = []
+    for _ in range(num_examples):
+        source = fixtures._sentence(rnd, min_words=10, max_words=30)
+        words = source.split(" ")
+        # Simplifications keep most of the words of the source.
+        candidate = " ".join(w for w in words if rnd.random() < 0.7)
+        references = [
+            " ".join(w if rnd.random() < 0.8 else rnd.choice(fixtures.NOUNS) for w in words)
+            for _ in range(num_refs)
+        ]
+        examples.append((source, candidate, references))
+    return examples
+
+
+def _time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_benchmark(num_examples, num_refs, repeats=3, seed=1234):
+    examples = make_examples(num_examples, num_refs, seed)
+    sources, candidates, references = zip(*examples)
+    sent_s, sent_scores = _time(lambda: [sari.SARIsent(*ex) for ex in examples], repeats)
+    batched_s, batched_scores = _time(
+        lambda: sari_batched.sari_scores(sources, candidates, references), repeats
+    )
+    assert sent_scores == batched_scores, "The batched SARI scores differ."
+    return {
+        "num_examples": num_examples,
+        "num_refs": num_refs,
+        "sarisent_s": sent_s,
+        "batched_s": batched_s,
+        "speedup": sent_s / batched_s,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num_examples", type=int, default=2000)
+    parser.add_argument("--num_refs", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    result = run_benchmark(args.num_examples, args.num_refs, args.repeats, args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Synthetic local fixture datasets and prompts for the harness-overhead benchmarks.
+
+Each fixture mirrors the schema of the HuggingFace dataset its task reads, so the
+real task classes run unchanged on top of it, but is generated locally from a
+seed so that benchmarks neither need network access nor depend on the prompts
+shipped with the installed promptsource version.
+"""
+import json
+import os
+import random
+
+import datasets
+from promptsource.templates import Template
+
+from lm_eval.base import PromptSourceTask
+from lm_eval.tasks import blimp, flores_101, gem_webnlg, glue
+
+
+NOUNS = ["dog", "cat", "teacher", "river", "city", "book", "doctor", "song", "garden", "car"]
+VERBS = ["sees", "likes", "finds", "helps", "reads", "visits", "paints", "follows"]
+ADJECTIVES = ["old", "quiet", "bright", "small", "famous", "green", "tired", "clever"]
+NAMES = ["Alice", "Bob", "Carla", "Dmitri", "Eve", "Farah", "Goran", "Hana"]
+
+
+def _sentence(rnd, min_words=4, max_words=12):
+    words = []
+    for _ in range(rnd.randint(min_words, max_words)):
+        words.append(rnd.choice(NOUNS + VERBS + ADJECTIVES + ["the", "a", "and"]))
+    return " ".join(words).capitalize() + "."
+
+
+def _blimp_doc(rnd, i):
+    name, noun, verb = rnd.choice(NAMES), rnd.choice(NOUNS), rnd.choice(VERBS)
+    return {
+        "sentence_good": f"Who should {name} {verb[:-1]} the {noun} after leaving?",
+        "sentence_bad": f"Who should {name} {verb[:-1]} the {noun} after leaving the {noun}?",
+        "field": "syntax",
+        "linguistics_term": "island_effects",
+        "UID": "adjunct_island",
+        "simple_LM_method": True,
+        "one_prefix_method": False,
+        "two_prefix_method": False,
+        "lexically_identical": False,
+        "pair_id": i,
+    }
+
+
+def _rte_doc(rnd, i):
+    return {
+        "sentence1": " ".join(_sentence(rnd, 12, 30) for _ in range(rnd.randint(1, 3))),
+        "sentence2": _sentence(rnd, 5, 10),
+        "label": rnd.randint(0, 1),
+        "idx": i,
+    }
+
+
+def _webnlg_doc(rnd, i):
+    triples = [
+        f"{rnd.choice(NAMES)} | {rnd.choice(VERBS)} | {rnd.choice(ADJECTIVES)} {rnd.choice(NOUNS)}"
+        for _ in range(rnd.randint(1, 5))
+    ]
+    references = [
+        " ".join(_sentence(rnd) for _ in range(len(triples)))
+        for _ in range(rnd.randint(1, 3))
+    ]
+    return {
+        "gem_id": f"web_nlg_en-{i}",
+        "input": triples,
+        "target": references[0],
+        "references": references,
+        "category": rnd.choice(["Airport", "Astronaut", "City", "Food"]),
+    }
+
+
+def _flores_doc(rnd, i):
+    return {
+        "id": i,
+        "URL": f"https://example.org/{i}",
+        "domain": rnd.choice(["wikinews", "wikivoyage", "wikibooks"]),
+        "topic": rnd.choice(["science", "travel", "politics", "sports"]),
+        "has_image": rnd.randint(0, 1),
+        "has_hyperlink": rnd.randint(0, 1),
+        "sentence": " ".join(_sentence(rnd, 8, 30) for _ in range(rnd.randint(1, 2))),
+    }
+
+
+def _prompt(name, jinja, metrics, answer_choices=None):
+    prompt = Template(
+        name,
+        jinja,
+        "bench",
+        metadata=Template.Metadata(metrics=metrics),
+        answer_choices=answer_choices,
+    )
+    # Fixed, rather than random, so that the logged examples are reproducible.
+    prompt.id = name
+    return prompt
+
+
+# name -> (task class, splits and doc generator, prompt, default num_fewshot)
+BENCHMARKS = {
+    "blimp": (
+        blimp.BlimpAdjunctIsland,
+        {"train": 1.0},
+        _blimp_doc,
+        _prompt(
+            "grammatical",
+            "Which sentence is grammatical? ||| {{sentence_good}}",
+            ["Accuracy"],
+            answer_choices="{{sentence_good}} ||| {{sentence_bad}}",
+        ),
+        0,
+    ),
+    "glue_rte": (
+        glue.RTE,
+        {"train": 2.0, "validation": 1.0},
+        _rte_doc,
+        _prompt(
+            "does it imply",
+            '{{sentence1}}\nQuestion: Does this imply that "{{sentence2}}"? Yes or no? ||| {{answer_choices[label]}}',
+            ["Accuracy"],
+            answer_choices="Yes ||| No",
+        ),
+        3,
+    ),
+    "gem_webnlg": (
+        gem_webnlg.WebNLG,
+        {"validation": 1.0, "test": 0.25},
+        _webnlg_doc,
+        _prompt(
+            "verbalize",
+            'Verbalize the following triples: {{input | join("; ")}} ||| {{target}}',
+            ["BLEU", "ROUGE"],
+        ),
+        1,
+    ),
+    "flores_ppl": (flores_101.make_class("eng"), {"dev": 1.0}, _flores_doc, None, 0),
+}
+
+
+def write_fixtures(fixtures_dir, num_docs, seed=1234):
+    """Writes the JSON lines files of every benchmark to `fixtures_dir`, with
+    `num_docs` docs scaled by each split's weight. Existing files are reused.
+
+    :return: dict[str, dict[str, str]]
+        The path of each split of each benchmark.
+    """
+    paths = {}
+    for name, (_, splits, make_doc, _, _) in BENCHMARKS.items():
+        paths[name] = {}
+        for split, weight in splits.items():
+            size = max(1, int(num_docs * weight))
+            path = os.path.join(fixtures_dir, f"{name}-{split}-{size}-{seed}.jsonl")
+            paths[name][split] = path
+            if os.path.exists(path):
+                continue
+            rnd = random.Random(f"{seed}-{name}-{split}")
+            os.makedirs(fixtures_dir, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                for i in range(size):
+                    f.write(json.dumps(make_doc(rnd, i)) + "\n")
+            os.replace(path + ".tmp", path)
+    return paths
+
+
+def make_task_dict(name, split_paths, cache_dir=None):
+    """Instantiates the task of benchmark `name` on its local fixture files.
+
+    :return: dict[str, Task]
+        A task dict in the format of `lm_eval.tasks.get_task_dict_promptsource`.
+    """
+    task_class, _, _, prompt, _ = BENCHMARKS[name]
+
+    class FixtureTask(task_class):
+        def download(self, data_dir=None, cache_dir=None, download_mode=None):
+            self.dataset = datasets.load_dataset(
+                "json", data_files=split_paths, cache_dir=cache_dir
+            )
+
+        if issubclass(task_class, PromptSourceTask):
+
+            def doc_to_target(self, doc):
+                target = super().doc_to_target(doc)
+                # Released promptsource versions return a single target string.
+                return [target] if isinstance(target, str) else target
+
+    FixtureTask.__name__ = task_class.__name__
+    if prompt is None:
+        return {f"{name}+null": FixtureTask(cache_dir=cache_dir)}
+    return {f"{name}+{prompt.name}": FixtureTask(cache_dir=cache_dir, prompt=prompt)}
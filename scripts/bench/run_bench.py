@@ -0,0 +1,301 @@
+"""
+Benchmarks the overhead of the harness itself, i.e. everything `evaluate` does
+outside of the model: dataset loading, few-shot context construction, request
+reordering, caching, `process_results` and its deferred metrics, aggregation
+and bootstrapping.
+
+Every benchmark runs `evaluate` on local fixture datasets (see `fixtures.py`)
+with a near-zero-cost LM and reports the wall time spent in each stage, the peak
+RSS and the number of LM requests per second, as JSON that can be compared
+between commits:
+
+    python -m scripts.bench.run_bench --output_path bench-new.json --baseline bench-old.json
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+
+import lm_eval.base
+import lm_eval.metrics
+import lm_eval.models
+from lm_eval import evaluator
+from scripts.bench import fixtures
+
+
+class NullLM(lm_eval.base.LM):
+    """A deterministic LM that does no work, so that the benchmarks only measure
+    the harness.
+    """
+
+    def loglikelihood(self, requests):
+        return [(-float(len(continuation)), False) for _, continuation in requests]
+
+    def loglikelihood_rolling(self, requests):
+        return [-float(len(string)) for (string,) in requests]
+
+    def greedy_until(self, requests):
+        return [" the old dog sees a city." for _ in requests]
+
+
+class StageTimer:
+    """Accumulates the exclusive wall time spent in each stage, i.e. the time
+    spent in a stage minus that of the stages nested in it.
+    """
+
+    def __init__(self):
+        self.times = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self._stack = []
+
+    def wrap(self, stage, fn):
+        def _wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            self._stack.append(0.0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = self._stack.pop()
+                self.times[stage] += elapsed - nested
+                self.calls[stage] += 1
+                if self._stack:
+                    self._stack[-1] += elapsed
+
+        _wrapper.__wrapped__ = fn
+        return _wrapper
+
+
+def _instrument_task(task, timer):
+    task.fewshot_context = timer.wrap("fewshot_context", task.fewshot_context)
+    task.construct_requests = timer.wrap("construct_requests", task.construct_requests)
+    task.process_results = timer.wrap("process_results", task.process_results)
+    aggregation = task.aggregation
+    task.aggregation = lambda: {
+        metric: timer.wrap("aggregation", fn) for metric, fn in aggregation().items()
+    }
+
+
+def _instrument_lm(lm, timer):
+    for reqtype in ["loglikelihood", "loglikelihood_rolling", "greedy_until"]:
+        setattr(lm, reqtype, timer.wrap("model", getattr(lm, reqtype)))
+
+
+def _count_requests(lm, counts):
+    def _wrap(reqtype, fn):
+        def _counted(requests):
+            counts[reqtype] += len(requests)
+            return fn(requests)
+
+        return _counted
+
+    for reqtype in ["loglikelihood", "loglikelihood_rolling", "greedy_until"]:
+        setattr(lm, reqtype, _wrap(reqtype, getattr(lm, reqtype)))
+
+
+def run_benchmark(name, split_paths, lm, num_fewshot, bootstrap_iters, cache, tmpdir):
+    """Runs `evaluate` once on benchmark `name` and returns its measurements."""
+    timer = StageTimer()
+    start = time.perf_counter()
+
+    load = timer.wrap("load", fixtures.make_task_dict)
+    task_dict = load(name, split_paths, cache_dir=os.path.join(tmpdir, "datasets"))
+    for task in task_dict.values():
+        _instrument_task(task, timer)
+
+    request_counts = collections.Counter()
+    _instrument_lm(lm, timer)
+    _count_requests(lm, request_counts)
+    if cache:
+        lm = lm_eval.base.CachingLM(lm, os.path.join(tmpdir, f"{name}-cache.db"))
+        for reqtype in ["loglikelihood", "loglikelihood_rolling", "greedy_until"]:
+            setattr(lm, reqtype, timer.wrap("caching", getattr(lm, reqtype)))
+
+    stderr_for_metric = lm_eval.metrics.stderr_for_metric
+
+    def _timed_stderr_for_metric(metric, bootstrap_iters, **kwargs):
+        # Unwrap the timed aggregation, which `stderr_for_metric` looks up by identity.
+        stderr = stderr_for_metric(
+            getattr(metric, "__wrapped__", metric), bootstrap_iters, **kwargs
+        )
+        return None if stderr is None else timer.wrap("stderr", stderr)
+
+    compute_deferred = lm_eval.metrics.compute_deferred
+    lm_eval.metrics.stderr_for_metric = _timed_stderr_for_metric
+    lm_eval.metrics.compute_deferred = timer.wrap("deferred_metrics", compute_deferred)
+    try:
+        evaluator.evaluate(
+            lm=lm,
+            task_dict=task_dict,
+            num_fewshot=num_fewshot,
+            bootstrap_iters=bootstrap_iters,
+        )
+    finally:
+        lm_eval.metrics.stderr_for_metric = stderr_for_metric
+        lm_eval.metrics.compute_deferred = compute_deferred
+    wall_time = time.perf_counter() - start
+
+    stages = dict(timer.times)
+    stages["other"] = wall_time - sum(stages.values())
+    num_requests = sum(request_counts.values())
+    return {
+        "wall_time_s": wall_time,
+        "stages_s": stages,
+        "num_requests": num_requests,
+        "requests": dict(request_counts),
+        "requests_per_s": num_requests / wall_time,
+        # The peak RSS of the process so far, as `ru_maxrss` (KiB on Linux)
+        # cannot be reset between benchmarks.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _median_run(runs):
+    """Summarizes repeated runs by the median of every measurement."""
+    stages = {stage for run in runs for stage in run["stages_s"]}
+    return {
+        "wall_time_s": statistics.median(run["wall_time_s"] for run in runs),
+        "stages_s": {
+            stage: statistics.median(run["stages_s"].get(stage, 0.0) for run in runs)
+            for stage in sorted(stages)
+        },
+        "num_requests": runs[0]["num_requests"],
+        "requests": runs[0]["requests"],
+        "requests_per_s": statistics.median(run["requests_per_s"] for run in runs),
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        "repeats": [run["wall_time_s"] for run in runs],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Returns a table of the time of every stage relative to `baseline`."""
+    lines = [f"{'benchmark':<12} {'stage':<20} {'baseline_s':>11} {'new_s':>11} {'ratio':>7}"]
+    for name, bench in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        old = baseline["benchmarks"][name]
+        rows = [("total", old["wall_time_s"], bench["wall_time_s"])]
+        rows += [
+            (stage, old["stages_s"].get(stage, 0.0), new)
+            for stage, new in bench["stages_s"].items()
+        ]
+        for stage, old_time, new_time in rows:
+            ratio = new_time / old_time if old_time > 0 else float("nan")
+            lines.append(
+                f"{name:<12} {stage:<20} {old_time:>11.4f} {new_time:>11.4f} {ratio:>7.2f}"
+            )
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--benchmarks",
+        default=",".join(fixtures.BENCHMARKS),
+        help="Comma-separated benchmarks to run, out of: " + ", ".join(fixtures.BENCHMARKS),
+    )
+    parser.add_argument(
+        "--num_docs", type=int, default=500, help="Number of evaluation docs of each benchmark."
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--bootstrap_iters", type=int, default=1000)
+    parser.add_argument(
+        "--num_fewshot",
+        type=int,
+        default=None,
+        help="Overrides the number of few-shot examples of every benchmark.",
+    )
+    parser.add_argument(
+        "--model",
+        default="null",
+        help="`null` for a no-op LM, or a model type of `lm_eval.models` (e.g. `ngram`).",
+    )
+    parser.add_argument("--model_args", default="")
+    parser.add_argument("--cache", action="store_true", help="Wrap the LM in a `CachingLM`.")
+    parser.add_argument(
+        "--fixtures_dir",
+        default=None,
+        help="Where the fixture datasets are written and reused. Defaults to a temporary directory.",
+    )
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output_path", default=None)
+    parser.add_argument(
+        "--baseline", default=None, help="A previous `--output_path` to compare against."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Silence the per-example logs, whose handlers are set up by `main.py`.
+    logging.getLogger("examples").propagate = False
+
+    benchmarks = args.benchmarks.split(",")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fixtures_dir = args.fixtures_dir or os.path.join(tmpdir, "fixtures")
+        paths = fixtures.write_fixtures(fixtures_dir, args.num_docs, seed=args.seed)
+
+        results = {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": vars(args),
+            "benchmarks": {},
+        }
+        for name in benchmarks:
+            num_fewshot = args.num_fewshot
+            if num_fewshot is None:
+                num_fewshot = fixtures.BENCHMARKS[name][4]
+            runs = []
+            for repeat in range(args.repeats):
+                if args.model == "null":
+                    lm = NullLM()
+                else:
+                    lm = lm_eval.models.get_model(args.model).create_from_arg_string(
+                        args.model_args
+                    )
+                run_dir = os.path.join(tmpdir, f"{name}-{repeat}")
+                os.makedirs(run_dir)
+                runs.append(
+                    run_benchmark(
+                        name,
+                        paths[name],
+                        lm,
+                        num_fewshot,
+                        args.bootstrap_iters,
+                        args.cache,
+                        run_dir,
+                    )
+                )
+            results["benchmarks"][name] = {"num_fewshot": num_fewshot, **_median_run(runs)}
+
+    dumped = json.dumps(results, indent=2)
+    if args.output_path:
+        with open(args.output_path, "w") as f:
+            f.write(dumped)
+    print(dumped)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(compare(results, baseline))
+
+
+if __name__ == "__main__":
+    main()
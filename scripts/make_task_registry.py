@@ -0,0 +1,67 @@
+import argparse
+import importlib
+import json
+import sys
+
+PATH = "lm_eval/tasks/task_paths.py"
+
+HEADER = """\
+# Generated from `lm_eval/tasks/registry.py` by
+# `python -m scripts.make_task_registry`. Do not edit.
+"""
+
+
+def task_path(task_class):
+    """Returns the `module:Class` path that `lm_eval.tasks` imports `task_class`
+    from.
+    """
+    path = f"{task_class.__module__}:{task_class.__qualname__}"
+    module, _, qualname = path.partition(":")
+    obj = importlib.import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr, None)
+    assert obj is task_class, f"{task_class} cannot be imported from {path}"
+    return path
+
+
+def make_task_paths():
+    """Returns the source of `lm_eval/tasks/task_paths.py`."""
+    from lm_eval.tasks import registry
+
+    lines = [HEADER, "TASK_PATHS = {"]
+    for name, task_class in registry.TASK_REGISTRY.items():
+        lines.append(f"    {json.dumps(name)}: {json.dumps(task_path(task_class))},")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help=f"Fails if `{PATH}` is out of date instead of writing it.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Writes the `module:Class` path of every task of `lm_eval/tasks/registry.py`
+    to `lm_eval/tasks/task_paths.py`, which the lazy `lm_eval.tasks.TASK_REGISTRY`
+    imports tasks from.
+
+    python -m scripts.make_task_registry
+    """
+    args = parse_args()
+    source = make_task_paths()
+    if args.check:
+        with open(PATH) as f:
+            if f.read() != source:
+                sys.exit(f"{PATH} is out of date, run `python -m scripts.make_task_registry`.")
+        return
+    with open(PATH, "w") as f:
+        f.write(source)
+
+
+if __name__ == "__main__":
+    main()
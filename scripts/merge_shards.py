@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import pickle
+
+from lm_eval import evaluator, metrics, tasks
+from scripts.agg2slim import agg2slim
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--shards",
+        nargs="+",
+        required=True,
+        help="The `outputs/shard-*.pkl` files written by every shard of a `main.py --num_shards` run.",
+    )
+    parser.add_argument(
+        "--output_path",
+        required=True,
+        help="Saves the merged results into `outputs/agg-{output_path}.json` and `outputs/slim-{output_path}.json`.",
+    )
+    return parser.parse_args()
+
+
+def load_shards(paths):
+    """Loads the shard results and checks that they form one complete run."""
+    shards = []
+    for path in paths:
+        with open(path, "rb") as f:
+            shards.append(pickle.load(f))
+    shards.sort(key=lambda shard: shard["config"]["shard_id"])
+
+    num_shards = shards[0]["config"]["num_shards"]
+    shard_ids = [shard["config"]["shard_id"] for shard in shards]
+    assert shard_ids == list(
+        range(num_shards)
+    ), f"Expected shards 0..{num_shards - 1}, got {shard_ids}"
+
+    def _run_config(shard):
+        return {k: v for k, v in shard["config"].items() if k != "shard_id"}
+
+    assert all(
+        _run_config(shard) == _run_config(shards[0]) for shard in shards
+    ), "The shards were not evaluated with the same configuration."
+    return shards
+
+
+def main():
+    """Merges the raw per-doc metric values of a sharded evaluation and
+    aggregates them as a single-node run would.
+
+    python -m scripts.merge_shards --shards outputs/shard-*-of-4-blop.pkl --output_path blop
+    """
+    args = parse_args()
+    shards = load_shards(args.shards)
+    config = {k: v for k, v in shards[0]["config"].items() if k != "shard_id"}
+
+    task_dict = tasks.get_task_dict_promptsource(config["tasks"])
+    with metrics.worker_pool():
+        results = evaluator.merge_shards(
+            shards,
+            task_dict,
+            bootstrap_iters=config["bootstrap_iters"],
+            stderr_method=config.get("stderr_method", "bootstrap"),
+        )
+    results["config"] = config
+
+    os.makedirs("./outputs", exist_ok=True)
+    with open(f"./outputs/agg-{args.output_path}.json", "w") as f:
+        json.dump({"results": results["results"], "config": results["config"]}, f)
+    with open(f"./outputs/slim-{args.output_path}.json", "w") as f:
+        json.dump(agg2slim(results), f, indent=2)
+    print(evaluator.make_table(results))
+
+
+if __name__ == "__main__":
+    main()
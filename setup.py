@@ -45,6 +45,7 @@ setuptools.setup(
         "jsonlines==2.0.0",
         "mock==4.0.3",
         "openai==0.6.4",
+        "requests",
         "jieba==0.42.1",
         "nagisa==0.2.7",
         "bleurt@https://github.com/google-research/bleurt/archive/b610120347ef22b494b6d69b4316e303f5932516.zip#egg=bleurt",
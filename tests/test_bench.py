@@ -0,0 +1,30 @@
+import pytest
+
+from scripts.bench import fixtures, run_bench
+
+
+@pytest.mark.parametrize("name", ["blimp", "glue_rte", "gem_webnlg", "flores_ppl"])
+def test_run_benchmark(tmp_path, name):
+    paths = fixtures.write_fixtures(str(tmp_path / "fixtures"), num_docs=20)
+    result = run_bench.run_benchmark(
+        name,
+        paths[name],
+        run_bench.NullLM(),
+        num_fewshot=fixtures.BENCHMARKS[name][4],
+        bootstrap_iters=10,
+        cache=True,
+        tmpdir=str(tmp_path),
+    )
+    stages = result["stages_s"]
+    assert {"load", "fewshot_context", "process_results", "model", "caching"} <= set(stages)
+    assert sum(stages.values()) == pytest.approx(result["wall_time_s"])
+    assert result["num_requests"] > 0
+
+
+def test_write_fixtures_is_deterministic(tmp_path):
+    first = fixtures.write_fixtures(str(tmp_path / "a"), num_docs=10)
+    second = fixtures.write_fixtures(str(tmp_path / "b"), num_docs=10)
+    for name, splits in first.items():
+        for split, path in splits.items():
+            with open(path) as f, open(second[name][split]) as g:
+                assert f.read() == g.read()
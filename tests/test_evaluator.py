@@ -1,10 +1,12 @@
 import os
 import lm_eval.base as base
+import lm_eval.metrics
 import lm_eval.tasks as tasks
 import lm_eval.models as models
 import lm_eval.evaluator as evaluator
 import random
 import pytest
+from lm_eval.base import hash_args
 
 
 # TODO: more fine grained unit tests rather than this big honking integration
@@ -67,3 +69,273 @@ def test_evaluator(taskname, task_class):
 
     # check that caching is working
     assert e1 == e2
+
+
+class ToyTask(base.PromptSourceTask):
+    """An offline ranked-choice task over synthetic docs."""
+
+    VERSION = 0
+    DATASET_PATH = "toy"
+
+    def download(self, data_dir=None, cache_dir=None, download_mode=None):
+        rnd = random.Random(1234)
+        self.dataset = {
+            split: [
+                {"text": f"{split} doc {i} " + "x" * rnd.randint(0, 20), "label": rnd.randint(0, 1)}
+                for i in range(size)
+            ]
+            for split, size in [("train", 20), ("test", 50)]
+        }
+
+    def has_training_docs(self):
+        return True
+
+    def has_validation_docs(self):
+        return False
+
+    def has_test_docs(self):
+        return True
+
+    def training_docs(self):
+        return self.dataset["train"]
+
+    def test_docs(self):
+        return self.dataset["test"]
+
+    def doc_to_target(self, doc):
+        return [super().doc_to_target(doc)]
+
+    def aggregation(self):
+        return {"acc": base.mean, "acc_norm": lm_eval.metrics.perplexity}
+
+
+def toy_task_dict():
+    from promptsource.templates import Template
+
+    prompt = Template(
+        "toy",
+        "{{text}} ||| {{answer_choices[label]}}",
+        "",
+        metadata=Template.Metadata(metrics=["Accuracy"]),
+        answer_choices="no ||| yes",
+    )
+    prompt.id = "toy"
+    return {"toy+toy": ToyTask(prompt=prompt)}
+
+
+class HashLM(base.LM):
+    """A deterministic LM whose scores only depend on the request."""
+
+    def loglikelihood(self, requests):
+        return [
+            (-int(hash_args("loglikelihood", req)[:8], 16) / 16 ** 8, False)
+            for req in requests
+        ]
+
+    def loglikelihood_rolling(self, requests):
+        raise NotImplementedError
+
+    def greedy_until(self, requests):
+        raise NotImplementedError
+
+
+def test_sharded_evaluate_merges_to_single_run():
+    lm = HashLM()
+    expected = evaluator.evaluate(
+        lm=lm, task_dict=toy_task_dict(), num_fewshot=2, bootstrap_iters=1000
+    )
+
+    shards = [
+        evaluator.evaluate(
+            lm=lm,
+            task_dict=toy_task_dict(),
+            num_fewshot=2,
+            bootstrap_iters=1000,
+            num_shards=3,
+            shard_id=shard_id,
+        )
+        for shard_id in range(3)
+    ]
+    doc_ids = [
+        doc_id
+        for shard in shards
+        for doc_id, _ in shard["raw_results"]["toy+toy"]["acc"]
+    ]
+    assert sorted(doc_ids) == list(range(50))
+
+    merged = evaluator.merge_shards(shards, toy_task_dict(), bootstrap_iters=1000)
+    assert merged == expected
+
+
+def test_evaluate_tracing(tmpdir):
+    import json
+    import lm_eval.instrumentation as instrumentation
+
+    lm = base.CachingLM(HashLM(), str(tmpdir / "cache.db"))
+    tracer = instrumentation.Tracer()
+    with instrumentation.tracing(tracer):
+        for _ in range(2):
+            evaluator.evaluate(
+                lm=lm, task_dict=toy_task_dict(), num_fewshot=1, bootstrap_iters=10
+            )
+    timing = tracer.summary()
+
+    for stage in [
+        "load_docs",
+        "fewshot_context",
+        "construct_requests",
+        "lm/loglikelihood",
+        "process_results",
+        "aggregation",
+        "stderr",
+    ]:
+        assert timing[stage]["calls"] > 0
+        assert timing[stage]["wall_time_s"] >= 0
+    assert timing["process_results"]["calls"] == 2 * 50
+    # Two answer choices per doc, all of them cached on the second run.
+    assert timing["lm/loglikelihood"]["requests"] == 2 * 100
+    assert timing["cache/loglikelihood"] == {"hits": 100, "misses": 100}
+
+    path = str(tmpdir / "trace.json")
+    tracer.write_chrome_trace(path)
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    assert len(events) == sum(
+        counters.get("calls", 0) for counters in timing.values()
+    )
+    assert {event["ph"] for event in events} == {"X"}
+
+    # Without recorded events, only the stage counters are kept.
+    counters_only = instrumentation.Tracer(record_events=False)
+    with instrumentation.tracing(counters_only):
+        evaluator.evaluate(lm=lm, task_dict=toy_task_dict(), num_fewshot=1, bootstrap_iters=10)
+    assert counters_only.summary()["process_results"]["calls"] == 50
+    assert counters_only.events == []
+
+    # Without an active tracer, instrumentation is a no-op.
+    evaluator.evaluate(lm=lm, task_dict=toy_task_dict(), num_fewshot=1, bootstrap_iters=10)
+    assert tracer.summary()["process_results"]["calls"] == 2 * 50
+
+
+def test_aggregate_computes_each_metric_once(monkeypatch):
+    calls = {"aggregation": 0, "acc": 0, "acc_norm": 0, "stderr": 0}
+
+    def counted(name, fn):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    def aggregation(self):
+        calls["aggregation"] += 1
+        return {
+            "acc": counted("acc", base.mean),
+            "acc_norm": counted("acc_norm", lm_eval.metrics.mean),
+        }
+
+    stderr_for_metric = lm_eval.metrics.stderr_for_metric
+    monkeypatch.setattr(ToyTask, "aggregation", aggregation)
+    monkeypatch.setattr(
+        lm_eval.metrics,
+        "stderr_for_metric",
+        lambda metric, bootstrap_iters, **kwargs: counted(
+            "stderr", stderr_for_metric(lm_eval.metrics.mean, bootstrap_iters)
+        ),
+    )
+    results = evaluator.evaluate(
+        lm=HashLM(), task_dict=toy_task_dict(), num_fewshot=0, bootstrap_iters=10
+    )
+
+    assert calls == {"aggregation": 1, "acc": 1, "acc_norm": 1, "stderr": 2}
+    table = results["table_results"]["toy+toy"]
+    for result in results["results"]:
+        for metric, value in result.items():
+            if metric.startswith("acc"):
+                assert value == table[metric]
+
+
+def test_evaluate_writes_examples(tmpdir):
+    import lm_eval.example_writer as example_writer
+
+    path = str(tmpdir / "examples.jsonl")
+    with example_writer.ExampleWriter(
+        path, dedup_fields=example_writer.PROMPT_FIELDS
+    ) as writer:
+        evaluator.evaluate(
+            lm=HashLM(),
+            task_dict=toy_task_dict(),
+            num_fewshot=1,
+            bootstrap_iters=10,
+            example_writer=writer,
+        )
+    examples = list(example_writer.read_examples(path))
+    assert len(examples) == 50
+    assert {example["prompt_name"] for example in examples} == {"toy"}
+    assert {example["doc_id"] for example in examples} == set(range(50))
+    assert {example["task_name"] for example in examples} == {"toy"}
+    assert all(set(example["metrics"]) == {"acc", "acc_norm"} for example in examples)
+
+
+def test_evaluate_writes_parquet(tmpdir):
+    import lm_eval.example_writer as example_writer
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir / "examples.parquet")
+    prompts_path = str(tmpdir / "prompts.parquet")
+    with example_writer.ParquetExampleWriter(path, prompts_path) as writer:
+        result = evaluator.evaluate(
+            lm=HashLM(),
+            task_dict=toy_task_dict(),
+            num_fewshot=1,
+            bootstrap_iters=10,
+            example_writer=writer,
+        )
+    accs = pq.read_table(path, columns=["metrics"]).column("metrics").to_pylist()
+    assert sum(dict(metrics)["acc"] for metrics in accs) / 50 == pytest.approx(
+        result["results"][0]["acc"]
+    )
+    prompts = pq.read_table(prompts_path).to_pylist()
+    assert [(p["prompt_key"], p["prompt_name"]) for p in prompts] == [(0, "toy")]
+
+
+def test_evaluate_streams_examples_without_deferred_metrics(monkeypatch):
+    events = []
+
+    class ListWriter:
+        def write(self, example):
+            events.append(("write", example["doc_id"], example["metrics"]))
+
+    compute_deferred = lm_eval.metrics.compute_deferred
+
+    def logged_compute_deferred(doc_metrics):
+        events.append(("compute_deferred",))
+        return compute_deferred(doc_metrics)
+
+    process_results = ToyTask.process_results
+
+    def deferring_process_results(self, doc, results):
+        metrics, example = process_results(self, doc, results)
+        if doc["label"]:
+            metrics["acc"] = lm_eval.metrics.DeferredMetric(
+                lambda items: items, metrics["acc"]
+            )
+        return metrics, example
+
+    monkeypatch.setattr(lm_eval.metrics, "compute_deferred", logged_compute_deferred)
+    monkeypatch.setattr(ToyTask, "process_results", deferring_process_results)
+    evaluator.evaluate(
+        lm=HashLM(),
+        task_dict=toy_task_dict(),
+        num_fewshot=0,
+        bootstrap_iters=10,
+        example_writer=ListWriter(),
+    )
+
+    split = events.index(("compute_deferred",))
+    before, after = events[:split], events[split + 1 :]
+    assert len(before) + len(after) == 50
+    assert before and after
+    # Only the examples with deferred metrics wait for them, and get their values.
+    assert all(set(metrics) == {"acc", "acc_norm"} for _, _, metrics in before)
+    assert all(set(metrics) == {"acc", "acc_norm"} for _, _, metrics in after)
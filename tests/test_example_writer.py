@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from lm_eval import example_writer
+
+
+def _examples(num_examples):
+    return [
+        {
+            "pred": i % 3,
+            "ctx": f"context {i}",
+            "prompt_name": f"prompt {i % 2}",
+            "prompt_jinja": "{{text}} ||| {{label}}",
+            "fixed_answer_choice_list": ["no", "yes"],
+        }
+        for i in range(num_examples)
+    ]
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / "examples.jsonl")
+    # A small buffer, so that the examples are written in several chunks.
+    with example_writer.ExampleWriter(path, buffer_size=100) as writer:
+        for example in _examples(50):
+            writer.write(example)
+
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == _examples(50)
+    assert list(example_writer.read_examples(path)) == _examples(50)
+
+
+def test_dedup_fields(tmp_path):
+    path = str(tmp_path / "examples.jsonl")
+    with example_writer.ExampleWriter(
+        path, dedup_fields=example_writer.PROMPT_FIELDS
+    ) as writer:
+        for example in _examples(50):
+            writer.write(example)
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    # One header per prompt.
+    headers = [r for r in records if example_writer.FIELDS_KEY in r]
+    assert [h[example_writer.FIELDS_KEY]["prompt_name"] for h in headers] == [
+        "prompt 0",
+        "prompt 1",
+    ]
+    assert len(records) == 52
+    assert list(example_writer.read_examples(path)) == _examples(50)
+
+
+def test_zstd(tmp_path):
+    pytest.importorskip("zstandard")
+    path = str(tmp_path / "examples.jsonl.zst")
+    with example_writer.ExampleWriter(path, compression="zstd") as writer:
+        for example in _examples(50):
+            writer.write(example)
+    assert list(example_writer.read_examples(path)) == _examples(50)
+
+
+def test_write_error(tmp_path):
+    writer = example_writer.ExampleWriter(str(tmp_path / "examples.jsonl"))
+    writer.write({"not serializable": object()})
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    path = str(tmp_path / "examples.parquet")
+    prompts_path = str(tmp_path / "prompts.parquet")
+    examples = _examples(50)
+    for i, example in enumerate(examples):
+        example.update(
+            task_name="toy",
+            doc_id=i,
+            target=["yes"],
+            metrics={"acc": float(i % 2)},
+            fewshot_idx=(i, i + 1),
+            fewshot_num=2,
+        )
+    with example_writer.ParquetExampleWriter(
+        path, prompts_path, row_group_size=20
+    ) as writer:
+        for example in examples:
+            writer.write(example)
+
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+    table = pq.read_table(
+        path, columns=["doc_id", "pred"], filters=[("doc_id", ">=", 45)]
+    )
+    assert table.to_pylist() == [
+        {"doc_id": i, "pred": json.dumps(i % 3)} for i in range(45, 50)
+    ]
+
+    rows = pq.read_table(path).to_pylist()
+    prompts = pq.read_table(prompts_path).to_pylist()
+    assert [p["prompt_name"] for p in prompts] == ["prompt 0", "prompt 1"]
+    assert [p["fixed_answer_choice_list"] for p in prompts] == [["no", "yes"]] * 2
+    assert rows[3]["prompt_key"] == 1
+    assert rows[3]["metrics"] == [("acc", 1.0)]
+    assert rows[3]["fewshot_idx"] == [3, 4]
+    assert rows[3]["target"] == ["yes"]
+    assert rows[3]["fewshot_source"] is None
+    assert rows[3]["extra"] is None
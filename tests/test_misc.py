@@ -10,3 +10,231 @@ def test_bootstrapping():
     bootstrapped = metrics.bootstrap_stderr(metrics.mean, arr, iters=100000)
 
     assert bootstrapped == pytest.approx(expected, abs=1e-4)
+
+
+@pytest.mark.parametrize(
+    "metric,make_item",
+    [
+        (metrics.perplexity, lambda rnd: -3 * rnd.random()),
+        (metrics.weighted_perplexity, lambda rnd: (-30 * rnd.random(), rnd.randint(5, 20))),
+        (metrics.f1_score, lambda rnd: (rnd.randint(0, 1), rnd.randint(0, 1))),
+        (metrics.matthews_corrcoef, lambda rnd: (rnd.randint(0, 1), rnd.randint(0, 1))),
+        (metrics.matthews_corrcoef, lambda rnd: (rnd.randint(0, 2), rnd.randint(0, 2))),
+    ],
+)
+def test_vectorized_bootstrap_matches_resampling(metric, make_item, monkeypatch):
+    rnd = random.Random(42)
+    items = [make_item(rnd) for _ in range(100)]
+    vectorized = metrics.bootstrap_stderr(metric, items, iters=1000)
+
+    # Without the vectorized path, the metric is called on every resample.
+    monkeypatch.setattr(metrics, "_VECTORIZED_BOOTSTRAP", {})
+    resampled = metrics.bootstrap_stderr(metric, items, iters=1000)
+
+    assert vectorized == pytest.approx(resampled, rel=1e-9)
+
+
+@pytest.mark.parametrize(
+    "metric,make_item",
+    [
+        (metrics.perplexity, lambda rnd: -3 * rnd.random()),
+        (metrics.weighted_perplexity, lambda rnd: (-30 * rnd.random(), rnd.randint(5, 40))),
+        (metrics.bits_per_byte, lambda rnd: (-30 * rnd.random(), rnd.randint(5, 40))),
+        (metrics.f1_score, lambda rnd: (rnd.randint(0, 1), int(rnd.random() < 0.6))),
+        (metrics.matthews_corrcoef, lambda rnd: (rnd.randint(0, 1), int(rnd.random() < 0.6))),
+        (metrics.matthews_corrcoef, lambda rnd: (rnd.randint(0, 2), rnd.randint(0, 2))),
+    ],
+)
+def test_analytical_stderr_matches_bootstrap(metric, make_item):
+    rnd = random.Random(42)
+    items = [make_item(rnd) for _ in range(2000)]
+    analytical = metrics.stderr_for_metric(metric, 10000, stderr_method="analytical")
+    bootstrap = metrics.bootstrap_stderr(metric, items, iters=10000)
+
+    assert analytical(items) == pytest.approx(bootstrap, rel=0.05)
+
+
+def test_analytical_stderr_falls_back_to_bootstrap():
+    # F1 of labels other than 0/1 has no analytical stderr.
+    items = [(1 if i % 3 else -1, 1 if (i * 7) % 4 else -1) for i in range(30)]
+    assert metrics.f1_score_stderr(items) is None
+    stderr = metrics.stderr_for_metric(metrics.f1_score, 100, stderr_method="analytical")
+    assert stderr(items) == metrics.bootstrap_stderr(metrics.f1_score, items, 100)
+
+
+def test_default_stderrs():
+    # Weighted perplexity and bits per byte only have analytical stderrs.
+    for metric in [metrics.weighted_perplexity, metrics.bits_per_byte]:
+        assert metrics.stderr_for_metric(metric, 100) is None
+        assert metrics.stderr_for_metric(metric, 100, stderr_method="analytical")
+
+
+@pytest.mark.parametrize("metric", [metrics.bleu, metrics.chrf, metrics.ter])
+@pytest.mark.parametrize("num_refs", [1, 2])
+def test_sufficient_statistics_bootstrap_matches_resampling(metric, num_refs, monkeypatch):
+    rnd = random.Random(42)
+    words = "the a dog cat sees big small city river . , runs".split()
+
+    def sentence():
+        return " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 12)))
+
+    items = [
+        ([sentence() for _ in range(num_refs)], sentence()) for _ in range(10)
+    ]
+    vectorized = metrics.bootstrap_stderr(metric, items, iters=1000)
+
+    monkeypatch.setattr(metrics, "_VECTORIZED_BOOTSTRAP", {})
+    resampled = metrics.bootstrap_stderr(metric, items, iters=1000)
+
+    assert vectorized == pytest.approx(resampled, rel=1e-9)
+
+
+def test_rouge():
+    from rouge_score import rouge_scorer
+
+    rnd = random.Random(42)
+    words = "the running dogs ran quickly across beautiful cities . happily".split()
+
+    def sentence():
+        return " ".join(rnd.choice(words) for _ in range(rnd.randint(3, 20)))
+
+    items = [([sentence()], sentence()) for _ in range(20)]
+    items += [([sentence(), sentence()], sentence()) for _ in range(20)]
+
+    scores = [metrics.rouge(refs, pred) for refs, pred in items]
+    for (refs, pred), score in zip(items[:20], scores):
+        scorer = rouge_scorer.RougeScorer(rouge_types=list(metrics.ROUGE_TYPES), use_stemmer=True)
+        expected = scorer.score(refs[0].replace(".", ".\n"), pred.replace(".", ".\n"))
+        assert score == {
+            rouge_type: expected[rouge_type]._asdict() for rouge_type in metrics.ROUGE_TYPES
+        }
+
+    assert metrics.rouge(*items[25], rouge_types=["rouge2"]) == {"rouge2": scores[25]["rouge2"]}
+    assert metrics.rouge_batch(items, chunksize=8) == scores
+
+
+def test_sari_batch():
+    rnd = random.Random(42)
+    # Empty words (double spaces) and case are part of SARI's tokenization.
+    words = "the The cat dog sat on a mat quickly".split() + [""]
+
+    def sentence():
+        return " ".join(rnd.choice(words) for _ in range(rnd.randint(0, 15)))
+
+    items = [
+        (sentence(), sentence(), [sentence() for _ in range(rnd.randint(0, 4))])
+        for _ in range(200)
+    ]
+    # Exactly the same floats as the authors' implementation.
+    assert metrics.sari_batch(items) == [metrics.sari(*item) for item in items]
+    assert metrics.sari_batch([]) == []
+
+
+def _double_batch(items, offset=0):
+    return [2 * item + offset for item in items]
+
+
+def _split_batch(items):
+    return [{"low": item % 10, "high": {"tens": item // 10}} for item in items]
+
+
+def test_compute_deferred():
+    doc_metrics = [
+        {
+            "acc": i % 2,
+            "double": metrics.DeferredMetric(_double_batch, i, offset=100 * (i % 2)),
+            "split": metrics.DeferredMetric(_split_batch, 10 * i + 3),
+            "last": i,
+        }
+        for i in range(5)
+    ]
+    computed = metrics.compute_deferred(doc_metrics)
+    assert computed == [
+        {
+            "acc": i % 2,
+            "double": 2 * i + 100 * (i % 2),
+            "low": 3,
+            "high_tens": i,
+            "last": i,
+        }
+        for i in range(5)
+    ]
+    # Dict values are merged in place of the deferred metric.
+    assert list(computed[0]) == ["acc", "double", "low", "high_tens", "last"]
+
+
+def test_xquad_aggregation_computes_squad_once(monkeypatch):
+    from lm_eval.tasks import xquad
+
+    calls = []
+
+    class FakeSquadMetric:
+        def compute(self, predictions, references):
+            calls.append(len(predictions))
+            return {key: float(len(predictions)) for key in aggregation}
+
+    monkeypatch.setattr(xquad, "_load_squad_metric", FakeSquadMetric)
+    aggregation = xquad.XQuADEnglish.aggregation(None)
+    docs = [({"id": str(i)}, {"id": str(i)}) for i in range(3)]
+    # As in `evaluate`, every sub-metric gets its own list of the same items.
+    results = {key: agg(list(docs)) for key, agg in aggregation.items()}
+    assert results == {key: 3.0 for key in aggregation}
+    assert calls == [3]
+
+    # Other items, e.g. of another language, are computed again.
+    assert aggregation["f1"](docs[:2]) == 2.0
+    assert calls == [3, 2]
+
+
+def test_jigsaw_discrepencies():
+    import numpy as np
+    import pandas as pd
+    from lm_eval.tasks.jigsaw_unintended_bias import JigsawUnintendedBias
+
+    # The dataset must be downloaded from Kaggle, so only the aggregation is set up.
+    task = JigsawUnintendedBias.__new__(JigsawUnintendedBias)
+    dimensions = task.dimension_to_identity_set
+    rnd = random.Random(42)
+    records = [
+        {
+            **{
+                identity: int(rnd.random() < 0.3)
+                for identity_set in dimensions.values()
+                for identity in identity_set
+            },
+            "pred": float(rnd.random() < 0.5),
+            "target": int(rnd.random() < 0.5),
+        }
+        for _ in range(200)
+    ]
+    # No doc mentions this identity.
+    for record in records:
+        record["transgender"] = 0
+
+    def expected(identity_set, func):
+        # The former row-wise pandas implementation.
+        df = pd.DataFrame(records)
+        fprs = []
+        for identity in identity_set:
+            identity_pd = df[df[identity] == 1]
+            if len(identity_pd) == 0:
+                continue
+            fp = identity_pd.apply(lambda x: x.pred and not x.target, axis=1).sum()
+            tn = identity_pd.apply(lambda x: not x.pred and not x.target, axis=1).sum()
+            fprs.append(0 if fp + tn == 0 else float(fp) / (float(fp) + float(tn)))
+        return float(func(fprs))
+
+    aggregation = task.aggregation()
+    for dimension, identity_set in dimensions.items():
+        assert aggregation[f"{dimension}_var"](records) == expected(identity_set, np.var)
+        assert aggregation[f"{dimension}_std"](records) == expected(identity_set, np.std)
+
+
+def test_worker_pool():
+    with metrics.worker_pool(2):
+        pool = metrics._get_pool()
+        assert metrics._map_in_pool(abs, [-1, -2, 3, -4], True, 1) == [1, 2, 3, 4]
+        # Reused by every metric until the end of the block.
+        metrics.start_pool()
+        assert metrics._get_pool() is pool
+    assert metrics._pool is None
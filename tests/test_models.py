@@ -1,3 +1,8 @@
+import http.server
+import json
+import os
+import threading
+import time
 import pytest
 import unittest.mock as mock
 import lm_eval.models as models
@@ -67,3 +72,537 @@ def test_gpt2_perplexity():
         -4.425003, -2.2563353, -7.909143, -1.9304147, -7.3610134, -2.3120654, -7.3229, -2.1643813,
     ])
     assert perplexity == pytest.approx(tgt, rel=1e-3)
+
+
+def _save_tiny_tokenizer(path):
+    """Trains a small byte-level BPE tokenizer and saves it to `path`."""
+    import tokenizers
+    import transformers
+
+    tok = tokenizers.Tokenizer(tokenizers.models.BPE())
+    tok.pre_tokenizer = tokenizers.pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = tokenizers.decoders.ByteLevel()
+    trainer = tokenizers.trainers.BpeTrainer(
+        vocab_size=300,
+        special_tokens=["<|endoftext|>"],
+        initial_alphabet=tokenizers.pre_tokenizers.ByteLevel.alphabet(),
+    )
+    tok.train_from_iterator(["The quick brown fox jumps over the lazy dog."] * 10, trainer)
+    tokenizer = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=tok, eos_token="<|endoftext|>"
+    )
+    tokenizer.save_pretrained(path)
+    return tokenizer
+
+
+@pytest.fixture(scope="module")
+def tiny_causal_lm_path(tmp_path_factory):
+    """Builds a tiny randomly initialized GPT-2 and a small BPE tokenizer so the
+    HuggingFace backends can be exercised on the CPU without downloading anything.
+    """
+    import torch
+    import transformers
+
+    path = str(tmp_path_factory.mktemp("tiny-gpt2"))
+    tokenizer = _save_tiny_tokenizer(path)
+    torch.manual_seed(1234)
+    config = transformers.GPT2Config(
+        vocab_size=len(tokenizer),
+        n_positions=64,
+        n_embd=16,
+        n_layer=2,
+        n_head=2,
+        bos_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+    transformers.GPT2LMHeadModel(config).save_pretrained(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def tiny_linear_causal_lm_path(tmp_path_factory):
+    """Like `tiny_causal_lm_path`, but a GPT-NeoX, whose layers are `torch.nn.Linear`s."""
+    import torch
+    import transformers
+
+    path = str(tmp_path_factory.mktemp("tiny-gpt-neox"))
+    tokenizer = _save_tiny_tokenizer(path)
+    torch.manual_seed(1234)
+    config = transformers.GPTNeoXConfig(
+        vocab_size=len(tokenizer),
+        max_position_embeddings=64,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        bos_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+    transformers.GPTNeoXForCausalLM(config).save_pretrained(path)
+    return path
+
+
+TINY_LL_REQUESTS = [
+    ("The quick brown fox jumps over the lazy", " dog"),
+    ("The quick brown fox jumps over the lazy", " cat"),
+    ("", "The quick brown fox"),
+    ("The", " quick brown fox jumps over the lazy dog."),
+    ("The quick", " brown"),
+]
+TINY_ROLLING_REQUESTS = [
+    ("The quick brown fox jumps over the lazy dog.",),
+    ("The lazy dog jumps over the quick brown fox.",),
+    ("A fox.",),
+]
+TINY_GREEDY_REQUESTS = [
+    (ctx, {"stopping_criteria": "\n###\n", "max_generation_length": 4, "num_fewshot": 0})
+    for ctx in ["The quick brown fox", "The lazy dog", "A", "The quick brown fox jumps over"]
+]
+
+
+def test_hf_causal_data_parallel(tiny_causal_lm_path):
+    lm_args = dict(
+        pretrained=tiny_causal_lm_path, device="cpu", half=False, batch_size=2, max_gen_toks=8
+    )
+    lm = models.get_model("hf-causal")(**lm_args)
+    dp_lm = models.get_model("hf-causal")(data_parallel=2, **lm_args)
+    try:
+        assert dp_lm.model is None
+        assert dp_lm.max_length == lm.max_length
+
+        expected = lm.loglikelihood(TINY_LL_REQUESTS)
+        for (ll, is_greedy), (dp_ll, dp_is_greedy) in zip(
+            expected, dp_lm.loglikelihood(TINY_LL_REQUESTS)
+        ):
+            assert dp_ll == pytest.approx(ll, rel=1e-5)
+            assert dp_is_greedy == is_greedy
+
+        assert dp_lm.loglikelihood_rolling(TINY_ROLLING_REQUESTS) == pytest.approx(
+            lm.loglikelihood_rolling(TINY_ROLLING_REQUESTS), rel=1e-5
+        )
+        assert dp_lm.greedy_until(TINY_GREEDY_REQUESTS) == lm.greedy_until(
+            TINY_GREEDY_REQUESTS
+        )
+        assert dp_lm.loglikelihood([]) == []
+
+        # After a failed call, no stale reply is read by the next one.
+        with pytest.raises(RuntimeError, match="no_such_method"):
+            dp_lm._replicas.run("no_such_method", TINY_LL_REQUESTS, 2)
+        assert dp_lm.greedy_until(TINY_GREEDY_REQUESTS) == lm.greedy_until(
+            TINY_GREEDY_REQUESTS
+        )
+
+        # A replica that dies fails the call instead of blocking it.
+        dp_lm._replicas._processes[1].kill()
+        with pytest.raises(RuntimeError, match="exited"):
+            dp_lm.loglikelihood(TINY_LL_REQUESTS)
+    finally:
+        dp_lm.close()
+
+
+@pytest.mark.parametrize(
+    "lm_args,rel",
+    [
+        ({"dtype": "bf16"}, 5e-2),
+        ({"dtype": "float32", "quantization": "int8"}, 5e-2),
+    ],
+)
+def test_hf_causal_low_precision_matches_fp32(tiny_linear_causal_lm_path, lm_args, rel):
+    import torch
+
+    fp32_lm = models.get_model("hf-causal")(
+        pretrained=tiny_linear_causal_lm_path, device="cpu", dtype="fp32", batch_size=2
+    )
+    lm = models.get_model("hf-causal")(
+        pretrained=tiny_linear_causal_lm_path, device="cpu", batch_size=2, **lm_args
+    )
+    if "quantization" in lm_args:
+        assert any(
+            isinstance(module, torch.nn.quantized.dynamic.Linear)
+            for module in lm.model.modules()
+        )
+    else:
+        assert next(lm.model.parameters()).dtype == torch.bfloat16
+
+    expected = [ll for ll, _ in fp32_lm.loglikelihood(TINY_LL_REQUESTS)]
+    actual = [ll for ll, _ in lm.loglikelihood(TINY_LL_REQUESTS)]
+    assert actual == pytest.approx(expected, rel=rel)
+
+
+def test_hf_causal_low_cpu_mem_usage(tiny_causal_lm_path):
+    pytest.importorskip("accelerate")
+    import torch
+
+    expected_lm = models.get_model("hf-causal")(
+        pretrained=tiny_causal_lm_path, device="cpu", dtype="fp32", batch_size=2
+    )
+    lm = models.get_model("hf-causal")(
+        pretrained=tiny_causal_lm_path,
+        device="cpu",
+        dtype="fp32",
+        batch_size=2,
+        low_cpu_mem_usage=True,
+        device_map="cpu",
+    )
+    assert lm.device == torch.device("cpu")
+    assert next(lm.model.parameters()).dtype == torch.float32
+
+    assert lm.loglikelihood(TINY_LL_REQUESTS) == expected_lm.loglikelihood(
+        TINY_LL_REQUESTS
+    )
+
+
+class _MockCompletionsHandler(http.server.BaseHTTPRequestHandler):
+    """Serves deterministic OpenAI-style completions: the logprob of a token only
+    depends on its id and position, and generations echo the prompt length.
+    """
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.num_requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            fail = server.num_failures > 0
+            server.num_failures -= int(fail)
+        time.sleep(server.latency)
+        with server.lock:
+            server.in_flight -= 1
+        if fail:
+            self._send(500, {"error": {"message": "overloaded", "type": "server_error"}})
+            return
+
+        choices = []
+        for i, prompt in enumerate(body["prompt"]):
+            if body.get("echo"):
+                logprobs = [-((tok * 7 + pos) % 10 + 1) / 10 for pos, tok in enumerate(prompt)]
+                choices.append({
+                    "index": i,
+                    "text": "",
+                    "logprobs": {
+                        "tokens": [str(tok) for tok in prompt],
+                        "token_logprobs": logprobs,
+                        "top_logprobs": [
+                            {str(tok): lp, "top": -0.3} for tok, lp in zip(prompt, logprobs)
+                        ],
+                    },
+                })
+            else:
+                choices.append({"index": i, "text": f" {len(prompt)} tokens.\nmore"})
+        response = {"object": "text_completion", "choices": choices}
+        if body.get("echo"):
+            # Only scoring calls report their usage, so that the client's own
+            # token counts are exercised as well.
+            num_tokens = sum(len(prompt) for prompt in body["prompt"])
+            response["usage"] = {"prompt_tokens": num_tokens, "completion_tokens": 0}
+        self._send(200, response)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_completions_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _MockCompletionsHandler)
+    server.lock = threading.Lock()
+    server.num_requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.num_failures = 0
+    server.latency = 0.05
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def openai_lm_factory(mock_completions_server, tiny_causal_lm_path):
+    """Builds `OpenAICompletionsLM`s that query the mock server with the tiny
+    tokenizer in place of the GPT-2 one.
+    """
+    openai = pytest.importorskip("openai")
+    import transformers
+
+    tokenizer = transformers.PreTrainedTokenizerFast.from_pretrained(tiny_causal_lm_path)
+
+    def _factory(**kwargs):
+        with mock.patch.object(
+            transformers.GPT2TokenizerFast, "from_pretrained", return_value=tokenizer
+        ), mock.patch.dict(os.environ, {"OPENAI_API_SECRET_KEY": "test"}):
+            kwargs.setdefault("batch_size", 2)
+            return models.get_model("openai")(engine="mock", **kwargs)
+
+    with mock.patch.object(openai, "api_base", mock_completions_server.url):
+        yield _factory
+
+
+def test_openai_concurrent_dispatch_matches_sequential(
+    mock_completions_server, openai_lm_factory
+):
+    sequential = openai_lm_factory()
+    expected_ll = sequential.loglikelihood(TINY_LL_REQUESTS)
+    expected_greedy = sequential.greedy_until(TINY_GREEDY_REQUESTS)
+    assert mock_completions_server.max_in_flight == 1
+    assert all(not greedy for _, greedy in expected_ll)
+    assert all(gen.startswith(" ") and "tokens." in gen for gen in expected_greedy)
+
+    concurrent = openai_lm_factory(max_concurrency=4)
+    assert concurrent.loglikelihood(TINY_LL_REQUESTS) == expected_ll
+    assert concurrent.greedy_until(TINY_GREEDY_REQUESTS) == expected_greedy
+    assert mock_completions_server.max_in_flight > 1
+
+
+def test_openai_greedy_until_groups_requests_by_api_args(
+    mock_completions_server, openai_lm_factory
+):
+    lm = openai_lm_factory(batch_size=4)
+    requests = [
+        (ctx, {"stopping_criteria": "\n", "max_generation_length": 4, "num_fewshot": 1 + i % 2})
+        for i, ctx in enumerate(
+            ["The", "The quick", "A fox", "The lazy dog", "A", "The fox", "A dog", "Lazy"]
+        )
+    ]
+    generations = lm.greedy_until(requests)
+    # Requests that only differ in `num_fewshot` share batches.
+    assert mock_completions_server.num_requests == 2
+    assert generations == [
+        f" {len(lm.tok_encode(ctx))} tokens." for ctx, _ in requests
+    ]
+
+
+def test_openai_retries_are_bounded(mock_completions_server, openai_lm_factory):
+    import openai
+
+    lm = openai_lm_factory(max_retries=2, retry_backoff=0.01)
+    mock_completions_server.num_failures = 2
+    assert len(lm.loglikelihood(TINY_LL_REQUESTS[:1])) == 1
+
+    mock_completions_server.num_failures = 3
+    with pytest.raises(openai.error.OpenAIError):
+        lm.loglikelihood(TINY_LL_REQUESTS[:1])
+
+    # Retries are also counted when `_model_call` runs outside of `_dispatch`.
+    lm = openai_lm_factory(max_retries=2, retry_backoff=0.01)
+    mock_completions_server.num_failures = 1
+    lm._model_call([lm.tok_encode("The quick brown fox")])
+    assert lm._call_state.retries == 1
+
+
+def test_openai_usage_accounting(mock_completions_server, openai_lm_factory):
+    from lm_eval.models.openai_completions import BudgetExceededError
+
+    lm = openai_lm_factory(max_retries=1, retry_backoff=0.01, cost_per_1k_tokens=2.0)
+    mock_completions_server.num_failures = 1
+    lm.loglikelihood(TINY_LL_REQUESTS)
+    generations = lm.greedy_until(TINY_GREEDY_REQUESTS)
+
+    usage = lm.usage.summary()
+    assert usage["num_calls"] == mock_completions_server.num_requests - 1 == 5
+    assert usage["retries"] == 1
+    assert usage["completion_tokens"] == sum(len(lm.tok_encode(gen)) for gen in generations)
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+    assert usage["cost"] == pytest.approx(usage["total_tokens"] / 1000 * 2.0)
+    assert all(call["latency_s"] > 0 for call in usage["calls"])
+
+    # Calls that could exceed the budget are never sent.
+    lm = openai_lm_factory(max_tokens_budget=10)
+    mock_completions_server.num_requests = 0
+    with pytest.raises(BudgetExceededError):
+        lm.greedy_until(TINY_GREEDY_REQUESTS)
+    assert mock_completions_server.num_requests == 0
+
+
+def test_usage_tracker_settle():
+    from lm_eval.models.openai_completions import BudgetExceededError, UsageTracker
+
+    usage = UsageTracker(max_tokens=100)
+    usage.reserve(60)
+    with pytest.raises(BudgetExceededError):
+        usage.reserve(50)
+    # The call used fewer tokens than it reserved.
+    usage.settle(60, prompt_tokens=20, completion_tokens=10, latency=0.1, retries=0)
+    usage.reserve(70)
+    with pytest.raises(BudgetExceededError):
+        usage.reserve(1)
+    usage.release(70)
+    usage.reserve(70)
+    assert usage.summary()["total_tokens"] == 30
+
+
+def test_rate_limiter():
+    from lm_eval.models.openai_completions import RateLimiter
+
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(
+        requests_per_minute=600,
+        tokens_per_minute=6000,
+        clock=lambda: now[0],
+        sleep=sleep,
+    )
+    # Both buckets start full.
+    for _ in range(600):
+        limiter.acquire(1)
+    assert waits == []
+
+    # Both buckets refill at 10 requests and 100 tokens per second. The request
+    # bucket is empty, and the token bucket holds 5400 tokens.
+    limiter.acquire(1)
+    limiter.acquire(5409)
+    assert waits == [pytest.approx(0.1), pytest.approx(0.1)]
+    # Only 10 tokens are left.
+    limiter.acquire(110)
+    assert waits[2:] == [pytest.approx(1.0)]
+
+    # Requests larger than the token bucket wait for a full one.
+    now[0] += 60
+    limiter.acquire(10000)
+    limiter.acquire(1)
+    assert waits[3:] == [pytest.approx(0.01)]
+
+
+def test_http_completions_matches_openai(
+    mock_completions_server, openai_lm_factory, tiny_causal_lm_path
+):
+    expected = openai_lm_factory()
+    lm = models.get_model("http-completions")(
+        model="mock",
+        base_url=mock_completions_server.url + "/v1",
+        tokenizer=tiny_causal_lm_path,
+        batch_size=2,
+        max_concurrency=2,
+        max_retries=2,
+        retry_backoff=0.01,
+    )
+    # Transient server errors are retried.
+    mock_completions_server.num_failures = 2
+    assert lm.loglikelihood(TINY_LL_REQUESTS) == expected.loglikelihood(
+        TINY_LL_REQUESTS
+    )
+    assert lm.loglikelihood_rolling(TINY_ROLLING_REQUESTS) == pytest.approx(
+        expected.loglikelihood_rolling(TINY_ROLLING_REQUESTS)
+    )
+    assert lm.greedy_until(TINY_GREEDY_REQUESTS) == expected.greedy_until(
+        TINY_GREEDY_REQUESTS
+    )
+    lm.close()
+
+
+@pytest.fixture
+def ngram_lm(tmp_path, tiny_causal_lm_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text(
+        "The quick brown fox jumps over the lazy dog.\nA lazy fox.\n"
+    )
+    return models.get_model("ngram")(
+        tokenizer=tiny_causal_lm_path, corpus=str(corpus), order=3, batch_size=2
+    )
+
+
+def test_ngram_matches_base_lm_scoring(ngram_lm):
+    import torch
+    import lm_eval.base
+
+    requests = [
+        ((ctx, cont), ngram_lm.tok_encode(ctx) or [ngram_lm.eot_token_id], ngram_lm.tok_encode(cont))
+        for ctx, cont in TINY_LL_REQUESTS
+    ]
+    expected = lm_eval.base.BaseLM._loglikelihood_tokens(ngram_lm, requests)
+    actual = ngram_lm._loglikelihood_tokens(requests)
+    assert [ll for ll, _ in actual] == pytest.approx([ll for ll, _ in expected], rel=1e-5)
+    assert [greedy for _, greedy in actual] == [greedy for _, greedy in expected]
+    assert actual[3][1] and not actual[1][1]
+
+    # Every next-token distribution is normalized.
+    log_probs = ngram_lm._model_call(torch.tensor([[0, 1, 2], [3, 4, 5]]))
+    assert log_probs.exp().sum(-1).numpy() == pytest.approx(1.0)
+
+
+def test_ngram_is_deterministic(ngram_lm):
+    assert ngram_lm.loglikelihood(TINY_LL_REQUESTS) == ngram_lm.loglikelihood(
+        TINY_LL_REQUESTS
+    )
+    rolling = ngram_lm.loglikelihood_rolling(TINY_ROLLING_REQUESTS)
+    assert rolling == ngram_lm.loglikelihood_rolling(TINY_ROLLING_REQUESTS)
+    assert all(ll < 0 for ll in rolling)
+
+    generations = ngram_lm.greedy_until(
+        [("The quick brown", {"stopping_criteria": ".", "max_generation_length": 16, "num_fewshot": 1})]
+    )
+    assert generations == [" fox jumps over the lazy dog"]
+
+
+def test_profiler_hooks(ngram_lm, tmp_path):
+    import json
+    import lm_eval.base
+    import lm_eval.instrumentation as instrumentation
+
+    class RecordingHook(instrumentation.ProfilerHook):
+        def __init__(self):
+            self.calls = []
+
+        def enter(self, event, metadata):
+            self.calls.append(("enter", event, dict(metadata)))
+
+        def exit(self, event, metadata):
+            self.calls.append(("exit", event, dict(metadata)))
+
+    hook = RecordingHook()
+    timer = instrumentation.BatchTimer()
+    torch_trace = str(tmp_path / "torch-trace.json")
+    torch_profiler = instrumentation.TorchProfilerHook(torch_trace, max_batches=1)
+    for h in [hook, timer, torch_profiler]:
+        ngram_lm.add_profiler_hook(h)
+
+    requests = [
+        ((ctx, cont), ngram_lm.tok_encode(ctx) or [ngram_lm.eot_token_id], ngram_lm.tok_encode(cont))
+        for ctx, cont in TINY_LL_REQUESTS
+    ]
+    lm_eval.base.BaseLM._loglikelihood_tokens(ngram_lm, requests)
+    ngram_lm.greedy_until(
+        [("The quick brown", {"stopping_criteria": ".", "max_generation_length": 4, "num_fewshot": 1})]
+    )
+
+    num_batches = (len(requests) + 1) // 2
+    assert hook.calls[0] == ("enter", "_loglikelihood_tokens", {"num_requests": len(requests)})
+    assert hook.calls[1][:2] == ("enter", "_model_call")
+    assert hook.calls[1][2]["shape"][0] == 2
+    assert hook.calls[2 * num_batches + 1] == ("exit", "_loglikelihood_tokens", {"num_requests": len(requests)})
+    assert [call[:2] for call in hook.calls[-4:]] == [
+        ("enter", "greedy_until"),
+        ("enter", "_model_generate"),
+        ("exit", "_model_generate"),
+        ("exit", "greedy_until"),
+    ]
+
+    assert [record["event"] for record in timer.records] == ["_model_call"] * num_batches + ["_model_generate"]
+    assert all(record["time_s"] >= 0 for record in timer.records)
+    timer.write(str(tmp_path / "profile.jsonl"))
+    with open(tmp_path / "profile.jsonl") as f:
+        assert [json.loads(line) for line in f] == timer.records
+
+    # The torch profiler only ran over the first batch.
+    assert torch_profiler.num_batches == 1
+    with open(torch_trace) as f:
+        assert "_model_call" in f.read()
+
+    for h in [hook, timer, torch_profiler]:
+        ngram_lm.remove_profiler_hook(h)
+    assert ngram_lm.profiler_hooks == ()
@@ -105,3 +105,26 @@ def test_documents_and_requests(taskname, task_class):
             # todo: mock lm after refactoring evaluator.py to not be a mess
             for req in reqs:
                 assert isinstance(req, base.Request)
+
+
+def test_task_paths_up_to_date():
+    from scripts.make_task_registry import PATH, make_task_paths
+
+    with open(PATH) as f:
+        assert f.read() == make_task_paths()
+
+
+def test_task_registry_is_lazy():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, lm_eval.tasks as tasks\n"
+        "assert 'lm_eval.base' not in sys.modules\n"
+        "assert tasks.get_task('rte').__name__ == 'RTE'\n"
+        "print(sorted(m for m in sys.modules if m.startswith('lm_eval.tasks.')))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    assert out.strip() == str(["lm_eval.tasks.glue", "lm_eval.tasks.task_paths"])
@@ -279,3 +279,36 @@ def test_select_continuation_from_batch_1():
         select_continuation_from_batch_left_padding(generations, max_context_size),
         expected,
     )
+
+
+def test_simple_parse_args_string():
+    from typing import Optional
+
+    from lm_eval.utils import parse_arg_types, simple_parse_args_string
+
+    assert simple_parse_args_string("") == {}
+    args = simple_parse_args_string(
+        "pretrained=EleutherAI/gpt-neo-1.3B,revision=1234,data_parallel=2,half=False,temperature=0.5,budget=inf,parallelize=True"
+    )
+    assert args["revision"] == "1234"
+
+    def init(
+        pretrained: str,
+        revision: str = "main",
+        data_parallel: int = 1,
+        half: bool = True,
+        temperature: Optional[float] = None,
+        budget=None,
+        parallelize=False,
+    ):
+        pass
+
+    assert parse_arg_types(init, args) == {
+        "pretrained": "EleutherAI/gpt-neo-1.3B",
+        "revision": "1234",
+        "data_parallel": 2,
+        "half": False,
+        "temperature": 0.5,
+        "budget": "inf",
+        "parallelize": True,
+    }